@@ -6,11 +6,15 @@
 
 from trueskill import *
 import random
-import itertools
 import math
+import sys
+from pathlib import Path
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+import rating_engine  # shared with the Cloud Function backend
+
 
 # In[3]:
 
@@ -250,13 +254,19 @@ for game_id in range(115,df["GameID"].max()+1):
 # In[ ]:
 
 
-def win_probability(team1, team2):
-    delta_mu = sum(r.mu for r in team1) - sum(r.mu for r in team2)
-    sum_sigma = sum(r.sigma ** 2 for r in itertools.chain(team1, team2))
-    size = len(team1) + len(team2)
-    denom = math.sqrt(size * (5.5 * 5.5) + sum_sigma)
-    ##ts = trueskill.global_env()
-    return env.cdf(delta_mu / denom)
+def win_probability(mafia, town):
+    # P(mafia wins) for the real players' Ratings, padded with the current
+    # ghosts and mafia fillers exactly as RateGame pads them. The shared
+    # predictor does the padding; tau=0 because a pre-game probability
+    # leaves out the dynamics term.
+    cfg = rating_engine.Config(
+        mafia_ghost_mu, town_ghost_mu, 5.5, tau=0.0,
+        mafia_ghost_sigma=mafia_ghost_sigma, town_ghost_sigma=town_ghost_sigma,
+    )
+    return float(rating_engine.predict_mafia_win(
+        [r.mu for r in mafia], [r.sigma for r in mafia],
+        [r.mu for r in town], [r.sigma for r in town], cfg,
+    ))
 
 
 # In[ ]:
@@ -269,8 +279,9 @@ town_ghost_mu = 24.0
 town_ghost_sigma = 0.8
 town_ghost = env.Rating(mu=town_ghost_mu, sigma=town_ghost_sigma)
 
-t1 = [mafia_ghost]
-t2 = [town_ghost]
+# An even 3 v 10 lobby at the prior, so only the ghost gap moves the odds
+t1 = [env.Rating()] * 3
+t2 = [env.Rating()] * 10
 
 win_probability(t1, t2)
 
@@ -38,6 +38,8 @@ let manualRoleMap = new Map(); // name → 'Mafia'|'Cop'|'Medic'|'Vigi'
 let retroRoleMap = new Map();
 let manualNames = [];
 let retroNames = [];
+let retroQueue = []; // past games waiting to be recorded together
+let lastGameId = null; // the game the Undo button refers to
 let manualSkipMatch = new Set();
 let retroSkipMatch = new Set();
 
@@ -129,6 +131,22 @@ async function api(action, data = {}) {
 	return result;
 }
 
+// Reads go over GET so the browser keeps the response and revalidates it
+// with If-None-Match; the backend answers 304 with no body while nothing
+// has been recorded since.
+async function apiGet(action, params = {}) {
+	if (!SCRIPT_URL) {
+		throw new Error('Backend not configured for this site');
+	}
+	const qs = new URLSearchParams({ action, ...params });
+	const resp = await fetch(`${SCRIPT_URL}?${qs}`, { cache: 'no-cache' });
+	const result = await resp.json();
+	if (result.error) {
+		throw new Error(result.error);
+	}
+	return result;
+}
+
 // --- Name counter ---
 
 function countNames() {
@@ -246,13 +264,14 @@ function shuffleArray(arr) {
 	return arr;
 }
 
-function randomize(names) {
+function randomize(names, mafiaNames = null) {
 	const numGhosts = 15 - names.length;
-	const real = shuffleArray([...names]);
 
-	// Zone 1 (positions 1-3): Mafia — always real players
-	const mafia = real.slice(0, 3);
-	let remaining = real.slice(3);
+	// Zone 1 (positions 1-3): Mafia — always real players (the balanced
+	// roll passes in the three suggestAssignments picked)
+	const real = shuffleArray(mafiaNames ? names.filter((n) => !mafiaNames.includes(n)) : [...names]);
+	const mafia = mafiaNames ? [...mafiaNames] : real.slice(0, 3);
+	let remaining = mafiaNames ? real : real.slice(3);
 
 	// Zone 2 (positions 4-6): Town — 0 or 1 ghost, rest real
 	const ghostsInZone2 = Math.min(numGhosts, Math.round(nextRandom()));
@@ -543,14 +562,28 @@ function renderFormals(formals, el) {
 
 // --- Randomize (now client-side) ---
 
-async function doRandomize() {
+// Re-randomize repeats whichever kind of roll came last.
+let balancedRolls = false;
+
+async function doRandomize(balanced = false) {
 	const raw = $('#names-input').value;
 	try {
 		const names = validateNames(raw);
 		$('#btn-randomize').disabled = true;
+		$('#btn-balanced').disabled = true;
+		let mafia = null;
+		if (balanced) {
+			// Mafia whose predicted win chance is nearest the target; the
+			// backend draws among near-ties, so repeated rolls still vary.
+			const [pick] = (await api('suggestAssignments', { names, k: 1 })).suggestions;
+			mafia = pick.mafia;
+			showToast(`Predicted mafia win chance: ${Math.round(pick.mafia_win_probability * 100)}%`, true);
+		}
 		await fillRandomPool(50);
 		$('#btn-randomize').disabled = false;
-		currentAssignments = randomize(names);
+		$('#btn-balanced').disabled = false;
+		balancedRolls = balanced;
+		currentAssignments = randomize(names, mafia);
 		currentFormals = randomizeFormals();
 		autoMatchNames();
 		renderEditableAssignments($('#assignments-list'));
@@ -564,6 +597,7 @@ async function doRandomize() {
 		saveState();
 	} catch (e) {
 		$('#btn-randomize').disabled = false;
+		$('#btn-balanced').disabled = false;
 		showToast(e.message);
 	}
 }
@@ -971,6 +1005,28 @@ function autoMatchNames() {
 	}
 }
 
+// --- Pre-game odds ---
+
+// Predicted mafia win chance for the current teams, shown under the role
+// reveal. Ghosts are left out: the backend pads them in as it rates games.
+async function showPregameOdds() {
+	const el = $('#pregame-odds');
+	el.classList.add('hidden');
+	if (gameMode === 'darkstars' || !SCRIPT_URL || !currentAssignments) return;
+	const real = currentAssignments.filter((a) => !a.is_ghost);
+	const mafia = real.filter((a) => a.role === 'Mafia').map((a) => a.name);
+	const town = real.filter((a) => a.role !== 'Mafia').map((a) => a.name);
+	if (!mafia.length || !town.length) return;
+	try {
+		const odds = await apiGet('predictGame', { mafia: mafia.join(','), town: town.join(',') });
+		const pct = Math.round(odds.mafia_win_probability * 100);
+		el.textContent = `Pre-game odds: Mafia ${pct}% · Town ${100 - pct}%`;
+		el.classList.remove('hidden');
+	} catch (e) {
+		console.warn('predictGame failed:', e.message);
+	}
+}
+
 // --- Accept & go to record panel ---
 
 function acceptAssignments() {
@@ -980,6 +1036,7 @@ function acceptAssignments() {
 	dayVotes = {};
 
 	$('#role-reveal-pre').textContent = generateRoleReveal();
+	showPregameOdds();
 	$('#nights-container').innerHTML = '';
 	addNightSection(0);
 	updateNightButtons();
@@ -1313,6 +1370,7 @@ function acceptManualSetup() {
 	dayVotes = {};
 
 	$('#role-reveal-pre').textContent = generateRoleReveal();
+	showPregameOdds();
 	$('#nights-container').innerHTML = '';
 	addNightSection(0);
 	updateNightButtons();
@@ -1347,6 +1405,8 @@ function doRetroEntry() {
 		$('#retro-mafia-counter').textContent = roleCounterText(retroRoleMap);
 		$('#retro-rated-preview').textContent = `${retroNames.filter(n => !isGhostEntry(n)).length} players will be rated`;
 		$('#btn-retro-submit').disabled = true;
+		$('#btn-retro-queue').disabled = true;
+		updateRetroQueueLabel();
 		saveState();
 	} catch (e) {
 		showToast(e.message);
@@ -1377,21 +1437,58 @@ function updateRetroForm() {
 	$('#retro-rated-preview').textContent = `${rated} players will be rated`;
 
 	const winner = document.querySelector('input[name="retro-winner"]:checked');
-	$('#btn-retro-submit').disabled = !(isRoleSelectionComplete(retroRoleMap) && winner);
+	const complete = isRoleSelectionComplete(retroRoleMap) && !!winner;
+	$('#btn-retro-submit').disabled = !complete;
+	$('#btn-retro-queue').disabled = !complete;
 }
 
-async function submitRetroGame() {
+// The game on the retro form, as a recordGame body; null if incomplete.
+function retroGame() {
 	const winner = document.querySelector('input[name="retro-winner"]:checked');
-	if (!winner || !isRoleSelectionComplete(retroRoleMap)) return;
-
-	const n0 = [...$$('#retro-n0-checks input:checked')].map((cb) => cb.value);
+	if (!winner || !isRoleSelectionComplete(retroRoleMap)) return null;
 
 	currentAssignments = buildAssignments(retroNames, retroRoleMap);
 	autoMatchNames();
+	return {
+		assignments: currentAssignments,
+		winner: winner.value,
+		night0_kills: [...$$('#retro-n0-checks input:checked')].map((cb) => cb.value),
+	};
+}
+
+// Park the game on the form and start the next one; the whole queue goes
+// to the backend as one recordGames write.
+function queueRetroGame() {
+	const game = retroGame();
+	if (!game) return;
+	retroQueue.push(game);
+	$('#retro-form').classList.add('hidden');
+	gameMode = 'randomize';
+	retroRoleMap = new Map();
+	retroNames = [];
+	$('#names-input').value = '';
+	updateRetroQueueLabel();
+	saveState();
+	showToast(`${retroQueue.length} past game(s) queued. Enter the next game's names.`, true);
+}
+
+function updateRetroQueueLabel() {
+	const n = retroQueue.length + 1;
+	$('#btn-retro-submit').textContent = n > 1 ? `Submit ${n} Games` : 'Submit Game';
+}
+
+async function submitRetroGame() {
+	const game = retroGame();
+	if (!game) return;
+	const games = [...retroQueue, game];
 
+	const summary = games.map((g, i) =>
+		`Game ${i + 1}: <strong>${g.winner} Win</strong>` +
+		(g.night0_kills.length ? ` (Night 0 kills: ${g.night0_kills.join(', ')})` : '')
+	);
 	const password = await confirmAction(
-		`Record past game: <strong>${winner.value} Win</strong>` +
-		(n0.length ? `<br>Night 0 kills: ${n0.join(', ')}` : '') +
+		`Record ${games.length > 1 ? `${games.length} past games, oldest first` : 'past game'}:<br>` +
+		summary.join('<br>') +
 		'<br><br>This will update the Google Sheet. Continue?',
 		true
 	);
@@ -1399,20 +1496,22 @@ async function submitRetroGame() {
 
 	$('#btn-retro-submit').disabled = true;
 	try {
-		const result = await api('recordGame', {
-			assignments: currentAssignments,
-			winner: winner.value,
-			night0_kills: n0,
-			password,
-		});
+		const { games: results } = await api('recordGames', { games, password });
+		const result = results[results.length - 1];
 
+		retroQueue = [];
+		updateRetroQueueLabel();
 		clearSavedState();
 		gameMode = 'randomize';
-		await loadPlayerNames();
+		await refreshPlayersAndLastGame();
 		renderResults(result);
 		showPanel('panel-results');
-		showToast(`Game ${result.game_id} recorded`, true);
-		loadLastGame();
+		showToast(
+			results.length > 1
+				? `Games ${results[0].game_id}–${result.game_id} recorded`
+				: `Game ${result.game_id} recorded`,
+			true
+		);
 	} catch (e) {
 		showToast(e.message);
 		$('#btn-retro-submit').disabled = false;
@@ -1431,6 +1530,46 @@ function updateRatedPreview() {
 	$('#btn-submit').disabled = !winner;
 
 	renderResultsExport();
+	scheduleOutcomePreview(n0);
+}
+
+// What each rated player stands to gain or lose under either result, from
+// previewGame. Debounced so typing a name sends one request; a response
+// that arrives after a newer request was sent is dropped.
+let outcomePreviewTimer = null;
+let outcomePreviewSeq = 0;
+
+function scheduleOutcomePreview(n0) {
+	clearTimeout(outcomePreviewTimer);
+	if (!SCRIPT_URL || gameMode === 'darkstars' || !currentAssignments) return;
+	outcomePreviewTimer = setTimeout(() => renderOutcomePreview(n0), 250);
+}
+
+async function renderOutcomePreview(n0) {
+	const seq = ++outcomePreviewSeq;
+	const block = $('#outcome-preview-block');
+	let preview;
+	try {
+		preview = await api('previewGame', { assignments: currentAssignments, night0_kills: n0 });
+	} catch (e) {
+		if (seq === outcomePreviewSeq) block.classList.add('hidden');
+		return;
+	}
+	if (seq !== outcomePreviewSeq) return;
+
+	const signed = (d) => (d > 0 ? `+${d}` : `${d}`);
+	const width = Math.max(6, ...preview.players.map((p) => p.name.length));
+	const lines = preview.players.map(
+		(p) => `${p.name.padEnd(width)}  ${p.team.padEnd(5)}  ${signed(p.mafia_win).padStart(5)}  ${signed(p.town_win).padStart(5)}`
+	);
+	const pct = Math.round(preview.mafia_win_probability * 100);
+	$('#outcome-preview').textContent = [
+		`${'Player'.padEnd(width)}  ${'Team'.padEnd(5)}  ${'Mafia'.padStart(5)}  ${'Town'.padStart(5)}`,
+		...lines,
+		'',
+		`Predicted mafia win chance: ${pct}%`,
+	].join('\n');
+	block.classList.remove('hidden');
 }
 
 // Tab-separated name/role/result table for pasting into an external
@@ -1554,11 +1693,10 @@ async function submitResults() {
 		});
 
 		clearSavedState();
-		await loadPlayerNames();
+		await refreshPlayersAndLastGame();
 		renderResults(result);
 		showPanel('panel-results');
 		showToast(`Game ${result.game_id} recorded`, true);
-		loadLastGame();
 	} catch (e) {
 		showToast(e.message);
 		$('#btn-submit').disabled = false;
@@ -1633,36 +1771,41 @@ function renderResults(result) {
 
 // --- Load last game ---
 
-async function loadLastGame() {
+function renderLastGameError() {
+	$('#last-game-content').textContent = 'Failed to load last game';
+	$('#btn-undo-last')?.classList.add('hidden');
+}
+
+function renderLastGame(data) {
 	const undoBtn = $('#btn-undo-last');
-	try {
-		const data = await api('getLastGame');
-		const container = $('#last-game-content');
-		if (!data.game) {
-			container.textContent = 'No games recorded yet';
-			undoBtn?.classList.add('hidden');
-			return;
-		}
+	const container = $('#last-game-content');
+	if (!data.game) {
+		lastGameId = null;
+		container.textContent = 'No games recorded yet';
+		undoBtn?.classList.add('hidden');
+		return;
+	}
+	lastGameId = data.game.game_id;
 
-		const medals = { 1: '\u{1F947}', 2: '\u{1F948}', 3: '\u{1F949}' };
-		const rankClass = (r) => {
-			if (r === 1) return 'rank-gold';
-			if (r === 2) return 'rank-silver';
-			if (r === 3) return 'rank-bronze';
-			if (r <= 15) return 'rank-top15';
-			return '';
-		};
+	const medals = { 1: '\u{1F947}', 2: '\u{1F948}', 3: '\u{1F949}' };
+	const rankClass = (r) => {
+		if (r === 1) return 'rank-gold';
+		if (r === 2) return 'rank-silver';
+		if (r === 3) return 'rank-bronze';
+		if (r <= 15) return 'rank-top15';
+		return '';
+	};
 
-		let html = `<p><strong>Game #${data.game.game_id}</strong></p>`;
-		html += `<table><thead><tr>
+	let html = `<p><strong>Game #${data.game.game_id}</strong></p>`;
+	html += `<table><thead><tr>
       <th>#</th><th>Player</th><th>Alignment</th><th>Result</th><th>${RATING_LABEL}</th><th>Change</th>
     </tr></thead><tbody>`;
 
-		for (const p of data.game.players) {
-			const alignClass = roleAlignmentClass(p.alignment);
-			const isExcluded = p.result === 'Ghost' || p.result === 'Night Zero';
-			if (isExcluded) {
-				html += `<tr class="excluded-row">
+	for (const p of data.game.players) {
+		const alignClass = roleAlignmentClass(p.alignment);
+		const isExcluded = p.result === 'Ghost' || p.result === 'Night Zero';
+		if (isExcluded) {
+			html += `<tr class="excluded-row">
         <td>-</td>
         <td>${p.player}</td>
         <td class="${alignClass}">${p.alignment}</td>
@@ -1670,13 +1813,13 @@ async function loadLastGame() {
         <td>-</td>
         <td>0</td>
       </tr>`;
-			} else {
-				const changeClass = p.rate_change >= 0 ? 'change-pos' : 'change-neg';
-				const resultClass = p.result === 'Win' ? 'change-pos' : 'change-neg';
-				const sign = p.rate_change >= 0 ? '+' : '';
-				const rank = playerRankMap.get(p.player) ?? '-';
-				const rc = typeof rank === 'number' ? rankClass(rank) : '';
-				html += `<tr>
+		} else {
+			const changeClass = p.rate_change >= 0 ? 'change-pos' : 'change-neg';
+			const resultClass = p.result === 'Win' ? 'change-pos' : 'change-neg';
+			const sign = p.rate_change >= 0 ? '+' : '';
+			const rank = playerRankMap.get(p.player) ?? '-';
+			const rc = typeof rank === 'number' ? rankClass(rank) : '';
+			html += `<tr>
         <td class="${rc}">${medals[rank] || rank}</td>
         <td>${p.player}</td>
         <td class="${alignClass}">${p.alignment}</td>
@@ -1684,15 +1827,11 @@ async function loadLastGame() {
         <td>${p.new_rating}</td>
         <td class="${changeClass}">${sign}${p.rate_change}</td>
       </tr>`;
-			}
 		}
-		html += '</tbody></table>';
-		container.innerHTML = html;
-		undoBtn?.classList.remove('hidden');
-	} catch (e) {
-		$('#last-game-content').textContent = 'Failed to load last game';
-		undoBtn?.classList.add('hidden');
 	}
+	html += '</tbody></table>';
+	container.innerHTML = html;
+	undoBtn?.classList.remove('hidden');
 }
 
 // --- Undo last game ---
@@ -1707,10 +1846,11 @@ async function undoLastGame() {
 	const btn = $('#btn-undo-last');
 	btn.disabled = true;
 	try {
-		const result = await api('undoLastGame', { password });
+		// Pin the game shown: if another host recorded one since, the
+		// backend refuses instead of undoing theirs.
+		const result = await api('undoLastGame', { password, game_id: lastGameId });
 		showToast(`Game ${result.undone_game_id} undone (${result.players_restored.length} players restored)`, true);
-		await loadPlayerNames();
-		await loadLastGame();
+		await refreshPlayersAndLastGame();
 	} catch (e) {
 		showToast(e.message);
 	} finally {
@@ -1751,18 +1891,32 @@ function newGame() {
 
 // --- Load player names ---
 
-async function loadPlayerNames() {
+function setPlayers(players) {
+	knownPlayers = players.map((p) => p.name);
+	const byRating = [...players].sort((a, b) => b.rating - a.rating);
+	playerRankMap = new Map();
+	byRating.forEach((p, i) => playerRankMap.set(p.name, i + 1));
+}
+
+// Player names and the last game in one getDashboard round trip. Returns
+// the last-game payload, or null if the request failed.
+async function loadPlayersAndLastGame() {
 	try {
-		const data = await api('getPlayers');
-		knownPlayers = data.players.map((p) => p.name);
-		const byRating = [...data.players].sort((a, b) => b.rating - a.rating);
-		playerRankMap = new Map();
-		byRating.forEach((p, i) => playerRankMap.set(p.name, i + 1));
+		const data = await apiGet('getDashboard', { fields: ['players', 'last_game'] });
+		setPlayers(data.players.players);
+		return data.last_game;
 	} catch (e) {
 		// Non-critical, autocomplete just won't work
+		return null;
 	}
 }
 
+async function refreshPlayersAndLastGame() {
+	const lastGame = await loadPlayersAndLastGame();
+	if (lastGame) renderLastGame(lastGame);
+	else renderLastGameError();
+}
+
 // --- Night Actions & Game Panel ---
 
 function getAlignment(name) {
@@ -3444,6 +3598,7 @@ function saveState() {
 	if (n0.length) state.n0Checks = n0;
 	const winRadio = $('input[name="winner"]:checked');
 	if (winRadio) state.winner = winRadio.value;
+	if (retroQueue.length) state.retroQueue = retroQueue;
 
 	if (gameMode === 'manual') {
 		state.manualRoleMap = [...manualRoleMap];
@@ -3536,6 +3691,7 @@ function rebuildGamePanel(savedNights, savedDayVotes) {
 		$('#btn-continue-record').textContent = 'End Game';
 	} else {
 		$('#role-reveal-pre').textContent = generateRoleReveal();
+		showPregameOdds();
 		$('#btn-continue-record').textContent = 'Continue to Record';
 	}
 	$('#nights-container').innerHTML = '';
@@ -3590,6 +3746,8 @@ async function restoreState() {
 		darkStarsSetup = state.darkStarsSetup || null;
 		oneShotTracker = state.oneShotTracker || {};
 		darkStarsNames = state.darkStarsNames || [];
+		retroQueue = state.retroQueue || [];
+		updateRetroQueueLabel();
 
 		// Restore Dark Stars setup panel
 		if (state.activePanel === 'panel-randomize' && gameMode === 'darkstars' && state.currentAssignments) {
@@ -3702,8 +3860,9 @@ async function restoreState() {
 
 document.addEventListener('DOMContentLoaded', () => {
 	$('#names-input').addEventListener('input', countNames);
-	$('#btn-randomize').addEventListener('click', doRandomize);
-	$('#btn-reroll').addEventListener('click', doRandomize);
+	$('#btn-randomize').addEventListener('click', () => doRandomize(false));
+	$('#btn-balanced').addEventListener('click', () => doRandomize(true));
+	$('#btn-reroll').addEventListener('click', () => doRandomize(balancedRolls));
 	$('#btn-accept').addEventListener('click', acceptAssignments);
 	$('#btn-autoroll')?.addEventListener('click', autorollFormals);
 	$('#btn-dice').addEventListener('click', async () => {
@@ -3765,8 +3924,11 @@ document.addEventListener('DOMContentLoaded', () => {
 		gameMode = 'randomize';
 		retroRoleMap = new Map();
 		retroNames = [];
+		retroQueue = [];
+		updateRetroQueueLabel();
 		saveState();
 	});
+	$('#btn-retro-queue').addEventListener('click', queueRetroGame);
 	$('#btn-retro-submit').addEventListener('click', submitRetroGame);
 	$$('input[name="retro-winner"]').forEach((r) => {
 		r.addEventListener('change', () => {
@@ -3791,8 +3953,10 @@ document.addEventListener('DOMContentLoaded', () => {
 	$('#btn-darkstars-reroll')?.addEventListener('click', rerollDarkStarsSetup);
 	$('#btn-darkstars-accept')?.addEventListener('click', acceptDarkStarsSetup);
 
-	loadPlayerNames().then(async () => {
+	loadPlayersAndLastGame().then(async (lastGame) => {
 		const restored = await restoreState();
-		if (!restored) loadLastGame();
+		if (restored) return;
+		if (lastGame) renderLastGame(lastGame);
+		else renderLastGameError();
 	});
 });
@@ -0,0 +1,67 @@
+"""Rating-balanced mafia picks for a lobby.
+
+suggest() scores every way of choosing the mafia from the real players
+(C(13,3) = 286 up to C(15,3) = 455 splits) in one batched
+rating_engine.predict_mafia_win call, with the same ghost padding a
+recorded game is rated under. It returns the k splits whose predicted mafia
+win probability is closest to the target, drawn uniformly at random from
+every split within TIE of the k-th closest, so near-equivalent setups stay
+unpredictable. Seats, power roles and ghosts are left to the randomizer.
+
+Run `python balance.py` for the time per 15-player lobby.
+"""
+
+import functools
+import itertools
+
+import numpy as np
+
+import rating_engine
+
+# Splits whose distance to the target is within this of the k-th closest
+# are interchangeable; suggestions are drawn at random among them.
+TIE = 0.01
+
+
+@functools.lru_cache(maxsize=16)
+def _splits(n_players: int, n_mafia: int) -> tuple[np.ndarray, np.ndarray]:
+    """(mafia, town) index arrays, one row per way of choosing the mafia."""
+    mafia = np.array(
+        list(itertools.combinations(range(n_players), n_mafia)), dtype=np.intp
+    )
+    member = np.zeros((len(mafia), n_players), dtype=bool)
+    member[np.arange(len(mafia))[:, None], mafia] = True
+    town = np.nonzero(~member)[1].reshape(len(mafia), n_players - n_mafia)
+    return mafia, town
+
+
+def suggest(mu, sigma, cfg, target, k=5, n_mafia=3, tie=TIE, rng=None):
+    """[(mafia indices, P(mafia wins))] for k splits, closest to target first."""
+    mu = np.asarray(mu, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    mafia, town = _splits(len(mu), n_mafia)
+    p = rating_engine.predict_mafia_win(
+        mu[mafia], sigma[mafia], mu[town], sigma[town], cfg
+    )
+    gap = np.abs(p - target)
+    k = max(1, min(k, len(p)))
+    order = np.argsort(gap, kind="stable")
+    pool = order[gap[order] <= gap[order[k - 1]] + tie]
+    rng = rng if rng is not None else np.random.default_rng()
+    pick = rng.choice(pool, size=k, replace=False)
+    pick = pick[np.argsort(gap[pick], kind="stable")]
+    return [(mafia[i].tolist(), float(p[i])) for i in pick]
+
+
+if __name__ == "__main__":
+    import timeit
+
+    rng = np.random.default_rng(0)
+    mu = rng.normal(25, 3, 15)
+    sigma = rng.uniform(1, 8.33, 15)
+    suggest(mu, sigma, rating_engine.MAIN, 0.56)  # warm the split cache
+    n = 200
+    t = timeit.timeit(
+        lambda: suggest(mu, sigma, rating_engine.MAIN, 0.56, rng=rng), number=n
+    )
+    print(f"suggest(): {t / n * 1e3:.2f} ms per 15-player lobby (455 splits)")
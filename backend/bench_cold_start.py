@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Cold-start import budget for the Cloud Function entry point.
+
+Imports main in a fresh interpreter under `python -X importtime`, once per
+STORAGE, with functions_framework already loaded (the framework imports
+itself before it loads main, so its cost is not ours to cut) and the
+backend's bytecode compiled first. Reports the median cumulative time of
+`import main` over REPEATS runs and fails if
+
+  - it exceeds BUDGET_MS, or
+  - main pulled in a module its storage does not need at import: gspread /
+    google-auth, google-cloud-storage and numpy are all deferred to first
+    use (HEAVY below).
+
+Usage: python bench_cold_start.py [--repeats N] [--budget-ms MS]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent
+
+# Generous for a cold gen2 instance; main measures ~6 ms locally.
+BUDGET_MS = 50.0
+
+STORAGES = ("sheets", "gcs_json", "gcs_eventlog")
+
+HEAVY = ("numpy", "gspread", "google.oauth2", "google.cloud.storage", "scipy", "trueskill")
+
+_PROBE = (
+    "import sys, functions_framework, main; "
+    "print(' '.join(m for m in {heavy!r} if m in sys.modules))"
+)
+
+
+def import_main(storage: str) -> tuple[float, list[str]]:
+    """(ms spent importing main, heavy modules loaded) in a fresh process."""
+    env = dict(os.environ, STORAGE=storage)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(heavy=HEAVY)],
+        cwd=BACKEND,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    us = None
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == "main":
+            us = int(parts[1])
+    if us is None:
+        raise RuntimeError(f"no importtime line for main:\n{proc.stderr[-2000:]}")
+    return us / 1000, proc.stdout.split()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeats", type=int, default=7)
+    ap.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = ap.parse_args()
+
+    subprocess.run([sys.executable, "-m", "compileall", "-q", str(BACKEND)], check=True)
+    print(f"{'STORAGE':<14}{'import main (ms)':>18}  heavy modules loaded")
+    print("-" * 56)
+    failed = False
+    for storage in STORAGES:
+        runs = [import_main(storage) for _ in range(args.repeats)]
+        ms = statistics.median(t for t, _ in runs)
+        heavy = sorted({m for _, loaded in runs for m in loaded})
+        over = ms > args.budget_ms
+        failed |= over or bool(heavy)
+        flag = "  OVER BUDGET" if over else ""
+        print(f"{storage:<14}{ms:>18.1f}  {', '.join(heavy) or '-'}{flag}")
+
+    print(f"\nbudget: {args.budget_ms:.0f} ms, no heavy imports")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""gcs_json blob size and load time against history length.
+
+Builds a synthetic season of GAMES games (13 rated players plus two ghosts
+per game, ratings carried forward the way record_game writes them) for each
+length, then reports for format 1 (indented JSON, every cell a string) and
+format 2 (typed columns, gzip):
+
+  - the stored blob size (format 2 also uncompressed),
+  - decode_doc(typed=True) time, i.e. what a cold instance spends turning
+    the downloaded bytes into tabs (MatchHistory as a History), and
+    encode_doc() time, what every flush() spends before the upload.
+
+Times are the best of REPEATS runs.
+
+Usage: python bench_json_blob.py [--games 100,500,2000,5000] [--repeats N]
+"""
+
+import argparse
+import gzip
+import random
+import time
+
+import json_store
+
+_HISTORY_HEADER = [
+    "GameID", "Player", "Alignment", "Result", "RateChange", "OldMu", "NewMu",
+    "NewSigma", "OldRating", "NewRating", "OldSigma",
+]
+_RATINGS_HEADER = ["Player", "Mu", "Sigma", "Rating", "Games"]
+
+
+def synthetic_doc(n_games: int, n_players: int = 60, seed: int = 0) -> dict:
+    """A {"tabs": ...} doc shaped like a real season, newest game first."""
+    rng = random.Random(seed)
+    names = [f"Player {i:02d}" for i in range(n_players)]
+    state = {n: [25.0, 25 / 3, 0] for n in names}
+    history = []
+    for gid in range(1, n_games + 1):
+        lobby = rng.sample(names, 13)
+        mafia_won = rng.random() < 0.45
+        rows = []
+        for i, name in enumerate(lobby):
+            mu, sigma, _ = s = state[name]
+            team = "Mafia" if i < 3 else "Town"
+            won = (team == "Mafia") == mafia_won
+            new_mu = mu + rng.gauss(0, 1) + (0.8 if won else -0.8)
+            new_sigma = max(1.0, sigma * 0.97)
+            old_rating = round((mu - 1.5 * sigma) * 68)
+            new_rating = round((new_mu - 1.5 * new_sigma) * 68)
+            s[:] = [new_mu, new_sigma, s[2] + 1]
+            rows.append([
+                gid, name, team, "Win" if won else "Loss", new_rating - old_rating,
+                mu, new_mu, new_sigma, old_rating, new_rating, sigma,
+            ])
+        rows += [[gid, f"Ghost {g}", "Town", "Ghost", 0, "", "", "", "", "", ""] for g in (1, 2)]
+        history[:0] = [[json_store._stringify(v) for v in r] for r in rows]
+    ratings = [
+        [n, repr(mu), repr(sigma), str(round((mu - 1.5 * sigma) * 68)), str(g)]
+        for n, (mu, sigma, g) in state.items()
+        if g
+    ]
+    return {"tabs": {
+        "MatchHistory": [_HISTORY_HEADER, *history],
+        "MatchRatings": [_RATINGS_HEADER, *ratings],
+    }}
+
+
+def best(fn, repeats: int) -> float:
+    """Fastest of `repeats` calls, in ms."""
+    times = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times) * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--games", default="100,500,2000,5000")
+    ap.add_argument("--repeats", type=int, default=5)
+    args = ap.parse_args()
+
+    print(
+        f"{'games':>6} {'rows':>7} | {'v1 KB':>8} {'decode':>8} {'encode':>8} |"
+        f" {'v2 KB':>7} {'(raw)':>8} {'decode':>8} {'encode':>8} | {'size':>5}"
+    )
+    print("-" * 96)
+    for n in (int(g) for g in args.games.split(",")):
+        doc = synthetic_doc(n)
+        v1, _ = json_store.encode_doc(doc, 1)
+        v2, _ = json_store.encode_doc(doc, 2)
+        assert json_store.decode_doc(v1) == json_store.decode_doc(v2) == doc
+        held = json_store.decode_doc(v2, typed=True)  # what flush() encodes
+        raw = len(gzip.decompress(v2))
+        rows = len(doc["tabs"]["MatchHistory"]) - 1
+        print(
+            f"{n:>6} {rows:>7} |"
+            f" {len(v1) / 1024:>8.0f}"
+            f" {best(lambda: json_store.decode_doc(v1, typed=True), args.repeats):>6.1f}ms"
+            f" {best(lambda: json_store.encode_doc(held, 1), args.repeats):>6.1f}ms |"
+            f" {len(v2) / 1024:>7.0f} {raw / 1024:>7.0f}K"
+            f" {best(lambda: json_store.decode_doc(v2, typed=True), args.repeats):>6.1f}ms"
+            f" {best(lambda: json_store.encode_doc(held, 2), args.repeats):>6.1f}ms |"
+            f" {len(v1) / len(v2):>4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
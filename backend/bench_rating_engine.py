@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Benchmark rating_engine backends in games/second.
+
+Replays the current season's MatchHistory from Elo Mafia Rankings.xlsx
+(every game, chronologically, from fresh ratings) REPEATS times through
+compute_trueskill for each backend, then times rate_arrays on one batch of
+BATCH same-shaped 3-vs-10 games to show the throughput of the NumPy path when many games are rated at once.
+
+Usage: python bench_rating_engine.py [--repeats N] [--batch N]
+"""
+
+import argparse
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+
+import rating_engine
+
+XLSX = Path(__file__).resolve().parent.parent / "Elo Mafia Rankings.xlsx"
+
+
+def load_rosters():
+    """[(mafia_names, town_names, mafia_won)] oldest game first."""
+    wb = openpyxl.load_workbook(XLSX, data_only=True, read_only=True)
+    games = defaultdict(list)
+    for row in wb["MatchHistory"].iter_rows(min_row=2, values_only=True):
+        if row[0] and row[3] in ("Win", "Loss"):
+            games[int(row[0])].append(row)
+    rosters = []
+    for gid in sorted(games):
+        rows = games[gid]
+        mafia = [r[1] for r in rows if r[2] == "Mafia"]
+        town = [r[1] for r in rows if r[2] != "Mafia"]
+        mafia_won = any(r[2] == "Mafia" and r[3] == "Win" for r in rows)
+        rosters.append((mafia, town, mafia_won))
+    return rosters
+
+
+def replay(rosters, cfg, backend):
+    ratings = {}
+    prior = {"mu": rating_engine.PRIOR_MU, "sigma": rating_engine.PRIOR_SIGMA}
+    for mafia, town, mafia_won in rosters:
+        m = [{"name": n, **ratings.get(n, prior)} for n in mafia]
+        t = [{"name": n, **ratings.get(n, prior)} for n in town]
+        ratings.update(
+            rating_engine.compute_trueskill(m, t, mafia_won, cfg, backend=backend)
+        )
+    return ratings
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeats", type=int, default=20)
+    ap.add_argument("--batch", type=int, default=100_000)
+    args = ap.parse_args()
+
+    cfg = rating_engine.EGO
+    rosters = load_rosters()
+    print(f"Replay of {len(rosters)} games × {args.repeats} repeats "
+          f"({cfg.label})\n")
+    print(f"{'backend':<12}{'games/s':>14}{'µs/game':>12}")
+    print("-" * 38)
+    for backend in rating_engine.BACKENDS:
+        replay(rosters, cfg, backend)  # warm-up (imports, caches)
+        t0 = time.perf_counter()
+        for _ in range(args.repeats):
+            replay(rosters, cfg, backend)
+        dt = time.perf_counter() - t0
+        n = len(rosters) * args.repeats
+        print(f"{backend:<12}{n / dt:>14,.0f}{1e6 * dt / n:>12.1f}")
+
+    rng = np.random.default_rng(0)
+    b = args.batch
+    m_mu = rng.normal(25, 3, (b, 3))
+    t_mu = rng.normal(25, 3, (b, 10))
+    m_sigma = rng.uniform(5, 8.3, (b, 3))
+    t_sigma = rng.uniform(5, 8.3, (b, 10))
+    won = rng.random(b) < 0.5
+    rating_engine.rate_arrays(m_mu[:10], m_sigma[:10], t_mu[:10], t_sigma[:10],
+                              won[:10], cfg)
+    t0 = time.perf_counter()
+    rating_engine.rate_arrays(m_mu, m_sigma, t_mu, t_sigma, won, cfg)
+    dt = time.perf_counter() - t0
+    print(f"{'numpy batch':<12}{b / dt:>14,.0f}{1e6 * dt / b:>12.3f}"
+          f"   ({b:,} games in one rate_arrays call)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Read handler CPU against history length, on a warm gcs_json instance.
+
+Stores bench_json_blob.synthetic_doc(GAMES) in a fake bucket, loads it once
+(as a warm instance would have), then times getStats, getLastGame,
+getMatchHistory (all games, and one page), getPlayerHistory and
+getDashboard. Each is the best of REPEATS calls, each call with a fresh
+request handle (a metadata lookup, no download).
+
+Usage: python bench_reads.py [--games 100,500,2000,5000] [--repeats N]
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("STORAGE", "gcs_json")
+os.environ.setdefault("JSON_BUCKET", "bench")
+
+import fake_gcs  # noqa: E402
+import json_store  # noqa: E402
+import main  # noqa: E402
+from bench_json_blob import synthetic_doc  # noqa: E402
+
+HANDLERS = {
+    "getStats": main.get_stats,
+    "getLastGame": main.get_last_game,
+    "getMatchHistory": lambda: main.get_match_history({}),
+    "  (page of 20)": lambda: main.get_match_history({"limit": 20}),
+    "getPlayerHistory": lambda: main.get_player_history({"player_name": "Player 07"}),
+    "getDashboard": lambda: main.get_dashboard({}),
+}
+
+
+def best(fn, repeats: int) -> float:
+    """Fastest of `repeats` calls, in ms."""
+    times = []
+    for _ in range(repeats):
+        main._reset_storage_state()
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times) * 1e3
+
+
+def run():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--games", default="100,500,2000,5000")
+    ap.add_argument("--repeats", type=int, default=5)
+    args = ap.parse_args()
+    games = [int(g) for g in args.games.split(",")]
+
+    store = fake_gcs.FakeStore()
+    json_store._storage_client = fake_gcs.FakeClient(store)
+    results = {}
+    for n in games:
+        store.put(os.environ.get("JSON_OBJECT", "mafia.json"), json_store.encode_doc(synthetic_doc(n))[0])
+        main._reset_storage_state()
+        main.get_stats()  # load into the warm cache
+        results[n] = {name: best(fn, args.repeats) for name, fn in HANDLERS.items()}
+
+    print(f"{'ms per call':<18}" + "".join(f"{f'{n} games':>13}" for n in games))
+    print("-" * (18 + 13 * len(games)))
+    for name in HANDLERS:
+        print(f"{name:<18}" + "".join(f"{results[n][name]:>13.2f}" for n in games))
+
+
+if __name__ == "__main__":
+    run()
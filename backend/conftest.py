@@ -0,0 +1,18 @@
+"""pytest setup for the smoke-test scripts (test_*.py).
+
+Each script runs at import, after setting its own STORAGE and patching
+main / json_store / event_store, so pytest gives each one a fresh import of
+the backend modules: no script sees another's STORAGE, factories or caches.
+"""
+
+import sys
+
+import pytest
+
+_BACKEND = ("main", "event_store", "json_store", "sheets_plan", "rerate", "balance")
+
+
+def pytest_collectstart(collector):
+    if isinstance(collector, pytest.Module):
+        for name in _BACKEND:
+            sys.modules.pop(name, None)
@@ -0,0 +1,293 @@
+"""Append-only event log storage (STORAGE=gcs_eventlog).
+
+Same gspread-style interface as json_store, but a write never re-uploads the
+whole document. Each request that changes anything (a recorded game, an
+undo) appends one small immutable event object holding the worksheet ops it
+performed:
+
+    <prefix>events/0000000042.json
+        {"seq": 42, "ops": [{"op": "insert_rows", "tab": "MatchHistory",
+                             "args": [[[...row...], ...], 2]}, ...]}
+
+MatchRatings / MatchHistory are the fold of those ops, applied with the very
+same JsonWorksheet methods that produced them, over a snapshot:
+
+    <prefix>snapshot.json   {"seq": 40, "tabs": {...}}  (json_store's format)
+
+Event objects are created with if_generation_match=0, so two writers racing
+for the same seq cannot both succeed; the loser's flush raises
+json_store.WriteConflict, which main.py answers by replaying the request
+against the new tail. Once the tail behind the snapshot
+reaches COMPACT_EVERY events, the writer folds it into a new snapshot and
+deletes the folded events, so a cold read folds at most COMPACT_EVERY
+events. A deleted seq can be created again, so a writer whose fold predates
+a compaction would write an event below the new snapshot that no reader
+folds: flush() checks the snapshot after its upload and turns that case
+into a WriteConflict too. When no snapshot exists yet, the log starts from
+the gcs_json document (JSON_OBJECT) if there is one, which makes switching
+an existing deployment over a config change.
+
+Warm instances keep the folded doc in json_store's module-scope cache (keyed
+by seq instead of GCS generation) and only list events newer than it, after
+checking that the snapshot it was folded from is still the current one.
+"""
+
+import json
+import os
+
+from json_store import (
+    JsonSpreadsheet,
+    JsonWorksheet,
+    WriteConflict,
+    _doc_cache,
+    _download_doc,
+    _precondition_failed,
+    _stringify,
+    _summary_cache,
+    _upload_doc,
+)
+
+# Snapshot once this many events sit behind the current snapshot.
+COMPACT_EVERY = int(os.environ.get("EVENTLOG_COMPACT_EVERY", "50"))
+
+_SEQ_WIDTH = 10
+
+# cache key -> (seq, GCS generation) of the snapshot the cached doc was
+# folded from
+_snapshots: dict[tuple[str, str], tuple[int, int]] = {}
+
+
+def _not_found(e: Exception) -> bool:
+    # google.api_core.exceptions.NotFound is HTTP 404.
+    return getattr(e, "code", None) == 404
+
+
+class EventLogWorksheet(JsonWorksheet):
+    """JsonWorksheet that also records each mutation as an event op."""
+
+    def append_row(self, row, value_input_option: str | None = None) -> None:
+        if self.title != "Stats Summary":
+            self._parent._log("append_row", self.title, [_stringify(v) for v in row])
+        super().append_row(row, value_input_option)
+
+    def insert_rows(self, rows, row: int = 1, value_input_option: str | None = None) -> None:
+        if self.title != "Stats Summary":
+            self._parent._log(
+                "insert_rows", self.title, [[_stringify(v) for v in r] for r in rows], row
+            )
+        super().insert_rows(rows, row, value_input_option)
+
+    def delete_rows(self, start: int, end: int | None = None) -> None:
+        if self.title != "Stats Summary":
+            self._parent._log("delete_rows", self.title, start, end)
+        super().delete_rows(start, end)
+
+    def update(self, a1: str, values, value_input_option: str | None = None) -> None:
+        if self.title != "Stats Summary":
+            self._parent._log(
+                "update", self.title, a1, [[_stringify(v) for v in r] for r in values]
+            )
+        super().update(a1, values, value_input_option)
+
+
+class EventLogSpreadsheet(JsonSpreadsheet):
+    """gspread.Spreadsheet stand-in backed by a snapshot + event log in GCS."""
+
+    def __init__(
+        self,
+        bucket_name: str,
+        prefix: str,
+        client=None,
+        seed_object: str | None = None,
+    ):
+        super().__init__(bucket_name, prefix + "snapshot.json", client=client)
+        self._prefix = prefix
+        self._seed_object = seed_object
+        self._cache_key = (bucket_name, prefix)
+        self._snapshot = 0  # seq the current fold started from
+        self._snapshot_gen = 0  # its GCS generation (0: no snapshot yet)
+        self._pending: list[dict] = []
+
+    def _event_name(self, seq: int) -> str:
+        return f"{self._prefix}events/{seq:0{_SEQ_WIDTH}d}.json"
+
+    # --- load ---
+
+    def _snapshot_blob(self):
+        """snapshot.json's metadata, None if there is no snapshot yet."""
+        return self._bucket.get_blob(self._blob_name)
+
+    def _load_snapshot(self, blob=None) -> None:
+        blob = blob if blob is not None else self._snapshot_blob()
+        if blob is not None:
+            doc = _download_doc(blob)
+            self._snapshot = doc.pop("seq", 0)
+            self._snapshot_gen = blob.generation
+        else:
+            seed = self._seed_object and self._bucket.get_blob(self._seed_object)
+            doc = _download_doc(seed) if seed else {"tabs": {}}
+            self._snapshot = self._snapshot_gen = 0
+        self._doc, self._generation = doc, self._snapshot
+        self._shared = False
+        self._owned = set(doc.get("tabs", {}))  # just downloaded: ours alone
+        self._counts = self._summary = self._players = None
+
+    def _tail(self, after: int) -> list:
+        """Event blobs with seq > after, oldest first."""
+        blobs = self._bucket.list_blobs(
+            prefix=f"{self._prefix}events/", start_offset=self._event_name(after + 1)
+        )
+        return sorted(blobs, key=lambda b: b.name)
+
+    def _ensure_loaded(self) -> None:
+        if self._doc is not None:
+            return
+        cached = _doc_cache.get(self._cache_key)
+        snapshot = self._snapshot_blob()
+        if cached is not None and _snapshots[self._cache_key][1] == (
+            snapshot.generation if snapshot is not None else 0
+        ):
+            self._generation, self._doc = cached
+            self._snapshot, self._snapshot_gen = _snapshots[self._cache_key]
+            self._shared = True
+            derived = _summary_cache.get(self._cache_key)
+            if derived is not None and derived[0] == self._generation:
+                _, self._counts, self._summary = derived
+        else:
+            # Cold, or another instance compacted since the cached fold:
+            # the events it folded may be gone, so start from its snapshot.
+            self._load_snapshot(snapshot)
+
+        tail = self._tail(self._generation)
+        if tail and tail[0].name != self._event_name(self._generation + 1):
+            # Compacted past our fold point: restart from the newer snapshot.
+            self._load_snapshot()
+            tail = self._tail(self._generation)
+        if not tail and self._shared:
+            return
+
+        for blob in tail:
+            self._apply(json.loads(blob.download_as_text()))
+        self._dirty = False
+        self._publish()
+
+    def _apply(self, event: dict) -> None:
+        for op in event["ops"]:
+            if op["op"] == "add_worksheet":
+                JsonSpreadsheet.add_worksheet(self, op["tab"])
+                continue
+            ws = JsonWorksheet(self, op["tab"])
+            getattr(ws, op["op"])(*op["args"])
+        self._generation = event["seq"]
+
+    def _publish(self) -> None:
+        _doc_cache[self._cache_key] = (self._generation, self._doc)
+        _snapshots[self._cache_key] = (self._snapshot, self._snapshot_gen)
+        if self._counts is not None:
+            _summary_cache[self._cache_key] = (
+                self._generation, self._counts, self._summary
+            )
+        self._shared = True
+
+    def version(self) -> int:
+        """Seq of the last event folded in. Listing the tail is unavoidable
+        here, so this loads (from the warm cache when possible)."""
+        self._ensure_loaded()
+        return self._generation
+
+    # --- write ---
+
+    def _log(self, op: str, tab: str, *args) -> None:
+        self._ensure_loaded()
+        self._pending.append({"op": op, "tab": tab, "args": list(args)})
+
+    def flush(self) -> None:
+        if not self._dirty or not self._pending:
+            return
+        seq = self._generation + 1
+        body = json.dumps({"seq": seq, "ops": self._pending}, ensure_ascii=False)
+        event = self._bucket.blob(self._event_name(seq))
+        try:
+            event.upload_from_string(
+                body, content_type="application/json", if_generation_match=0
+            )
+        except Exception as e:
+            if _precondition_failed(e):
+                raise WriteConflict(f"event {seq} was written by another request") from e
+            raise
+        self._check_not_compacted(seq, event)
+        self._generation = seq
+        self._pending = []
+        self._dirty = False
+        self._publish()
+        if seq - self._snapshot >= COMPACT_EVERY:
+            self.compact()
+
+    def _check_not_compacted(self, seq: int, event) -> None:
+        """Raise WriteConflict if event `seq`, just created, is at or below
+        the current snapshot: a compaction deleted the seq it took, so no
+        reader will ever fold it. The event is deleted again."""
+        snapshot = self._snapshot_blob()
+        gen = snapshot.generation if snapshot is not None else 0
+        if gen == self._snapshot_gen:
+            return
+        # Rare (a compaction since this fold): read the snapshot's seq.
+        compacted = _download_doc(snapshot).get("seq", 0)
+        if compacted < seq:
+            # Folded from an older snapshot, but nothing was missed.
+            self._snapshot, self._snapshot_gen = compacted, gen
+            return
+        event.delete()
+        raise WriteConflict(f"event {seq} is behind snapshot seq {compacted}")
+
+    def compact(self) -> None:
+        """Fold the tail into a new snapshot and delete the folded events.
+
+        The snapshot upload is conditional on the snapshot this fold started
+        from, so a slower compactor can never replace a newer snapshot (whose
+        events may already be deleted) with an older one.
+        """
+        self._ensure_loaded()
+        seq = self._generation
+        blob = self._bucket.blob(self._blob_name)
+        try:
+            _upload_doc(blob, {"seq": seq, **self._doc}, if_generation_match=self._snapshot_gen)
+        except Exception as e:
+            if _precondition_failed(e):
+                return  # another writer compacted first; its snapshot is as good
+            raise
+        blob.reload()
+        self._snapshot, self._snapshot_gen = seq, blob.generation
+        _snapshots[self._cache_key] = (self._snapshot, self._snapshot_gen)
+        for old in self._bucket.list_blobs(
+            prefix=f"{self._prefix}events/", end_offset=self._event_name(seq + 1)
+        ):
+            try:
+                old.delete()
+            except Exception as e:
+                if not _not_found(e):  # else a concurrent compaction got it first
+                    raise
+
+    # --- gspread.Spreadsheet API ---
+
+    def add_worksheet(
+        self, title: str, rows: int = 0, cols: int = 0, index: int | None = None
+    ) -> EventLogWorksheet:
+        ws = super().add_worksheet(title, rows, cols, index)
+        self._log("add_worksheet", title)
+        return ws
+
+    def worksheet(self, name: str) -> EventLogWorksheet:
+        if name != "Stats Summary":
+            self._tab(name)  # raises WorksheetNotFound
+        return EventLogWorksheet(self, name)
+
+
+def get_event_log_spreadsheet(
+    bucket: str | None = None, prefix: str | None = None
+) -> EventLogSpreadsheet:
+    bucket = bucket or os.environ["JSON_BUCKET"]
+    prefix = prefix if prefix is not None else os.environ.get("EVENTLOG_PREFIX", "eventlog/")
+    return EventLogSpreadsheet(
+        bucket, prefix, seed_object=os.environ.get("JSON_OBJECT", "mafia.json")
+    )
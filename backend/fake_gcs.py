@@ -0,0 +1,120 @@
+"""In-memory stand-in for the slice of google-cloud-storage the stores use.
+
+Shared by test_json_store.py and test_event_store.py. Generations behave
+like GCS: every write bumps the object's generation and if_generation_match
+(0 = "must not exist") preconditions raise on mismatch.
+"""
+
+
+class PreconditionFailed(Exception):
+    """google.api_core.exceptions.PreconditionFailed, as far as the stores
+    look at it."""
+
+    code = 412
+
+
+class NotFound(Exception):
+    """google.api_core.exceptions.NotFound, likewise."""
+
+    code = 404
+
+
+class FakeBlob:
+    def __init__(self, store, name):
+        self._store = store
+        self._name = name
+        self.name = name
+        self.generation = 0
+        self.content_encoding = None
+
+    def exists(self):
+        return self._name in self._store._data
+
+    def reload(self):
+        self.generation = self._store.get_generation(self._name)
+
+    def download_as_bytes(self, raw_download=False, if_generation_match=None):
+        """The stored bytes; gzip content is never transcoded here, as with
+        raw_download=True on GCS."""
+        if (
+            if_generation_match is not None
+            and if_generation_match != self._store.get_generation(self._name)
+        ):
+            raise PreconditionFailed("generation precondition failed")
+        self._store.downloads += 1
+        data = self._store.get(self._name) or b""
+        return data.encode() if isinstance(data, str) else data
+
+    def download_as_text(self, if_generation_match=None):
+        return self.download_as_bytes(if_generation_match=if_generation_match).decode()
+
+    def upload_from_string(self, body, content_type=None, if_generation_match=None):
+        if (
+            if_generation_match is not None
+            and if_generation_match != self._store.get_generation(self._name)
+        ):
+            raise PreconditionFailed("generation precondition failed")
+        self._store.put(self._name, body)
+        self.generation = self._store.get_generation(self._name)
+
+    def delete(self):
+        self._store.delete(self._name)
+
+
+class FakeBucket:
+    def __init__(self, store):
+        self._store = store
+
+    def blob(self, name):
+        return FakeBlob(self._store, name)
+
+    def get_blob(self, name):
+        blob = FakeBlob(self._store, name)
+        if not blob.exists():
+            return None
+        blob.reload()
+        return blob
+
+    def list_blobs(self, prefix="", start_offset=None, end_offset=None):
+        self._store.lists += 1
+        names = sorted(n for n in self._store._data if n.startswith(prefix))
+        return [
+            self.get_blob(n)
+            for n in names
+            if (start_offset is None or n >= start_offset)
+            and (end_offset is None or n < end_offset)
+        ]
+
+
+class FakeStore:
+    def __init__(self):
+        self._data = {}
+        self._gen = {}
+        self._next_gen = 0
+        self.downloads = 0
+        self.lists = 0
+
+    def get(self, name):
+        return self._data.get(name)
+
+    def get_generation(self, name):
+        return self._gen.get(name, 0)
+
+    def put(self, name, body):
+        self._next_gen += 1
+        self._data[name] = body
+        self._gen[name] = self._next_gen
+
+    def delete(self, name):
+        if name not in self._data:
+            raise NotFound(name)
+        del self._data[name]
+        del self._gen[name]
+
+
+class FakeClient:
+    def __init__(self, store):
+        self._store = store
+
+    def bucket(self, _name):
+        return FakeBucket(self._store)
@@ -5,6 +5,9 @@ Reads game data from the Excel export, applies name corrections, re-simulates
 all games with the backend TrueSkill logic, and writes corrected data back to
 Google Sheets.
 
+For new corrections prefer the backend's editGame action, which fixes one
+game at a time and re-rates only the games it affects (rerate.py).
+
 Usage:
     python fix_names.py          # dry-run (print changes only)
     python fix_names.py --apply  # apply changes to Google Sheets
@@ -18,19 +21,14 @@ from collections import defaultdict
 import gspread
 import openpyxl
 from google.oauth2.service_account import Credentials
-from trueskill import TrueSkill, Rating
+
+import rating_engine
 
 # --- TrueSkill config (matches backend/main.py) ---
 
 TRUESKILL_MU = 25.0
 TRUESKILL_SIGMA = 25 / 3
-MAFIA_GHOST_MU = 25.7
-MAFIA_GHOST_SIGMA = 0.8
-TOWN_GHOST_MU = 23.85
-TOWN_GHOST_SIGMA = 0.8
-
-env = TrueSkill(tau=0.1, beta=5.5, draw_probability=0.00)
-env.make_as_global()
+RATING_CONFIG = rating_engine.MAIN
 
 SHEET_ID = "1vTc6XAa4beDM4n1syQ22Hs10JGVT9PuHNSoTmY051CQ"
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
@@ -71,42 +69,10 @@ def display_rating(mu, sigma):
 
 
 def compute_backend(mafia_players, town_players, mafia_won):
-    """Backend TrueSkill logic (from simulate_all_games.py / main.py)."""
-    n_mafia = len(mafia_players)
-    n_town = len(town_players)
-
-    mafia_dict = {}
-    mu_geo = 1.0
-    sigma_geo = 1.0
-    for p in mafia_players:
-        mafia_dict[p["name"]] = Rating(p["mu"], p["sigma"])
-        mu_geo *= p["mu"]
-        sigma_geo *= p["sigma"]
-
-    mu_avg = mu_geo ** (1 / n_mafia)
-    sigma_avg = sigma_geo ** (1 / n_mafia)
-    for i in range(n_town - n_mafia):
-        mafia_dict[f"_mafia_avg{i}"] = Rating(mu_avg, sigma_avg)
-    for i in range(n_town):
-        mafia_dict[f"_mafia_ghost{i}"] = Rating(MAFIA_GHOST_MU, MAFIA_GHOST_SIGMA)
-
-    town_dict = {}
-    for p in town_players:
-        town_dict[p["name"]] = Rating(p["mu"], p["sigma"])
-    for i in range(n_town):
-        town_dict[f"_town_ghost{i}"] = Rating(TOWN_GHOST_MU, TOWN_GHOST_SIGMA)
-
-    ranks = [0, 1] if mafia_won else [1, 0]
-    rated = env.rate([mafia_dict, town_dict], ranks=ranks)
-
-    result = {}
-    for p in mafia_players:
-        r = rated[0][p["name"]]
-        result[p["name"]] = {"mu": r.mu, "sigma": r.sigma}
-    for p in town_players:
-        r = rated[1][p["name"]]
-        result[p["name"]] = {"mu": r.mu, "sigma": r.sigma}
-    return result
+    """Backend TrueSkill logic (main.py compute_trueskill via rating_engine)."""
+    return rating_engine.compute_trueskill(
+        mafia_players, town_players, mafia_won, RATING_CONFIG
+    )
 
 
 def load_games(xlsx_path):
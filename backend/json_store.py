@@ -1,6 +1,7 @@
 """GCS-backed JSON spreadsheet that mimics the gspread interface.
 
-The whole spreadsheet is one JSON object in a Cloud Storage bucket:
+The whole spreadsheet is one JSON object in a Cloud Storage bucket. In
+format 1, the original layout, each tab is a list of rows:
 
     {
       "tabs": {
@@ -9,29 +10,109 @@ The whole spreadsheet is one JSON object in a Cloud Storage bucket:
       }
     }
 
-All cells are stored as strings to match gspread's get_all_values() return
-shape. Writes are deferred — the dispatcher calls .flush() once per request
+with every cell a string, matching gspread's get_all_values() shape. In
+memory the rows are tuples, and MatchHistory is a History instead: typed
+parallel columns (game ids and ratings in array('i'), mu / sigma in
+array('d'), interned names, all oldest row first so recording a game
+appends) that reads and writes like that list of rows, so main.py's read
+handlers can aggregate over the columns without parsing cells.
+
+Format 2, what flush() writes, stores each tab column by column, with
+numbers as JSON numbers wherever the string round-trips exactly. It is
+unindented and gzip-compressed (Content-Encoding: gzip):
+
+    {"v": 2, "tabs": {"MatchHistory": {"header": [...], "n": 1234,
+                                       "types": "isss...",
+                                       "cols": [[46, 46, ...], ["P1", ...]]}}}
+
+decode_doc() reads either format, so an existing blob converts on its first
+write (or with migrate_json_blob.py). JSON_WRITE_FORMAT=1 keeps writing
+format 1 while older instances that can only read it are still serving.
+
+Writes are deferred — the dispatcher calls .flush() once per request
 so a multi-step handler (e.g. record_game) is a single atomic upload.
 
 "Stats Summary" is computed on read from MatchHistory + MatchRatings;
-writes to it are no-ops because it's regenerated each time.
+writes to it are no-ops. The computed rows are memoized until the next
+write, and the per-player counts behind them follow MatchHistory row
+inserts/deletes incrementally.
+
+Parsed documents are cached in module scope, keyed by GCS generation, so a
+warm Cloud Function instance only does a metadata lookup per request and
+re-downloads only when the blob changed. The cached doc is shared
+read-only; the first write in a request works on a private copy, which
+becomes the cached doc once flush() uploads it.
+
+Only the tabs a request writes are copied, on their first write, and a
+History copy shares its columns with the original while it only appends
+or drops its newest rows, so recording or undoing a game costs O(game)
+before the upload.
+
+get_all_values() copies nothing either: it returns a RowsView, a read-only
+sequence over the tab's (immutable) rows. A tab lent out that way is copied
+before the next write to it, so a view keeps showing the tab as it was
+read. Callers that edit what they read ask for view.copy().
 """
 
+import gzip
 import json
 import os
 import re
+from array import array
+from collections.abc import MutableSequence, Sequence
 from typing import Any
 
+FORMAT_VERSION = 2
+WRITE_FORMAT = int(os.environ.get("JSON_WRITE_FORMAT", FORMAT_VERSION))
+
 
 class WorksheetNotFound(Exception):
     pass
 
 
+class WriteConflict(Exception):
+    """A flush lost its generation precondition to a concurrent writer.
+    Nothing was written; reload and re-apply the change to retry."""
+
+
+def _precondition_failed(e: Exception) -> bool:
+    # google.api_core.exceptions.PreconditionFailed is HTTP 412.
+    return getattr(e, "code", None) == 412
+
+
+# (bucket, object) -> (generation, parsed doc). Survives across requests on
+# a warm instance; entries are replaced, never mutated.
+_doc_cache: dict[tuple[str, str], tuple[int, dict]] = {}
+
+# (bucket, object) -> (generation, per-player history counts, Stats Summary
+# rows or None). Same lifetime rules as _doc_cache.
+_summary_cache: dict[tuple[str, str], tuple[int, dict, list | None]] = {}
+
+# (bucket, object) -> (generation, player -> MatchHistory row offsets). Same
+# lifetime rules as _doc_cache.
+_player_index_cache: dict[tuple[str, str], tuple[int, dict[str, list[int]]]] = {}
+
+
+def _copy_tab(rows):
+    """A tab's rows, copied so writes to the copy don't reach rows. The rows
+    themselves are tuples, so they are shared; a History shares its columns
+    until it changes more than its newest rows (see History)."""
+    return rows.copy() if isinstance(rows, History) else list(rows)
+
+
+_storage_client = None
+
+
 def _default_storage_client():
+    """One storage.Client per process, reused by every request: building it
+    resolves credentials and the project, which is too slow to repeat."""
     # Imported lazily so tests can inject a fake client without pulling
     # in google-cloud-storage (and its cryptography dep) at module load.
-    from google.cloud import storage
-    return storage.Client()
+    global _storage_client
+    if _storage_client is None:
+        from google.cloud import storage
+        _storage_client = storage.Client()
+    return _storage_client
 
 
 _A1_RE = re.compile(r"^([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?$")
@@ -67,6 +148,669 @@ def _stringify(v: Any) -> str:
     return str(v)
 
 
+# --- MatchHistory as typed columns ---
+
+BLANK = -(2**31)  # an empty cell in one of History's int columns
+_NAN = float("nan")  # ... and in its float ones
+
+# MatchHistory columns A-K: GameID, Player, Alignment, Result, RateChange,
+# OldMu, NewMu, NewSigma, OldRating, NewRating, OldSigma. "i": array('i'),
+# "f": array('d'), "s": ids into History.strings.
+_HISTORY_KINDS = "isssifffiif"
+_HISTORY_WIDTH = len(_HISTORY_KINDS)
+_HISTORY_COLUMNS = (
+    "game", "player", "alignment", "result", "rate_change", "old_mu", "new_mu",
+    "new_sigma", "old_rating", "new_rating", "old_sigma",
+)
+
+
+def _parse_cell(kind: str, cell):
+    """(typed value, exact) for one cell of an "i" or "f" column. exact is
+    False when the value would not format back to the same string; the
+    value is then int(float(cell)) / float(cell), or blank if neither."""
+    blank = BLANK if kind == "i" else _NAN
+    if cell == "":
+        return blank, True
+    try:
+        v = float(cell)
+    except (TypeError, ValueError):
+        return blank, False
+    if v - v != 0:  # inf, nan
+        return blank, False
+    if kind == "f":
+        return v, repr(v) == cell
+    if not BLANK < v < -BLANK:
+        return blank, False
+    return int(v), str(int(v)) == cell
+
+
+def _typed_column(kind: str, cells: list) -> tuple[array, list[int]]:
+    """(cells as an "i" / "f" array, offsets of the inexact ones)."""
+    # One conversion over the whole column first; only a column that fails
+    # it is read cell by cell.
+    try:
+        if kind == "i":
+            values = [int(c) if c else BLANK for c in cells]
+            if ["" if v == BLANK else str(v) for v in values] == cells:
+                return array("i", values), []
+        else:
+            values = [float(c) if c else _NAN for c in cells]
+            if ["" if v != v else repr(v) for v in values] == cells and all(
+                v - v == 0 for v in values if v == v
+            ):
+                return array("d", values), []
+    except (TypeError, ValueError, OverflowError):
+        pass
+    out, inexact = array("i" if kind == "i" else "d"), []
+    for k, cell in enumerate(cells):
+        v, exact = _parse_cell(kind, cell)
+        out.append(v)
+        if not exact:
+            inexact.append(k)
+    return out, inexact
+
+
+class History(MutableSequence):
+    """The MatchHistory tab as typed parallel columns.
+
+    It stands in for the tab's list of rows: h[i] is row i in sheet order
+    (the header at 0, then newest game first) as a tuple of strings, and
+    slicing, insert, del and item / slice assignment work as on a list, so
+    JsonWorksheet and the event log handle it like any other tab.
+
+    Underneath, the body is stored oldest row first, so recording a game
+    (rows inserted at sheet row 2) appends to the columns and undoing it
+    truncates them, whatever the history's length. Each column is an
+    array: `game`, `rate_change`, `old_rating` and `new_rating` are
+    array('i') (BLANK when empty), `old_mu`, `new_mu`, `new_sigma` and
+    `old_sigma` array('d') (NaN when empty), and `player`, `alignment` and
+    `result` hold ids into `strings`. Sheet-order row i is column index
+    column_index(i), i.e. len(h) - 1 - i; handlers aggregate over the
+    columns without parsing a cell.
+
+    Rows are formatted from the columns when first read, then kept. A row
+    whose strings would not come back from its typed values ("46.0", a
+    short row) is kept as given, and its typed values are the nearest
+    reading of it. The header is kept as given.
+
+    copy() is O(game), not O(history): the copy reads its first column
+    indexes from the original's storage (`_base`, frozen from then on) and
+    keeps only what it appends. Appending and dropping the newest rows, as
+    recording and undoing a game do, keep it that way; reading a column
+    attribute or any other change first gives it columns of its own
+    (_own()).
+    """
+
+    def __init__(self, rows=()):
+        self.strings: list = []
+        self._ids: dict = {}
+        self._header: tuple | None = None  # None: the tab has no rows at all
+        self._cols = [array("d" if k == "f" else "i") for k in _HISTORY_KINDS]
+        self._raw = bytearray()  # 1: row kept as given, see class doc
+        self._rows: list[tuple | None] = []
+        self._base: tuple | None = None  # another History's (cols, raw, rows)
+        self._nb = 0  # column indexes read from _base; _cols etc. hold the rest
+        self._lent = False  # some copy's _base is this one's storage
+        self._bind()
+        rows = [tuple(r) for r in rows]
+        if rows:
+            self._header = rows[0]
+            self._append(rows[:0:-1])
+
+    def _bind(self) -> None:
+        self.__dict__.update(zip(_HISTORY_COLUMNS, self._cols))
+
+    @classmethod
+    def _from_columns(cls, header, cols: list, n: int) -> "History":
+        """From format 2 columns (sheet order) whose types match
+        _HISTORY_KINDS, so every body row is exact and formatted on demand."""
+        h = cls([header])
+        for kind, col, new in zip(_HISTORY_KINDS, h._cols, cols):
+            if kind == "s":
+                col.extend(h._intern_all(new))
+            elif kind == "i":
+                col.extend([BLANK if v is None else v for v in new])
+            else:  # decode_doc leaves floats as their JSON text
+                col.extend([_NAN if v is None else float(v) for v in new])
+            col.reverse()
+        h._raw.extend(bytes(n))
+        h._rows.extend([None] * n)
+        return h
+
+    def __getattr__(self, name):
+        # Only reached for a column of a copy still reading _base: the
+        # attribute is a whole array, so give the copy its own.
+        if name in _HISTORY_COLUMNS:
+            self._own()
+            return getattr(self, name)
+        raise AttributeError(name)
+
+    def copy(self) -> "History":
+        """A History to change independently; see the class doc."""
+        new = History.__new__(History)
+        new.strings, new._ids = list(self.strings), dict(self._ids)
+        new._header = self._header
+        if self._base is not None:  # share the same base, copy the tail
+            new._base, new._nb = self._base, self._nb
+            new._cols = [col[:] for col in self._cols]
+            new._raw, new._rows = bytearray(self._raw), list(self._rows)
+        else:
+            new._base, new._nb = (self._cols, self._raw, self._rows), len(self._rows)
+            new._cols = [array(col.typecode) for col in self._cols]
+            new._raw, new._rows = bytearray(), []
+            self._lent = True
+        new._lent = False
+        return new
+
+    def _own(self) -> None:
+        """Give this History column storage nobody else reads: merge in
+        the _base prefix, or copy storage a copy() is reading."""
+        if self._base is None and not self._lent:
+            return
+        cols, raw, rows = self._cols, self._raw, self._rows
+        if self._base is not None:
+            n = self._nb
+            base_cols, base_raw, base_rows = self._base
+            cols = [b[:n] + col for b, col in zip(base_cols, cols)]
+            raw, rows = base_raw[:n] + raw, base_rows[:n] + rows
+        else:
+            cols = [col[:] for col in cols]
+            raw, rows = bytearray(raw), list(rows)
+        self._cols, self._raw, self._rows = cols, raw, rows
+        self._base, self._nb, self._lent = None, 0, False
+        self._bind()
+
+    def _n(self) -> int:
+        """Number of body rows (column indexes)."""
+        return self._nb + len(self._rows)
+
+    def _intern_all(self, cells) -> list[int]:
+        ids, out = self._ids, []
+        for s in cells:
+            i = ids.get(s)
+            if i is None:
+                i = ids[s] = len(self.strings)
+                self.strings.append(s)
+            out.append(i)
+        return out
+
+    def _parse(self, rows: list) -> tuple[list[array], bytearray]:
+        """Typed columns for rows (interning into strings), and raw flags."""
+        raw = bytearray(len(rows))
+        padded = rows
+        if any(len(r) != _HISTORY_WIDTH for r in rows):
+            padded = []
+            for k, r in enumerate(rows):
+                if len(r) != _HISTORY_WIDTH:
+                    raw[k] = 1
+                    r = (list(r) + [""] * _HISTORY_WIDTH)[:_HISTORY_WIDTH]
+                padded.append(r)
+        cols = []
+        columns = zip(*padded) if padded else [()] * _HISTORY_WIDTH
+        for kind, cells in zip(_HISTORY_KINDS, columns):
+            if kind == "s":
+                cols.append(array("i", self._intern_all(cells)))
+                continue
+            col, inexact = _typed_column(kind, list(cells))
+            for k in inexact:
+                raw[k] = 1
+            cols.append(col)
+        return cols, raw
+
+    def _splice(self, start: int, stop: int, rows: list) -> None:
+        """Replace column indexes start:stop with rows (oldest first)."""
+        if start < self._nb or self._lent:
+            self._own()
+        start, stop = start - self._nb, stop - self._nb
+        cols, raw = self._parse(rows)
+        for col, new in zip(self._cols, cols):
+            col[start:stop] = new
+        self._raw[start:stop] = raw
+        self._rows[start:stop] = rows
+
+    def _append(self, rows: list) -> None:
+        n = self._n()
+        self._splice(n, n, rows)
+
+    def _format(self, cols: list, j: int) -> tuple:
+        out = []
+        for kind, col in zip(_HISTORY_KINDS, cols):
+            v = col[j]
+            if kind == "s":
+                out.append(self.strings[v])
+            elif kind == "i":
+                out.append("" if v == BLANK else str(v))
+            else:
+                out.append("" if v != v else repr(v))
+        return tuple(out)
+
+    def _row(self, i: int) -> tuple:
+        """Sheet-order row i (0 <= i < len(self))."""
+        if i == 0:
+            return self._header
+        j = self._n() - i
+        if j < self._nb:  # formatting into _base's cache is harmless
+            cols, _, rows = self._base
+        else:
+            cols, rows, j = self._cols, self._rows, j - self._nb
+        row = rows[j]
+        if row is None:
+            row = rows[j] = self._format(cols, j)
+        return row
+
+    def _span(self, i) -> tuple[int, int]:
+        """Sheet-order (start, stop) of an index or a contiguous slice."""
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("History only takes contiguous slices")
+            return start, max(start, stop)
+        i = range(len(self))[i]  # IndexError like a list
+        return i, i + 1
+
+    # --- list of rows, in sheet order ---
+
+    def __len__(self) -> int:
+        return 0 if self._header is None else self._n() + 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._row(k) for k in range(*i.indices(len(self)))]
+        return self._row(range(len(self))[i])
+
+    def __iter__(self):
+        return (self._row(k) for k in range(len(self)))
+
+    def __setitem__(self, i, rows) -> None:
+        start, stop = self._span(i)
+        rows = [tuple(r) for r in (rows if isinstance(i, slice) else [rows])]
+        if start == 0:
+            # The header moves (or the tab is empty): rare, so rebuild.
+            every = list(self)
+            every[start:stop] = rows
+            self.__init__(every)
+            return
+        # Sheet rows start:stop are column indexes n-stop+1 : n-start+1.
+        n = self._n()
+        self._splice(n - stop + 1, n - start + 1, rows[::-1])
+
+    def __delitem__(self, i) -> None:
+        start, stop = self._span(i)
+        if start == 0:
+            every = list(self)
+            del every[start:stop]
+            self.__init__(every)
+            return
+        n = self._n()
+        start, stop = n - stop + 1, n - start + 1
+        if start < self._nb and stop == n and not self._lent:
+            # The newest rows, reaching into _base: read less of it.
+            self._nb = start
+            self._cols = [array(col.typecode) for col in self._cols]
+            self._raw, self._rows = bytearray(), []
+            return
+        if start < self._nb or self._lent:
+            self._own()
+        start, stop = start - self._nb, stop - self._nb
+        for col in self._cols:
+            del col[start:stop]
+        del self._raw[start:stop]
+        del self._rows[start:stop]
+
+    def insert(self, i: int, row) -> None:
+        self[i:i] = [row]
+
+    # --- typed access ---
+
+    def column_index(self, i: int) -> int:
+        """Column index of sheet-order row i (1: the newest game's first row)."""
+        return self._n() - i
+
+    def column_range(self, start: int = 1, stop: int | None = None) -> range:
+        """Column indexes of sheet-order rows start:stop (default: the whole
+        body), newest first."""
+        n = self._n()
+        stop = n + 1 if stop is None else stop
+        return range(n - start, n - stop, -1)
+
+    def string_id(self, s: str) -> int | None:
+        """s's id in the string columns, None if no row has held it."""
+        return self._ids.get(s)
+
+    def labels(self):
+        """(game id, player, alignment, result) for each body row in sheet
+        order, the id an int (BLANK when empty) and the rest strings."""
+        s = self.strings
+        return zip(
+            reversed(self.game),
+            [s[i] for i in reversed(self.player)],
+            [s[i] for i in reversed(self.alignment)],
+            [s[i] for i in reversed(self.result)],
+        )
+
+    def _encode(self) -> dict | None:
+        """This tab in format 2 straight from the columns, or None if a body
+        row is kept as given (then the caller encodes the rows)."""
+        if self._base is not None:
+            self._own()  # encoding reads every column anyway
+        if not self._rows or 1 in self._raw:
+            return None
+        cols = []
+        for kind, col in zip(_HISTORY_KINDS, self._cols):
+            col = col[::-1]  # sheet order
+            if kind == "s":
+                s = self.strings
+                cols.append([s[v] for v in col])
+            elif kind == "i":
+                cols.append([None if v == BLANK else v for v in col])
+            else:
+                cols.append([None if v != v else v for v in col])
+        return {
+            "header": list(self._header),
+            "n": len(self._rows),
+            "types": _HISTORY_KINDS,
+            "cols": cols,
+        }
+
+
+# --- storage format ---
+
+_TEXT = object()  # a cell that is not stored as a number
+
+
+def _number(cell: str):
+    """The JSON number a cell is stored as, None for "", or _TEXT when the
+    string would not come back exactly (e.g. "007", "1e5", names)."""
+    if cell == "":
+        return None
+    try:
+        v = int(cell)
+    except ValueError:
+        try:
+            v = float(cell)
+        except ValueError:
+            return _TEXT
+        # v - v == 0 rules out inf and nan, which JSON cannot hold
+        return v if v - v == 0 and repr(v) == cell else _TEXT
+    return v if str(v) == cell else _TEXT
+
+
+def _encode_column(cells: list[str]) -> tuple[str, list]:
+    """(type code, stored column): "i" / "f" for a column of ints / floats,
+    "n" for a mix, "s" for the strings themselves. None stands for ""."""
+    # Whole-column int / float conversions first: one exception per column
+    # instead of one per cell. Mixed ones fall through to cell by cell.
+    for code, kind, text in (("i", int, str), ("f", float, repr)):
+        try:
+            out = [kind(c) if c else None for c in cells]
+        except ValueError:
+            continue
+        if ["" if v is None else text(v) for v in out] == cells and (
+            kind is int or all(v is None or v - v == 0 for v in out)
+        ):
+            return code, out
+    out = []
+    for cell in cells:
+        v = _number(cell)
+        if v is _TEXT:
+            return "s", cells
+        out.append(v)
+    return "n", out
+
+
+def _encode_tab(rows: list[list[str]]) -> dict:
+    if isinstance(rows, History):
+        tab = rows._encode()
+        if tab is not None:
+            return tab
+        rows = list(rows)
+    if not rows:
+        return {}
+    body = rows[1:]
+    width = max((len(r) for r in body), default=0)
+    ragged = any(len(r) != width for r in body)
+    if ragged:
+        body = [(*r, *[""] * (width - len(r))) for r in body]
+    types, cols = "", []
+    for col in zip(*body):
+        code, col = _encode_column(list(col))
+        types += code
+        cols.append(col)
+    tab = {"header": list(rows[0]), "n": len(body), "types": types, "cols": cols}
+    if ragged:
+        tab["widths"] = [len(r) for r in rows[1:]]
+    return tab
+
+
+def _decode_column(code: str, col: list) -> list[str]:
+    # decode_doc parses floats straight to their text (which is repr()),
+    # so only "" for None and the ints are left to convert.
+    if code == "s":
+        return col
+    if code == "f":
+        return ["" if v is None else v for v in col] if None in col else col
+    return ["" if v is None else v if type(v) is str else str(v) for v in col]
+
+
+def _decode_tab(tab: dict, row=list) -> list:
+    """A format 2 tab's rows, each built by row (tuple for the stores)."""
+    if not tab:
+        return []
+    cols = [_decode_column(code, col) for code, col in zip(tab["types"], tab["cols"])]
+    if cols:
+        rows = list(zip(*cols)) if row is tuple else [row(r) for r in zip(*cols)]
+    else:
+        rows = [row() for _ in range(tab["n"])]
+    if "widths" in tab:
+        rows = [r[:w] for r, w in zip(rows, tab["widths"])]
+    return [row(tab["header"]), *rows]
+
+
+def _decode_history(tab: dict) -> History:
+    types = tab.get("types", "")
+    fits = "widths" not in tab and len(types) == _HISTORY_WIDTH and all(
+        code == kind or all(v is None for v in col)
+        for code, kind, col in zip(types, _HISTORY_KINDS, tab["cols"])
+    )
+    if fits:
+        try:
+            return History._from_columns(tab["header"], tab["cols"], tab["n"])
+        except OverflowError:
+            pass  # an id or rating beyond array('i'): read it row by row
+    return History(_decode_tab(tab))
+
+
+def encode_doc(doc: dict, version: int | None = None) -> tuple[bytes, str | None]:
+    """(blob body, Content-Encoding) for doc in the given format (default
+    WRITE_FORMAT). Keys other than "tabs" (the event log's "seq") are kept."""
+    version = WRITE_FORMAT if version is None else version
+    if version == 1:
+        tabs = {name: list(rows) for name, rows in doc.get("tabs", {}).items()}
+        doc = {**doc, "tabs": tabs}
+        return json.dumps(doc, indent=2, ensure_ascii=False).encode(), None
+    if version != 2:
+        raise ValueError(f"unknown JSON format {version}")
+    out = {"v": 2, **{k: v for k, v in doc.items() if k != "tabs"}}
+    out["tabs"] = {name: _encode_tab(rows) for name, rows in doc.get("tabs", {}).items()}
+    text = json.dumps(out, separators=(",", ":"), ensure_ascii=False)
+    # Level 4: a fifth of the default 9's time for ~6% more bytes.
+    return gzip.compress(text.encode(), compresslevel=4, mtime=0), "gzip"
+
+
+def decode_doc(data: bytes | str, typed: bool = False) -> dict:
+    """The in-memory doc ({"tabs": {name: rows of strings}}) from a blob body
+    in either format, gzipped or not. Empty means no tabs yet. typed=True
+    returns the tabs as the stores hold them: rows as tuples, MatchHistory
+    as a History."""
+    if isinstance(data, bytes):
+        if data[:2] == b"\x1f\x8b":
+            data = gzip.decompress(data)
+        data = data.decode()
+    if not data:
+        return {"tabs": {}}
+    # Floats come back as their JSON text, which is how cells hold them.
+    doc = json.loads(data, parse_float=str)
+    version = doc.pop("v", 1)
+    tabs = doc.get("tabs", {})
+    if version == 1:
+        if typed:
+            doc["tabs"] = {
+                name: History(rows) if name == "MatchHistory" else [tuple(r) for r in rows]
+                for name, rows in tabs.items()
+            }
+        return doc
+    if version != 2:
+        raise ValueError(f"JSON format {version} is newer than this code reads")
+    doc["tabs"] = {
+        name: _decode_history(tab) if typed and name == "MatchHistory"
+        else _decode_tab(tab, tuple if typed else list)
+        for name, tab in tabs.items()
+    }
+    return doc
+
+
+def _download_doc(blob) -> dict:
+    # raw_download: the stored (gzipped) bytes, not GCS's transcoding.
+    return decode_doc(
+        blob.download_as_bytes(raw_download=True, if_generation_match=blob.generation),
+        typed=True,
+    )
+
+
+def _upload_doc(blob, doc: dict, **kwargs) -> None:
+    body, encoding = encode_doc(doc)
+    blob.content_encoding = encoding
+    blob.upload_from_string(body, content_type="application/json", **kwargs)
+
+
+_SUMMARY_HEADER = [
+    "Player",
+    "Town Games",
+    "Town Wins",
+    "Town Win %",
+    "Mafia Games",
+    "Mafia Wins",
+    "Mafia Win %",
+    "Total Games",
+    "Total Win %",
+    "mu",
+    "sigma",
+    "Rating",
+]
+
+_NO_GAMES = {"town_games": 0, "town_wins": 0, "mafia_games": 0, "mafia_wins": 0}
+
+
+def _count_history(per: dict, rows, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) MatchHistory rows from per-player counts."""
+    for row in rows:
+        if len(row) < 4 or not row[1]:
+            continue
+        name, role, result = row[1], row[2], row[3]
+        if result not in ("Win", "Loss"):
+            continue
+        e = per.setdefault(name, dict(_NO_GAMES))
+        if role == "Mafia":
+            e["mafia_games"] += sign
+            if result == "Win":
+                e["mafia_wins"] += sign
+        else:
+            e["town_games"] += sign
+            if result == "Win":
+                e["town_wins"] += sign
+
+
+def build_player_index(history) -> dict[str, list[int]]:
+    """Player -> offsets of their rows in MatchHistory (header included, so
+    offset 0 is never used), in sheet order (newest game first). history is
+    a History or the tab's rows."""
+    index: dict[str, list[int]] = {}
+    if isinstance(history, History):
+        for i, (gid, name, _, _) in enumerate(history.labels(), start=1):
+            if gid != BLANK:
+                index.setdefault(name, []).append(i)
+        return index
+    for i, row in enumerate(history[1:], start=1):
+        if len(row) > 1 and row[0]:
+            index.setdefault(row[1], []).append(i)
+    return index
+
+
+def _build_summary(per: dict, ratings: list) -> list[tuple]:
+    rows = [tuple(_SUMMARY_HEADER)]
+    for r in ratings[1:]:
+        if len(r) < 3 or not r[0]:
+            continue
+        name = r[0]
+        try:
+            mu = float(r[1])
+            sigma = float(r[2])
+        except (ValueError, IndexError):
+            continue
+        s = per.get(name, _NO_GAMES)
+        total_games = s["town_games"] + s["mafia_games"]
+        total_wins = s["town_wins"] + s["mafia_wins"]
+        rating = round((mu - 1.5 * sigma) * 68)
+        town_pct = (100 * s["town_wins"] / s["town_games"]) if s["town_games"] else 0
+        mafia_pct = (100 * s["mafia_wins"] / s["mafia_games"]) if s["mafia_games"] else 0
+        total_pct = (100 * total_wins / total_games) if total_games else 0
+        rows.append((
+            name,
+            str(s["town_games"]),
+            str(s["town_wins"]),
+            f"{town_pct:.1f}%",
+            str(s["mafia_games"]),
+            str(s["mafia_wins"]),
+            f"{mafia_pct:.1f}%",
+            str(total_games),
+            f"{total_pct:.1f}%",
+            repr(mu),
+            repr(sigma),
+            str(rating),
+        ))
+    rows[1:] = sorted(rows[1:], key=lambda r: int(r[11]), reverse=True)
+    return rows
+
+
+class RowsView(Sequence):
+    """A tab's rows, read-only and uncopied: what get_all_values() returns.
+
+    Indexing and iteration read the tab itself, and its rows are tuples, so
+    nothing handed out can change it; a slice is a list of those rows. The
+    view equals the list of lists gspread would have returned. copy() is
+    the mutable snapshot, for callers that edit what they read.
+    """
+
+    __slots__ = ("_rows",)
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        return self._rows[i]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (RowsView, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            list(a) == list(b) for a, b in zip(self, other)
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"RowsView({len(self)} rows)"
+
+    def copy(self) -> list[list[str]]:
+        return [list(r) for r in self._rows]
+
+
 class JsonWorksheet:
     def __init__(self, parent: "JsonSpreadsheet", title: str):
         self._parent = parent
@@ -76,7 +820,7 @@ class JsonWorksheet:
     def id(self) -> int:
         return 0  # only used in sheets-specific copyPaste, harmless
 
-    def _data(self) -> list[list[str]]:
+    def _data(self) -> list[tuple]:
         if self.title == "Stats Summary":
             return self._parent._stats_summary()
         return self._parent._tab(self.title)
@@ -86,15 +830,23 @@ class JsonWorksheet:
             row.append("")
         return row
 
-    def get_all_values(self) -> list[list[str]]:
-        return [list(r) for r in self._data()]
+    def get_all_values(self) -> RowsView:
+        """Every row, as a read-only view of the tab (see RowsView); call
+        .copy() on it for lists to edit."""
+        if self.title == "Stats Summary":
+            return RowsView(self._parent._stats_summary())  # rebuilt, never edited
+        return RowsView(self._parent._lend(self.title))
+
+    def _writable(self) -> list[tuple]:
+        return self._parent._writable_tab(self.title)
 
     def append_row(self, row, value_input_option: str | None = None) -> None:
-        data = self._data()
         if self.title == "Stats Summary":
             return  # computed virtual tab — ignore writes
-        data.append([_stringify(v) for v in row])
-        self._parent._mark_dirty()
+        data = self._writable()
+        new = tuple(_stringify(v) for v in row)
+        data.append(new)
+        self._parent._mark_dirty(self.title, added=[new])
 
     def append_rows(self, rows, value_input_option: str | None = None) -> None:
         for r in rows:
@@ -103,11 +855,14 @@ class JsonWorksheet:
     def insert_rows(self, rows, row: int = 1, value_input_option: str | None = None) -> None:
         if self.title == "Stats Summary":
             return
-        data = self._data()
+        data = self._writable()
         insert_at = max(0, row - 1)
-        for i, r in enumerate(rows):
-            data.insert(insert_at + i, [_stringify(v) for v in r])
-        self._parent._mark_dirty()
+        new = [tuple(_stringify(v) for v in r) for r in rows]
+        data[insert_at:insert_at] = new
+        if insert_at == 0:
+            self._parent._mark_dirty(self.title)  # header moved: recount
+        else:
+            self._parent._mark_dirty(self.title, added=new)
 
     def delete_rows(self, start: int, end: int | None = None) -> None:
         if self.title == "Stats Summary":
@@ -117,24 +872,36 @@ class JsonWorksheet:
         e = (end - 1) if end is not None else s
         if s < 0 or e >= len(data) or s > e:
             return
+        data = self._writable()
+        removed = data[s : e + 1]
         del data[s : e + 1]
-        self._parent._mark_dirty()
+        if s == 0:
+            self._parent._mark_dirty(self.title)  # header moved: recount
+        else:
+            self._parent._mark_dirty(self.title, removed=removed)
 
     def update(self, a1: str, values, value_input_option: str | None = None) -> None:
         if self.title == "Stats Summary":
             return
         row_s, row_e, col_s, col_e = _parse_a1(a1)
-        data = self._data()
+        data = self._writable()
         width = col_e - col_s + 1
+        touched = range(row_s, min(row_s + len(values), len(data)))
+        removed = [data[i] for i in touched]
         for ri, row_vals in enumerate(values):
             target_row = row_s + ri
             while target_row >= len(data):
-                data.append([])
-            self._ensure_min_cols(data[target_row], col_e + 1)
+                data.append(())
+            new = self._ensure_min_cols(list(data[target_row]), col_e + 1)
             for ci in range(width):
                 v = row_vals[ci] if ci < len(row_vals) else ""
-                data[target_row][col_s + ci] = _stringify(v)
-        self._parent._mark_dirty()
+                new[col_s + ci] = _stringify(v)
+            data[target_row] = tuple(new)
+        if row_s == 0:
+            self._parent._mark_dirty(self.title)  # header touched: recount
+        else:
+            added = data[row_s : row_s + len(values)]
+            self._parent._mark_dirty(self.title, added=added, removed=removed)
 
     def sort(self, *args, **kwargs) -> None:
         # Sheets-only sort op. Skip; data ordering for the JSON backend
@@ -147,6 +914,19 @@ class JsonWorksheet:
             return list(data[n - 1])
         return []
 
+    def col_values(self, col: int) -> list[str]:
+        return [r[col - 1] if len(r) >= col else "" for r in self._data()]
+
+    def get_values(self, range_name: str | None = None) -> list[list[str]]:
+        """Cells of an A1 range (whole sheet if None), padded like gspread."""
+        if range_name is None:
+            return self.get_all_values()
+        row_s, row_e, col_s, col_e = _parse_a1(range_name)
+        return [
+            self._ensure_min_cols(list(r), col_e + 1)[col_s : col_e + 1]
+            for r in self._data()[row_s : row_e + 1]
+        ]
+
 
 class JsonSpreadsheet:
     """gspread.Spreadsheet stand-in backed by a single GCS JSON object."""
@@ -155,127 +935,186 @@ class JsonSpreadsheet:
         self._client = client if client is not None else _default_storage_client()
         self._bucket = self._client.bucket(bucket_name)
         self._blob_name = object_name
+        self._cache_key = (bucket_name, object_name)
         self._doc: dict | None = None
         self._generation: int | None = None
+        self._head_blob = None  # metadata lookup, memoized by _head()
+        self._shared = False  # True while self._doc is the cached object
+        self._owned: set[str] = set()  # tabs only this instance holds; see _writable_tab
         self._dirty = False
+        # Stats Summary inputs/outputs for self._doc; see _stats_summary.
+        self._counts: dict[str, dict[str, int]] | None = None
+        self._summary: list[tuple] | None = None
+        self._players: dict[str, list[int]] | None = None  # see _player_index
 
     # --- load / flush ---
 
+    def _head(self):
+        """The blob's metadata (None if missing); looked up once per instance."""
+        if self._head_blob is None:
+            self._head_blob = self._bucket.get_blob(self._blob_name) or False
+        return self._head_blob or None
+
+    def version(self) -> int:
+        """GCS generation of the document (0 if missing), e.g. for ETags.
+
+        Costs at most the metadata lookup that loading starts with; nothing
+        is downloaded.
+        """
+        if self._doc is not None:
+            return self._generation
+        blob = self._head()
+        return blob.generation if blob is not None else 0
+
     def _ensure_loaded(self) -> None:
         if self._doc is not None:
             return
-        blob = self._bucket.blob(self._blob_name)
-        if not blob.exists():
+        blob = self._head()
+        if blob is None:
             self._doc = {"tabs": {}}
             self._generation = 0
             return
-        blob.reload()
-        text = blob.download_as_text()
-        self._doc = json.loads(text) if text else {"tabs": {}}
+        cached = _doc_cache.get(self._cache_key)
+        if cached is not None and cached[0] == blob.generation:
+            self._generation, self._doc = cached
+            self._shared = True
+            derived = _summary_cache.get(self._cache_key)
+            if derived is not None and derived[0] == self._generation:
+                _, self._counts, self._summary = derived
+            return
+        self._doc = _download_doc(blob)
         self._generation = blob.generation
+        _doc_cache[self._cache_key] = (self._generation, self._doc)
+        self._shared = True
 
-    def _tab(self, name: str) -> list[list[str]]:
+    def _tab(self, name: str) -> list[tuple]:
         self._ensure_loaded()
         tabs = self._doc.setdefault("tabs", {})
         if name not in tabs:
             raise WorksheetNotFound(name)
         return tabs[name]
 
-    def _stats_summary(self) -> list[list[str]]:
-        """Compute Stats Summary on the fly from MatchHistory + MatchRatings."""
+    def _lend(self, name: str):
+        """_tab() for a caller that keeps it (a RowsView, match_history()):
+        the tab stops being this instance's alone, so the next write to it
+        works on a copy and the caller keeps seeing the tab as it was."""
+        rows = self._tab(name)
+        self._owned.discard(name)
+        return rows
+
+    def _detach(self) -> None:
+        """Give this instance its own doc, sharing the cached doc's tabs
+        until _writable_tab copies the ones it writes."""
         self._ensure_loaded()
-        tabs = self._doc.get("tabs", {})
-        history = tabs.get("MatchHistory", [])
-        ratings = tabs.get("MatchRatings", [])
-
-        header = [
-            "Player",
-            "Town Games",
-            "Town Wins",
-            "Town Win %",
-            "Mafia Games",
-            "Mafia Wins",
-            "Mafia Win %",
-            "Total Games",
-            "Total Win %",
-            "mu",
-            "sigma",
-            "Rating",
-        ]
+        if self._shared:
+            self._doc = {**self._doc, "tabs": dict(self._doc.get("tabs", {}))}
+            if self._counts is not None:
+                self._counts = {n: dict(c) for n, c in self._counts.items()}
+            self._shared = False
+            self._owned = set()
 
-        per = {}
-        for row in history[1:]:
-            if len(row) < 4 or not row[1]:
-                continue
-            name, role, result = row[1], row[2], row[3]
-            if result not in ("Win", "Loss"):
-                continue
-            alignment = "Mafia" if role == "Mafia" else "Town"
-            e = per.setdefault(
-                name,
-                {"town_games": 0, "town_wins": 0, "mafia_games": 0, "mafia_wins": 0},
+    def _writable_tab(self, name: str) -> list[tuple]:
+        """_tab() for mutation: detach from the shared cached doc first, and
+        copy the tab on its first write (or first since it was lent)."""
+        self._detach()
+        rows = self._tab(name)
+        if name not in self._owned:
+            rows = self._doc["tabs"][name] = _copy_tab(rows)
+            self._owned.add(name)
+        return rows
+
+    def _history_counts(self) -> dict[str, dict[str, int]]:
+        if self._counts is None:
+            self._ensure_loaded()
+            history = self._doc.get("tabs", {}).get("MatchHistory", [])
+            self._counts = {}
+            _count_history(
+                self._counts,
+                history.labels() if isinstance(history, History) else history[1:],
+                1,
             )
-            if alignment == "Mafia":
-                e["mafia_games"] += 1
-                if result == "Win":
-                    e["mafia_wins"] += 1
+        return self._counts
+
+    def _stats_summary(self) -> list[tuple]:
+        """Stats Summary from MatchHistory + MatchRatings, memoized.
+
+        Per-player win/loss counts are kept up to date incrementally as
+        MatchHistory rows are added/removed, so a rebuild after a write is
+        O(players); the built rows are reused until the next _mark_dirty
+        (and across requests while the generation is unchanged).
+        """
+        self._ensure_loaded()
+        if self._summary is None:
+            ratings = self._doc.get("tabs", {}).get("MatchRatings", [])
+            self._summary = _build_summary(self._history_counts(), ratings)
+            if self._shared:
+                _summary_cache[self._cache_key] = (
+                    self._generation, self._counts, self._summary
+                )
+        return self._summary
+
+    def _player_index(self) -> dict[str, list[int]]:
+        """build_player_index() of MatchHistory, built once per generation
+        and dropped on any MatchHistory write."""
+        self._ensure_loaded()
+        if self._players is None:
+            cached = _player_index_cache.get(self._cache_key)
+            if self._shared and cached is not None and cached[0] == self._generation:
+                self._players = cached[1]
             else:
-                e["town_games"] += 1
-                if result == "Win":
-                    e["town_wins"] += 1
+                history = self._doc.get("tabs", {}).get("MatchHistory", [])
+                self._players = build_player_index(history)
+                if self._shared:
+                    _player_index_cache[self._cache_key] = (
+                        self._generation, self._players
+                    )
+        return self._players
 
-        rows = [header]
-        for r in ratings[1:]:
-            if len(r) < 3 or not r[0]:
-                continue
-            name = r[0]
-            try:
-                mu = float(r[1])
-                sigma = float(r[2])
-            except (ValueError, IndexError):
-                continue
-            s = per.get(
-                name,
-                {"town_games": 0, "town_wins": 0, "mafia_games": 0, "mafia_wins": 0},
-            )
-            total_games = s["town_games"] + s["mafia_games"]
-            total_wins = s["town_wins"] + s["mafia_wins"]
-            rating = round((mu - 1.5 * sigma) * 68)
-            town_pct = (100 * s["town_wins"] / s["town_games"]) if s["town_games"] else 0
-            mafia_pct = (100 * s["mafia_wins"] / s["mafia_games"]) if s["mafia_games"] else 0
-            total_pct = (100 * total_wins / total_games) if total_games else 0
-            rows.append([
-                name,
-                str(s["town_games"]),
-                str(s["town_wins"]),
-                f"{town_pct:.1f}%",
-                str(s["mafia_games"]),
-                str(s["mafia_wins"]),
-                f"{mafia_pct:.1f}%",
-                str(total_games),
-                f"{total_pct:.1f}%",
-                repr(mu),
-                repr(sigma),
-                str(rating),
-            ])
-        rows[1:] = sorted(rows[1:], key=lambda r: int(r[11]), reverse=True)
-        return rows
+    def match_history(self) -> History:
+        """The MatchHistory tab itself, for typed reads; don't modify it."""
+        return self._lend("MatchHistory")
+
+    def player_rows(self, name: str) -> list[int]:
+        """Offsets of name's rows in match_history(), newest first."""
+        self._tab("MatchHistory")  # raises WorksheetNotFound
+        return self._player_index().get(name, [])
 
-    def _mark_dirty(self) -> None:
+    def _mark_dirty(self, tab: str | None = None, added=(), removed=()) -> None:
+        """Record a write. For MatchHistory, `added`/`removed` rows update the
+        Stats Summary counts in place; a write without them forces a recount."""
         self._dirty = True
+        self._summary = None
+        if tab in (None, "MatchHistory"):
+            self._players = None
+        if tab in (None, "MatchHistory") and self._counts is not None:
+            if tab is None or not (added or removed):
+                self._counts = None
+            else:
+                _count_history(self._counts, removed, -1)
+                _count_history(self._counts, added, 1)
 
     def flush(self) -> None:
         if not self._dirty or self._doc is None:
             return
         blob = self._bucket.blob(self._blob_name)
-        body = json.dumps(self._doc, indent=2, ensure_ascii=False)
-        kwargs = {"content_type": "application/json"}
+        kwargs = {}
         if self._generation is not None:
             kwargs["if_generation_match"] = self._generation
-        blob.upload_from_string(body, **kwargs)
+        try:
+            _upload_doc(blob, self._doc, **kwargs)
+        except Exception as e:
+            if _precondition_failed(e):
+                raise WriteConflict(f"{self._blob_name} changed since it was read") from e
+            raise
         blob.reload()
         self._generation = blob.generation
         self._dirty = False
+        _doc_cache[self._cache_key] = (self._generation, self._doc)
+        if self._counts is not None:
+            _summary_cache[self._cache_key] = (
+                self._generation, self._counts, self._summary
+            )
+        self._shared = True
 
     # --- gspread.Spreadsheet API ---
 
@@ -285,6 +1124,20 @@ class JsonSpreadsheet:
         self._tab(name)  # raises WorksheetNotFound
         return JsonWorksheet(self, name)
 
+    def add_worksheet(
+        self, title: str, rows: int = 0, cols: int = 0, index: int | None = None
+    ) -> JsonWorksheet:
+        """Create an empty tab. rows/cols/index are gspread's grid hints and
+        mean nothing here."""
+        self._detach()
+        tabs = self._doc.setdefault("tabs", {})
+        if title in tabs or title == "Stats Summary":
+            raise ValueError(f"A sheet named {title!r} already exists")
+        tabs[title] = History() if title == "MatchHistory" else []
+        self._owned.add(title)
+        self._mark_dirty(title)
+        return self.worksheet(title)
+
     def batch_update(self, body: dict) -> None:
         # Sheets-specific copyPaste; no-op for JSON store.
         pass
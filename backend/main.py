@@ -1,38 +1,64 @@
 """Mafia TrueSkill backend — Google Cloud Function replacement for Code.gs.
 
 Deploy as HTTP Cloud Function (gen2). Authenticates to Google Sheets via
-service account. Uses the trueskill library with ghost-padded teams to
-produce ratings identical to the existing Python analysis script.
+service account. Rates ghost-padded teams through the shared rating_engine,
+whose closed-form TrueSkill update matches the trueskill library's factor
+graph (and so the existing Python analysis script) to ~1e-12.
 """
 
+import bisect
+import hashlib
 import json
 import math
+import operator
 import os
+import random
+import time
 
 import functions_framework
-import gspread
-from google.oauth2.service_account import Credentials
-from trueskill import TrueSkill, Rating
 
+import event_store
 import json_store
+import rating_engine
+import rerate
+import sheets_plan
+
+# gspread / google-auth (Sheets only), numpy (balance.py, the batched
+# predictor) and google-cloud-storage (json_store) are imported where first
+# used, so each deployment's cold start only loads what its storage needs.
+# bench_cold_start.py checks the import time of this module.
 
 # --- Constants ---
 
-STORAGE = os.environ.get("STORAGE", "sheets")  # "sheets" | "gcs_json"
+STORAGE = os.environ.get("STORAGE", "sheets")  # "sheets" | "gcs_json" | "gcs_eventlog"
 SHEET_ID = os.environ.get("SHEET_ID", "1vTc6XAa4beDM4n1syQ22Hs10JGVT9PuHNSoTmY051CQ")
 TRUESKILL_MU = 25
 TRUESKILL_SIGMA = 25 / 3
 
-if STORAGE == "gcs_json":  # ego-mafia
-    MAFIA_GHOST_MU = 25.275
-    TOWN_GHOST_MU = 24.275
-    _BETA = 5.0
-else:  # original mafia (sheets)
-    MAFIA_GHOST_MU = 25.7
-    TOWN_GHOST_MU = 23.85
-    _BETA = 5.5
-MAFIA_GHOST_SIGMA = 0.8
-TOWN_GHOST_SIGMA = 0.8
+# Both GCS storages serve ego-mafia; gcs_eventlog is the append-only variant.
+JSON_STORAGES = ("gcs_json", "gcs_eventlog")
+
+if STORAGE in JSON_STORAGES:  # ego-mafia (ghosts 25.275 / 24.275, beta 5.0)
+    RATING_CONFIG = rating_engine.EGO
+else:  # original mafia, sheets (ghosts 25.7 / 23.85, beta 5.5)
+    RATING_CONFIG = rating_engine.MAIN
+
+# RatingSnapshots holds every player's (mu, sigma) after each game whose id
+# is a multiple of this, so getRatingsAt replays at most this many games.
+RATING_SNAPSHOTS = "RatingSnapshots"
+RATING_SNAPSHOT_EVERY = int(os.environ.get("RATING_SNAPSHOT_EVERY", "25"))
+SNAPSHOT_HEADER = ["GameID", "Player", "mu", "sigma"]
+
+# suggestAssignments aims for this predicted mafia win rate (the design
+# target stat_test_vs_target.py checks the season against).
+MAFIA_WIN_TARGET = float(os.environ.get("MAFIA_WIN_TARGET", "0.56"))
+SUGGEST_MAX = 20
+
+# A write that loses the GCS generation race to another request is replayed
+# against the new state, up to WRITE_RETRIES times, after a jittered
+# exponential backoff starting at WRITE_BACKOFF seconds.
+WRITE_RETRIES = int(os.environ.get("WRITE_RETRIES", "4"))
+WRITE_BACKOFF = float(os.environ.get("WRITE_BACKOFF", "0.05"))
 
 # =============================================
 # GAME PASSWORD — set via GAME_PASSWORD env var per deployment
@@ -60,8 +86,6 @@ POSITION_ROLES = {
     6: "Vigilante",
 }
 
-env = TrueSkill(tau=0.1, beta=_BETA, draw_probability=0.00)
-
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
 # --- Auth ---
@@ -73,6 +97,9 @@ def get_gc():
     global _gc
     if _gc is not None:
         return _gc
+    import gspread
+    from google.oauth2.service_account import Credentials
+
     key_json = os.environ.get("SERVICE_ACCOUNT_KEY")
     if key_json:
         info = json.loads(key_json)
@@ -91,12 +118,18 @@ def get_sheet():
     """Return a spreadsheet handle. For STORAGE=gcs_json the JsonSpreadsheet
     is cached for the duration of one request so multiple calls within a
     handler see the same in-memory copy; the dispatcher resets it per
-    request."""
+    request. The parsed blob itself outlives the request in json_store's
+    generation-keyed cache, so a reset costs one metadata lookup, not a
+    download."""
     global _json_ss
     if STORAGE == "gcs_json":
         if _json_ss is None:
             _json_ss = json_store.get_json_spreadsheet()
         return _json_ss
+    if STORAGE == "gcs_eventlog":
+        if _json_ss is None:
+            _json_ss = event_store.get_event_log_spreadsheet()
+        return _json_ss
     return get_gc().open_by_key(SHEET_ID)
 
 
@@ -106,15 +139,65 @@ def _reset_storage_state():
 
 
 def _flush_storage():
-    if STORAGE == "gcs_json" and _json_ss is not None:
+    if STORAGE in JSON_STORAGES and _json_ss is not None:
         _json_ss.flush()
 
 
-# gspread and json_store each raise their own WorksheetNotFound. Catch either uniformly.
-_WORKSHEET_NOT_FOUND = (
-    gspread.exceptions.WorksheetNotFound,
-    json_store.WorksheetNotFound,
-)
+# Per-instance write counters, logged with every retried or failed write.
+_write_stats = {"writes": 0, "conflicts": 0, "retried": 0, "gave_up": 0}
+
+
+def _log_write(event, action, attempt):
+    # One JSON line on stdout is a structured Cloud Logging entry; a
+    # log-based metric on jsonPayload.event charts the conflict rate.
+    print(json.dumps({
+        "severity": "WARNING" if event == "write_conflict" else "ERROR",
+        "event": event,
+        "action": action,
+        "attempt": attempt,
+        "storage": STORAGE,
+        **_write_stats,
+    }), flush=True)
+
+
+def _run_write(action, mutation):
+    """mutation() then flush, replayed from a fresh read when the flush loses
+    the generation race (json_store.WriteConflict).
+
+    mutation must read everything it needs through get_sheet(), so each
+    attempt sees the state the previous writer left. Sheets has no
+    precondition to lose and runs it once.
+    """
+    _write_stats["writes"] += 1
+    for attempt in range(WRITE_RETRIES + 1):
+        if attempt:
+            time.sleep(random.uniform(0, WRITE_BACKOFF * 2 ** (attempt - 1)))
+            _reset_storage_state()
+        try:
+            result = mutation()
+            _flush_storage()
+        except json_store.WriteConflict:
+            _write_stats["conflicts"] += 1
+            if attempt == WRITE_RETRIES:
+                _write_stats["gave_up"] += 1
+                _log_write("write_conflict_gave_up", action, attempt)
+                raise
+            _log_write("write_conflict", action, attempt)
+            continue
+        if attempt:
+            _write_stats["retried"] += 1
+        return result
+
+
+def _worksheet_not_found():
+    """gspread's and json_store's WorksheetNotFound, to catch either
+    uniformly. An except clause only evaluates this once something was
+    raised, and only the Sheets backend imports gspread for it."""
+    if STORAGE == "sheets":
+        from gspread.exceptions import WorksheetNotFound
+
+        return (WorksheetNotFound, json_store.WorksheetNotFound)
+    return (json_store.WorksheetNotFound,)
 
 
 # --- Rating helpers ---
@@ -130,178 +213,33 @@ def compute_trueskill(mafia_players, town_players, mafia_won):
     Each player dict has keys: name, mu, sigma.
     Returns dict keyed by real player name with {mu, sigma}.
     """
-    n_mafia = len(mafia_players)
-    n_town = len(town_players)
-
-    # Build mafia team: real players + avg fillers + ghosts
-    mafia_dict = {}
-    mu_geo = 1.0
-    sigma_geo = 1.0
-    for p in mafia_players:
-        mafia_dict[p["name"]] = Rating(p["mu"], p["sigma"])
-        mu_geo *= p["mu"]
-        sigma_geo *= p["sigma"]
-
-    mu_avg = mu_geo ** (1 / n_mafia)
-    sigma_avg = sigma_geo ** (1 / n_mafia)
-    for i in range(n_town - n_mafia):
-        mafia_dict[f"_mafia_avg{i}"] = Rating(mu_avg, sigma_avg)
-    for i in range(n_town):
-        mafia_dict[f"_mafia_ghost{i}"] = Rating(MAFIA_GHOST_MU, MAFIA_GHOST_SIGMA)
-
-    # Build town team: real players + ghosts
-    town_dict = {}
-    for p in town_players:
-        town_dict[p["name"]] = Rating(p["mu"], p["sigma"])
-    for i in range(n_town):
-        town_dict[f"_town_ghost{i}"] = Rating(TOWN_GHOST_MU, TOWN_GHOST_SIGMA)
-
-    # Rate
-    ranks = [0, 1] if mafia_won else [1, 0]
-    rated = env.rate([mafia_dict, town_dict], ranks=ranks)
-
-    # Extract real player results only
-    result = {}
-    for p in mafia_players:
-        r = rated[0][p["name"]]
-        result[p["name"]] = {"mu": r.mu, "sigma": r.sigma}
-    for p in town_players:
-        r = rated[1][p["name"]]
-        result[p["name"]] = {"mu": r.mu, "sigma": r.sigma}
-    return result
+    return rating_engine.compute_trueskill(
+        mafia_players, town_players, mafia_won, RATING_CONFIG
+    )
 
 
 # --- Sheet operations ---
 
 
-def sort_stats_summary(ss):
-    """Sort the Stats Summary sheet by Rating (column 12) descending."""
-    if STORAGE != "sheets":
-        # JSON store recomputes Stats Summary on read; nothing to sort/format.
-        return
-    try:
-        ws = ss.worksheet("Stats Summary")
-    except _WORKSHEET_NOT_FOUND:
-        return
-    last_row = len(ws.get_all_values())
-    if last_row > 1:
-        ws.sort((12, "des"), range=f"A2:L{last_row}")
-    format_stats_summary(ss, ws, last_row)
-
-
-def format_stats_summary(ss, ws, last_row):
-    """Apply alternating row colors and borders to Stats Summary."""
-    if last_row < 1:
-        return
-
-    sheet_id = ws.id
-    requests = []
+def _write_plan(ss):
+    """Plan for a handler's writes: batched on Sheets, immediate for JSON."""
+    if STORAGE == "sheets":
+        return sheets_plan.SheetsWritePlan(ss)
+    return sheets_plan.ImmediateWrites(ss)
 
-    # Remove existing banded ranges on this sheet
-    meta = ss.fetch_sheet_metadata(
-        params={"fields": "sheets(properties.sheetId,bandedRanges)"}
-    )
-    for sheet in meta.get("sheets", []):
-        if sheet["properties"]["sheetId"] == sheet_id:
-            for banding in sheet.get("bandedRanges", []):
-                requests.append(
-                    {"deleteBanding": {"bandedRangeId": banding["bandedRangeId"]}}
-                )
-            break
-
-    # Add banded range for alternating row colors
-    requests.append(
-        {
-            "addBanding": {
-                "bandedRange": {
-                    "range": {
-                        "sheetId": sheet_id,
-                        "startRowIndex": 0,
-                        "endRowIndex": last_row,
-                        "startColumnIndex": 0,
-                        "endColumnIndex": 12,
-                    },
-                    "rowProperties": {
-                        "headerColor": {
-                            "red": 0.208,
-                            "green": 0.408,
-                            "blue": 0.329,
-                        },
-                        "firstBandColor": {
-                            "red": 1.0,
-                            "green": 1.0,
-                            "blue": 1.0,
-                        },
-                        "secondBandColor": {
-                            "red": 0.965,
-                            "green": 0.973,
-                            "blue": 0.976,
-                        },
-                    },
-                }
-            }
-        }
-    )
 
-    # Outer border around entire block
-    border = {"style": "SOLID", "color": {"red": 0.0, "green": 0.0, "blue": 0.0}}
-    requests.append(
-        {
-            "updateBorders": {
-                "range": {
-                    "sheetId": sheet_id,
-                    "startRowIndex": 0,
-                    "endRowIndex": last_row,
-                    "startColumnIndex": 0,
-                    "endColumnIndex": 12,
-                },
-                "top": border,
-                "bottom": border,
-                "left": border,
-                "right": border,
-            }
-        }
-    )
-
-    # Vertical borders on both sides of Rating column (L, index 11)
-    requests.append(
-        {
-            "updateBorders": {
-                "range": {
-                    "sheetId": sheet_id,
-                    "startRowIndex": 0,
-                    "endRowIndex": last_row,
-                    "startColumnIndex": 11,
-                    "endColumnIndex": 12,
-                },
-                "left": border,
-                "right": border,
-            }
-        }
-    )
+def _stats_worksheet(ss):
+    try:
+        return ss.worksheet("Stats Summary")
+    except _worksheet_not_found():
+        return None
 
-    # Vertically center all text
-    requests.append(
-        {
-            "repeatCell": {
-                "range": {
-                    "sheetId": sheet_id,
-                    "startRowIndex": 0,
-                    "endRowIndex": last_row,
-                    "startColumnIndex": 0,
-                    "endColumnIndex": 12,
-                },
-                "cell": {
-                    "userEnteredFormat": {
-                        "verticalAlignment": "MIDDLE",
-                    }
-                },
-                "fields": "userEnteredFormat.verticalAlignment",
-            }
-        }
-    )
 
-    ss.batch_update({"requests": requests})
+def _snapshot_worksheet(ss):
+    try:
+        return ss.worksheet(RATING_SNAPSHOTS)
+    except _worksheet_not_found():
+        return None
 
 
 def parse_pct(val):
@@ -318,8 +256,10 @@ def parse_pct(val):
 
 def get_players():
     ss = get_sheet()
-    ws = ss.worksheet("MatchRatings")
-    data = ws.get_all_values()
+    return _players_payload(ss.worksheet("MatchRatings").get_all_values())
+
+
+def _players_payload(data):
     players = []
     for row in data[1:]:
         name = row[0]
@@ -336,64 +276,81 @@ def get_players():
 
 
 def get_last_game():
-    ss = get_sheet()
-    ws = ss.worksheet("MatchHistory")
-    data = ws.get_all_values()
-    if len(data) < 2 or not data[1][0]:
+    return _last_game_payload(_match_history(get_sheet()))
+
+
+def _match_history(ss, data=None):
+    """MatchHistory as a json_store.History. The GCS storages hand over
+    their own, already typed; on Sheets it is parsed from `data` (this
+    request's read of the tab) or a fresh read."""
+    if STORAGE in JSON_STORAGES:
+        return ss.match_history()
+    if data is None:
+        data = ss.worksheet("MatchHistory").get_all_values()
+    return json_store.History(data)
+
+
+def _history_int(v):
+    """An int column of a History row as reported: 0 when empty."""
+    return 0 if v == json_store.BLANK else v
+
+
+def _is_rated(h, j):
+    return not math.isnan(h.old_mu[j])
+
+
+def _rating_fields(h, j):
+    """The mu / sigma / rating columns of a rated History row (column
+    index j)."""
+    return {
+        "old_mu": h.old_mu[j],
+        "new_mu": h.new_mu[j],
+        "new_sigma": h.new_sigma[j],
+        "old_rating": h.old_rating[j],
+        "new_rating": h.new_rating[j],
+        "old_sigma": h.old_sigma[j],
+    }
+
+
+def _last_game_payload(h):
+    if len(h) < 2 or h.game[-1] == json_store.BLANK:
         return {"game": None}
 
-    game_id = data[1][0]
+    game_id, s = h.game[-1], h.strings  # the columns are oldest first
     players = []
-    for row in data[1:]:
-        if row[0] != game_id:
+    for i in h.column_range():
+        if h.game[i] != game_id:
             break
         entry = {
-            "game_id": int(float(game_id)),
-            "player": row[1],
-            "alignment": row[2],
-            "result": row[3],
-            "rate_change": int(float(row[4])) if row[4] else 0,
+            "game_id": game_id,
+            "player": s[h.player[i]],
+            "alignment": s[h.alignment[i]],
+            "result": s[h.result[i]],
+            "rate_change": _history_int(h.rate_change[i]),
         }
         # Only include rating data for rated players
-        if row[5]:
-            entry.update(
-                {
-                    "old_mu": float(row[5]),
-                    "new_mu": float(row[6]),
-                    "new_sigma": float(row[7]),
-                    "old_rating": int(float(row[8])),
-                    "new_rating": int(float(row[9])),
-                    "old_sigma": float(row[10]),
-                }
-            )
+        if _is_rated(h, i):
+            entry.update(_rating_fields(h, i))
         players.append(entry)
-    return {"game": {"game_id": int(float(game_id)), "players": players}}
-
+    return {"game": {"game_id": game_id, "players": players}}
 
-def record_game(body):
-    assignments = body["assignments"]
-    winner = body["winner"]
-    night0_kills = body.get("night0_kills", [])
-    mafia_won = winner == "Mafia"
 
-    # Normalize variant names to canonical spellings
+def _rated_assignments(assignments, night0_kills):
+    """(assignments, night0_kills, rated) with names normalized to their
+    canonical spellings; rated leaves out ghosts and Night 0 kills."""
     for a in assignments:
         a["name"] = NAME_ALIASES.get(a["name"], a["name"])
     night0_kills = [NAME_ALIASES.get(n, n) for n in night0_kills]
-
-    # Filter for rating: exclude ghosts and N0 kills
     rated = [
         a
         for a in assignments
         if not a.get("is_ghost") and a["name"] not in night0_kills
     ]
+    return assignments, night0_kills, rated
 
-    ss = get_sheet()
-    ws_ratings = ss.worksheet("MatchRatings")
-    ws_history = ss.worksheet("MatchHistory")
 
-    # Build current ratings lookup
-    ratings_data = ws_ratings.get_all_values()
+def _ratings_lookup(ratings_data):
+    """{name: {mu, sigma, row}} from MatchRatings values (row is 1-based)."""
     current_ratings = {}
     for i, row in enumerate(ratings_data[1:], start=2):
         name = row[0]
@@ -409,8 +366,12 @@ def record_game(body):
             "sigma": sigma,
             "row": i,
         }
+    return current_ratings
 
-    # Build team player lists
+
+def _build_teams(rated, current_ratings):
+    """(mafia_players, town_players) for compute_trueskill; new players start
+    at the prior."""
     mafia_players = []
     town_players = []
     for a in rated:
@@ -424,16 +385,84 @@ def record_game(body):
             mafia_players.append(player)
         else:
             town_players.append(player)
+    return mafia_players, town_players
 
-    # Compute new ratings
-    new_ratings = compute_trueskill(mafia_players, town_players, mafia_won)
 
-    # Determine next GameID
-    history_data = ws_history.get_all_values()
-    current_game_id = (
-        history_data[1][0] if len(history_data) > 1 and history_data[1][0] else None
+def preview_game(body):
+    """Rating changes for both possible results of a game, before it is
+    recorded. Read-only: one MatchRatings read, no writes, no Stats
+    Summary work.
+
+    body: assignments and night0_kills as for recordGame (no winner).
+    Returns the predicted mafia win probability and, per rated player in
+    seat order, the display-rating delta under each result.
+    """
+    _, _, rated = _rated_assignments(
+        [dict(a) for a in body["assignments"]], body.get("night0_kills", [])
     )
-    next_game_id = int(float(current_game_id)) + 1 if current_game_id else 46
+    current_ratings = _ratings_lookup(
+        get_sheet().worksheet("MatchRatings").get_all_values()
+    )
+    mafia_players, town_players = _build_teams(rated, current_ratings)
+    if not mafia_players or not town_players:
+        raise ValueError("both teams need a rated player")
+
+    outcomes = {
+        won: compute_trueskill(mafia_players, town_players, won)
+        for won in (True, False)
+    }
+    players = []
+    seats = [("Mafia", p) for p in mafia_players] + [("Town", p) for p in town_players]
+    for team, p in seats:
+        old = display_rating(p["mu"], p["sigma"])
+        entry = {"name": p["name"], "team": team, "rating": old}
+        for won, key in ((True, "mafia_win"), (False, "town_win")):
+            new = outcomes[won][p["name"]]
+            entry[key] = display_rating(new["mu"], new["sigma"]) - old
+        players.append(entry)
+    win = rating_engine.predict_mafia_win(
+        [m["mu"] for m in mafia_players],
+        [m["sigma"] for m in mafia_players],
+        [t["mu"] for t in town_players],
+        [t["sigma"] for t in town_players],
+        RATING_CONFIG,
+    )
+    return {"mafia_win_probability": round(float(win), 4), "players": players}
+
+
+def record_game(body):
+    return _record_games([body])[0]
+
+
+def record_games(body):
+    """Record several games, oldest first, as one write.
+
+    body["games"] lists recordGame bodies. They are rated in order against
+    one read of MatchRatings / MatchHistory, then written together: one
+    flush on the GCS storages, one values + one structural batchUpdate on
+    Sheets. A game that fails to rate aborts the batch before anything is
+    written.
+    """
+    games = body.get("games")
+    if not games:
+        raise ValueError("games must list at least one game")
+    return {"games": _record_games(games)}
+
+
+def _rate_game(body, game_id, current_ratings):
+    """MatchHistory rows and recordGame result for one game, rated against
+    current_ratings (not modified). Returns (rows, result, rated names,
+    new ratings)."""
+    assignments = body["assignments"]
+    winner = body["winner"]
+    night0_kills = body.get("night0_kills", [])
+    mafia_won = winner == "Mafia"
+
+    assignments, night0_kills, rated = _rated_assignments(assignments, night0_kills)
+    mafia_players, town_players = _build_teams(rated, current_ratings)
+
+    # Compute new ratings
+    new_ratings = compute_trueskill(mafia_players, town_players, mafia_won)
 
     # Build all 15 rows for MatchHistory (in position order)
     rated_names = {a["name"] for a in rated}
@@ -454,7 +483,7 @@ def record_game(body):
         if is_ghost:
             history_rows.append(
                 [
-                    next_game_id,
+                    game_id,
                     name,
                     alignment,
                     "Ghost",
@@ -478,7 +507,7 @@ def record_game(body):
         elif is_n0:
             history_rows.append(
                 [
-                    next_game_id,
+                    game_id,
                     name,
                     alignment,
                     "Night Zero",
@@ -517,7 +546,7 @@ def record_game(body):
 
             history_rows.append(
                 [
-                    next_game_id,
+                    game_id,
                     name,
                     alignment,
                     result_str,
@@ -545,80 +574,96 @@ def record_game(body):
                 }
             )
 
-    # Insert rows at row 2 of MatchHistory (newest first)
-    ws_history.insert_rows(history_rows, row=2)
-
-    # Update MatchRatings
-    new_players = []
-    for a in rated:
-        name = a["name"]
-        nr = new_ratings[name]
-        cr = current_ratings.get(name)
-        if cr:
-            ws_ratings.update(f"B{cr['row']}:C{cr['row']}", [[nr["mu"], nr["sigma"]]])
-        else:
-            next_row = len(ratings_data) + 1
-            ws_ratings.update(
-                f"A{next_row}:C{next_row}", [[name, nr["mu"], nr["sigma"]]]
-            )
-            ratings_data.append([name, nr["mu"], nr["sigma"]])
-            current_ratings[name] = {
-                "mu": nr["mu"],
-                "sigma": nr["sigma"],
-                "row": next_row,
-            }
-            new_players.append(name)
-
-    # Add new players to Stats Summary (name + copy formulas from row 2)
-    if new_players:
-        try:
-            ws_stats = ss.worksheet("Stats Summary")
-            stats_rows = len(ws_stats.get_all_values())
-            for i, name in enumerate(new_players):
-                dest_row = stats_rows + 1 + i
-                ws_stats.update(f"A{dest_row}", [[name]])
-                ss.batch_update(
-                    {
-                        "requests": [
-                            {
-                                "copyPaste": {
-                                    "source": {
-                                        "sheetId": ws_stats.id,
-                                        "startRowIndex": 1,
-                                        "endRowIndex": 2,
-                                        "startColumnIndex": 1,
-                                        "endColumnIndex": 12,
-                                    },
-                                    "destination": {
-                                        "sheetId": ws_stats.id,
-                                        "startRowIndex": dest_row - 1,
-                                        "endRowIndex": dest_row,
-                                        "startColumnIndex": 1,
-                                        "endColumnIndex": 12,
-                                    },
-                                    "pasteType": "PASTE_FORMULA",
-                                }
-                            }
-                        ]
-                    }
-                )
-        except _WORKSHEET_NOT_FOUND:
-            pass
-
-    # Sort Stats Summary
-    sort_stats_summary(ss)
-
-    return {
-        "game_id": next_game_id,
+    result = {
+        "game_id": game_id,
         "players": result_players,
         "excluded": {
             "ghosts": [a["name"] for a in assignments if a.get("is_ghost")],
             "night0_kills": night0_kills,
         },
     }
+    return history_rows, result, [a["name"] for a in rated], new_ratings
+
+
+def _record_games(games):
+    ss = get_sheet()
+    ws_ratings = ss.worksheet("MatchRatings")
+    ws_history = ss.worksheet("MatchHistory")
+
+    ratings_data = ws_ratings.get_all_values().copy()  # new players are appended
+    current_ratings = _ratings_lookup(ratings_data)
 
+    # Determine next GameID
+    history_data = ws_history.get_all_values()
+    current_game_id = (
+        history_data[1][0] if len(history_data) > 1 and history_data[1][0] else None
+    )
+    next_game_id = int(float(current_game_id)) + 1 if current_game_id else 46
+
+    # Rate every game in memory, each against the ratings the previous left.
+    results, blocks, touched, new_players = [], [], {}, []
+    checkpoint = None  # (game id, MatchHistory before it, its new ratings)
+    for game in games:
+        rows, result, rated, new_ratings = _rate_game(
+            game, next_game_id, current_ratings
+        )
+        if next_game_id % RATING_SNAPSHOT_EVERY == 0:
+            before = [history_data[0]]
+            for block in reversed(blocks):
+                before.extend(block)
+            checkpoint = (next_game_id, before + history_data[1:], new_ratings)
+        results.append(result)
+        blocks.append(rows)
+        for name in rated:
+            nr = new_ratings[name]
+            if name not in current_ratings:
+                next_row = len(ratings_data) + 1
+                ratings_data.append([name, nr["mu"], nr["sigma"]])
+                current_ratings[name] = {"row": next_row}
+                new_players.append(name)
+            current_ratings[name].update(mu=nr["mu"], sigma=nr["sigma"])
+            touched[name] = current_ratings[name]
+        next_game_id += 1
+
+    plan = _write_plan(ss)
 
-def undo_last_game():
+    # Insert rows at row 2 of MatchHistory (newest first)
+    plan.insert_rows(
+        ws_history, [row for block in reversed(blocks) for row in block], row=2
+    )
+
+    # Update MatchRatings
+    for name, cr in touched.items():
+        if name in new_players:
+            plan.update(
+                ws_ratings,
+                f"A{cr['row']}:C{cr['row']}",
+                [[name, cr["mu"], cr["sigma"]]],
+            )
+        else:
+            plan.update(
+                ws_ratings, f"B{cr['row']}:C{cr['row']}", [[cr["mu"], cr["sigma"]]]
+            )
+
+    # Add new players to Stats Summary (name + copy formulas from row 2),
+    # then sort it
+    ws_stats = _stats_worksheet(ss)
+    if ws_stats is not None:
+        plan.add_stats_rows(ws_stats, new_players)
+        plan.sort_stats_summary(ws_stats)
+
+    if checkpoint is not None:
+        # Earlier checkpoints in the batch are backfilled from the rows before.
+        _add_rating_snapshots(ss, plan, checkpoint[1], checkpoint[0], checkpoint[2])
+    plan.commit()
+    return results
+
+
+def undo_last_game(body=None):
+    """Undo the latest game. body["game_id"], when given, must be that game;
+    when not, the first attempt pins it there, so a replay after a write
+    conflict fails rather than undo a game recorded in between."""
+    body = body if body is not None else {}
     ss = get_sheet()
     ws_history = ss.worksheet("MatchHistory")
     history_data = ws_history.get_all_values()
@@ -627,6 +672,13 @@ def undo_last_game():
         raise ValueError("No games to undo")
 
     game_id = history_data[1][0]
+    expected = body.get("game_id")
+    if expected not in (None, "") and int(float(expected)) != int(float(game_id)):
+        raise ValueError(
+            f"Game {int(float(expected))} is no longer the last game "
+            f"(game {int(float(game_id))} was recorded since)"
+        )
+    body["game_id"] = int(float(game_id))
 
     # Collect all rows for this game and rated players to restore
     game_row_count = 0
@@ -646,6 +698,7 @@ def undo_last_game():
             )
 
     # Restore ratings in MatchRatings
+    plan = _write_plan(ss)
     ws_ratings = ss.worksheet("MatchRatings")
     ratings_data = ws_ratings.get_all_values()
     ratings_lookup = {}
@@ -657,23 +710,25 @@ def undo_last_game():
     for p in players_to_restore:
         row_num = ratings_lookup.get(p["name"])
         if row_num:
-            ws_ratings.update(f"B{row_num}:C{row_num}", [[p["old_mu"], p["old_sigma"]]])
+            plan.update(
+                ws_ratings, f"B{row_num}:C{row_num}", [[p["old_mu"], p["old_sigma"]]]
+            )
             restored.append(p["name"])
 
     # Delete game rows from MatchHistory
-    ws_history.delete_rows(2, 2 + game_row_count - 1)
+    plan.delete_rows(ws_history, 2, 2 + game_row_count - 1)
 
-    # Clean up players with no remaining games
-    remaining_history = ws_history.get_all_values()
-    remaining_players = set()
-    for row in remaining_history[1:]:
-        if row[1]:
-            remaining_players.add(row[1])
+    # Clean up players with no remaining games; the scan stops once every
+    # restored player has turned up in an older game.
+    pending = {p["name"] for p in players_to_restore}
+    for i in range(1 + game_row_count, len(history_data)):
+        if not pending:
+            break
+        pending.discard(history_data[i][1])
 
-    players_to_delete = [
-        p["name"] for p in players_to_restore if p["name"] not in remaining_players
-    ]
+    players_to_delete = [p["name"] for p in players_to_restore if p["name"] in pending]
 
+    ws_stats = _stats_worksheet(ss)
     if players_to_delete:
         delete_names = set(players_to_delete)
         # Delete from MatchRatings (reverse order to preserve indices)
@@ -682,23 +737,23 @@ def undo_last_game():
             reverse=True,
         )
         for row_num in rows_to_delete:
-            ws_ratings.delete_rows(row_num)
+            plan.delete_rows(ws_ratings, row_num)
 
         # Delete from Stats Summary
-        try:
-            ws_stats = ss.worksheet("Stats Summary")
-            stats_data = ws_stats.get_all_values()
+        if ws_stats is not None:
+            stats_data = plan.get_all_values(ws_stats)
             stats_rows_to_delete = sorted(
                 [i + 1 for i, row in enumerate(stats_data) if row[0] in delete_names],
                 reverse=True,
             )
             for row_num in stats_rows_to_delete:
-                ws_stats.delete_rows(row_num)
-        except _WORKSHEET_NOT_FOUND:
-            pass
+                plan.delete_rows(ws_stats, row_num)
 
     # Sort Stats Summary
-    sort_stats_summary(ss)
+    if ws_stats is not None:
+        plan.sort_stats_summary(ws_stats)
+    _drop_rating_snapshots(ss, plan, int(float(game_id)))
+    plan.commit()
 
     return {
         "undone_game_id": int(float(game_id)),
@@ -707,11 +762,269 @@ def undo_last_game():
     }
 
 
+def edit_game(body):
+    """Correct a recorded game and re-rate only what that changes.
+
+    body: game_id plus any of rename ({old: new}), roles ({name: role},
+    by the recorded name) and winner ("Mafia" / "Town"). The games after
+    it are replayed only while some player's rating still differs from the
+    stored one (rerate.rerate_from_game), and only the changed cells are
+    written back.
+    """
+    try:
+        game_id = int(float(body.get("game_id")))
+    except (TypeError, ValueError):
+        raise ValueError("game_id is required and must be a number")
+    rename = {}
+    for old, new in (body.get("rename") or {}).items():
+        new = new.strip() if isinstance(new, str) else ""
+        if not new:
+            raise ValueError(f"{old} must be renamed to a name")
+        rename[old] = NAME_ALIASES.get(new, new)
+
+    ss = get_sheet()
+    ws_history = ss.worksheet("MatchHistory")
+    history_data = ws_history.get_all_values()
+    block = rerate.game_rows(history_data, game_id)
+    if not block:
+        raise ValueError(f"Game {game_id} not found")
+    new_rows = rerate.edit_game_rows(
+        [r for _, r in block], rename, body.get("roles"), body.get("winner")
+    )
+    change = rerate.rerate_from_game(history_data, game_id, new_rows, RATING_CONFIG)
+
+    plan = _write_plan(ss)
+    for a1, values in change.cells:
+        plan.update(ws_history, a1, values)
+
+    # MatchRatings: move the players whose final rating changed, add any
+    # name the edit introduced, drop any it left without games
+    ws_ratings = ss.worksheet("MatchRatings")
+    ratings_data = ws_ratings.get_all_values().copy()  # new players are appended
+    ratings_lookup = {row[0]: i for i, row in enumerate(ratings_data[1:], start=2) if row[0]}
+    removed = set(change.removed)
+    new_players = []
+    for name, (mu, sigma) in change.ratings.items():
+        if name in removed:
+            continue
+        row_num = ratings_lookup.get(name)
+        if row_num is None:
+            row_num = len(ratings_data) + 1
+            plan.update(ws_ratings, f"A{row_num}:C{row_num}", [[name, mu, sigma]])
+            ratings_data.append([name, mu, sigma])
+            new_players.append(name)
+        else:
+            plan.update(ws_ratings, f"B{row_num}:C{row_num}", [[mu, sigma]])
+    for row_num in sorted((ratings_lookup[n] for n in removed if n in ratings_lookup), reverse=True):
+        plan.delete_rows(ws_ratings, row_num)
+
+    ws_stats = _stats_worksheet(ss)
+    if ws_stats is not None:
+        stats_data = plan.get_all_values(ws_stats)
+        plan.add_stats_rows(ws_stats, new_players)
+        stats_rows_to_delete = sorted(
+            [i + 1 for i, row in enumerate(stats_data) if row[0] in removed],
+            reverse=True,
+        )
+        for row_num in stats_rows_to_delete:
+            plan.delete_rows(ws_stats, row_num)
+        plan.sort_stats_summary(ws_stats)
+    _rewrite_rating_snapshots(ss, plan, history_data, game_id, change.rows)
+    plan.commit()
+
+    return {
+        "game_id": game_id,
+        "games_rerated": change.games,
+        "cells_changed": len(change.cells),
+        "players": [
+            {"name": n, "mu": mu, "sigma": sigma, "rating": display_rating(mu, sigma)}
+            for n, (mu, sigma) in change.ratings.items()
+            if n not in removed
+        ],
+        "players_added": new_players,
+        "players_deleted": change.removed,
+    }
+
+
+# --- Rating snapshots ---
+
+
+def _snapshot_rows(game_id, ratings):
+    """RatingSnapshots rows for one checkpoint, highest rating first (ties
+    by name, so a backfilled checkpoint matches one taken live)."""
+    return [
+        [game_id, name, mu, sigma]
+        for name, (mu, sigma) in sorted(
+            ratings.items(), key=lambda kv: (-display_rating(*kv[1]), kv[0])
+        )
+    ]
+
+
+def _fold_history(ratings, rows):
+    """Apply MatchHistory rows, oldest first, to {name: (mu, sigma)}."""
+    for r in rows:
+        if r[0] and r[6]:
+            ratings[r[1]] = (float(r[6]), float(r[7]))
+
+
+def _add_rating_snapshots(ss, plan, history_data, game_id, new_ratings):
+    """Checkpoint the ratings after game_id, plus any earlier checkpoints
+    the tab lacks (all of them the first time, on an existing season).
+
+    history_data is MatchHistory as read before game_id's rows went in;
+    creates the RatingSnapshots tab, through the plan, if there is none.
+    """
+    ws = _snapshot_worksheet(ss)
+    latest = 0
+    if ws is None:
+        ws = plan.add_worksheet(RATING_SNAPSHOTS, SNAPSHOT_HEADER)
+    else:
+        col_a = ws.col_values(1)
+        latest = int(float(col_a[1])) if len(col_a) > 1 and col_a[1] else 0
+
+    every = RATING_SNAPSHOT_EVERY
+    history = [r for r in reversed(history_data[1:]) if r[0]]  # oldest first
+    first = int(float(history[0][0])) if history else game_id
+    start = -(-max(latest + 1, first) // every) * every
+    due = iter(range(start, game_id, every))
+
+    ratings, blocks = {}, []
+    checkpoint = next(due, None)
+    for r in history:
+        gid = int(float(r[0]))
+        while checkpoint is not None and checkpoint < gid:
+            blocks.append(_snapshot_rows(checkpoint, ratings))
+            checkpoint = next(due, None)
+        _fold_history(ratings, [r])
+    while checkpoint is not None:  # ids skipped before game_id
+        blocks.append(_snapshot_rows(checkpoint, ratings))
+        checkpoint = next(due, None)
+    ratings.update((n, (nr["mu"], nr["sigma"])) for n, nr in new_ratings.items())
+    blocks.append(_snapshot_rows(game_id, ratings))
+
+    rows = [row for block in reversed(blocks) for row in block]  # newest first
+    if rows:
+        plan.insert_rows(ws, rows, row=2)
+
+
+def _drop_rating_snapshots(ss, plan, game_id):
+    """Delete checkpoints taken at or after game_id, which is being undone."""
+    ws = _snapshot_worksheet(ss)
+    if ws is None:
+        return
+    ids, spans = _game_spans(ws.col_values(1))
+    stale = [span for gid, span in zip(ids, spans) if gid >= game_id]
+    if stale:
+        plan.delete_rows(ws, stale[0][0], stale[-1][1])
+
+
+def _rewrite_rating_snapshots(ss, plan, history_data, game_id, corrected):
+    """Rebuild the checkpoints taken at or after game_id, which an edit to it
+    may have changed: the nearest earlier checkpoint, then the MatchHistory
+    rows since, with `corrected` ({sheet row: row}) standing in for the
+    rows the edit rewrote. history_data is MatchHistory as read before it.
+    """
+    ws = _snapshot_worksheet(ss)
+    if ws is None:
+        return
+    ids, spans = _game_spans(ws.col_values(1))
+    n = sum(1 for gid in ids if gid >= game_id)  # ids descend
+    if not n:
+        return
+
+    ratings, base = {}, 0
+    if n < len(ids):
+        base = ids[n]
+        first, last = spans[n]
+        for r in ws.get_values(f"A{first}:D{last}"):
+            ratings[r[1]] = (float(r[2]), float(r[3]))
+    since = []  # the rows after checkpoint `base`, newest first
+    for i, r in enumerate(history_data[1:], start=2):
+        if r[0] and int(float(r[0])) <= base:
+            break
+        since.append(corrected.get(i, r))
+
+    due = iter(reversed(ids[:n]))
+    checkpoint, blocks = next(due), []
+    for r in reversed(since):
+        if not r[0]:
+            continue
+        while checkpoint is not None and checkpoint < int(float(r[0])):
+            blocks.append(_snapshot_rows(checkpoint, ratings))
+            checkpoint = next(due, None)
+        _fold_history(ratings, [r])
+    while checkpoint is not None:
+        blocks.append(_snapshot_rows(checkpoint, ratings))
+        checkpoint = next(due, None)
+
+    plan.delete_rows(ws, spans[0][0], spans[n - 1][1])
+    rows = [row for block in reversed(blocks) for row in block]  # newest first
+    if rows:
+        plan.insert_rows(ws, rows, row=2)
+
+
+def _ratings_at(ss, game_id):
+    """{name: (mu, sigma)} as of the end of game_id: the nearest checkpoint
+    at or before it, then the MatchHistory rows of the games in between."""
+    ratings, base = {}, 0
+    ws_snap = _snapshot_worksheet(ss)
+    if ws_snap is not None:
+        ids, spans = _game_spans(ws_snap.col_values(1))
+        i = bisect.bisect_left(ids, -game_id, key=operator.neg)  # ids descend
+        if i < len(ids):
+            base = ids[i]
+            first, last = spans[i]
+            for r in ws_snap.get_values(f"A{first}:D{last}"):
+                ratings[r[1]] = (float(r[2]), float(r[3]))
+
+    ws = ss.worksheet("MatchHistory")
+    ids, spans = _match_history_index(ss, ws)
+    newest = bisect.bisect_left(ids, -game_id, key=operator.neg)
+    oldest = bisect.bisect_left(ids, -base, key=operator.neg)  # first id <= base
+    if newest < oldest:
+        rows = ws.get_values(f"A{spans[newest][0]}:K{spans[oldest - 1][1]}")
+        _fold_history(ratings, reversed(rows))
+    return ratings
+
+
+def get_ratings_at(body):
+    """Leaderboard as it stood after game `game_id`."""
+    try:
+        game_id = int(float(body.get("game_id")))
+    except (TypeError, ValueError):
+        raise ValueError("game_id is required and must be a number")
+
+    players = [
+        {"name": name, "mu": mu, "sigma": sigma, "rating": display_rating(mu, sigma)}
+        for name, (mu, sigma) in _ratings_at(get_sheet(), game_id).items()
+    ]
+    players.sort(key=lambda p: p["rating"], reverse=True)
+    return {"game_id": game_id, "players": players}
+
+
 def get_stats():
     ss = get_sheet()
+    stats_data = ss.worksheet("Stats Summary").get_all_values()
+    return _stats_payload(stats_data, _game_winners(_match_history(ss)))
+
+
+def _game_winners(h):
+    """Winning side per game ("Mafia" or anything else for town)."""
+    s, win, loss = h.strings, h.string_id("Win"), h.string_id("Loss")
+    game_results = {}
+    for gid, alignment, result in zip(
+        reversed(h.game), reversed(h.alignment), reversed(h.result)
+    ):
+        if gid == json_store.BLANK or gid in game_results:
+            continue
+        if result == win:
+            game_results[gid] = s[alignment]
+        elif result == loss:
+            game_results[gid] = "Town" if s[alignment] == "Mafia" else "Mafia"
+    return list(game_results.values())
+
 
-    ws_stats = ss.worksheet("Stats Summary")
-    stats_data = ws_stats.get_all_values()
+def _stats_payload(stats_data, winners):
     players = []
     for row in stats_data[1:]:
         if not row[0]:
@@ -733,22 +1046,8 @@ def get_stats():
             }
         )
 
-    ws_history = ss.worksheet("MatchHistory")
-    history_data = ws_history.get_all_values()
-    game_results = {}
-    for row in history_data[1:]:
-        gid = row[0]
-        if not gid or gid in game_results:
-            continue
-        alignment = row[2]
-        result = row[3]
-        if result == "Win":
-            game_results[gid] = alignment
-        elif result == "Loss":
-            game_results[gid] = "Town" if alignment == "Mafia" else "Mafia"
-
-    total_games = len(game_results)
-    mafia_wins = sum(1 for w in game_results.values() if w == "Mafia")
+    total_games = len(winners)
+    mafia_wins = sum(1 for w in winners if w == "Mafia")
     town_wins = total_games - mafia_wins
 
     return {
@@ -772,66 +1071,266 @@ def get_player_history(body):
     if not player_name:
         raise ValueError("player_name is required")
 
-    ss = get_sheet()
-    ws_history = ss.worksheet("MatchHistory")
-    history_data = ws_history.get_all_values()
+    h, rows = _player_history_rows(get_sheet(), [player_name])
+    return {"player_name": player_name, "games": _player_history_payload(h, rows[player_name])}
+
+
+def suggest_assignments(body):
+    """Mafia picks for a 13-15 name lobby whose predicted mafia win rate is
+    closest to the target (body["target"], default MAFIA_WIN_TARGET).
+
+    Returns up to `k` (default 5) suggestions, closest first, each with the
+    mafia and town names as given and the predicted probability; see
+    balance.suggest for how near-ties are broken. Deliberately not a
+    READ_ACTION: the draw is random, so a 304 would replay an old one.
+    """
+    names = _name_list(body, "names")
+    if not 13 <= len(names) <= 15:
+        raise ValueError("names must list 13-15 players")
+    canonical = [NAME_ALIASES.get(n, n) for n in names]
+    if len(set(canonical)) != len(canonical):
+        raise ValueError("names must not repeat")
+    try:
+        k = max(1, min(int(body.get("k") or 5), SUGGEST_MAX))
+        target = body.get("target")
+        target = MAFIA_WIN_TARGET if target is None else float(target)
+    except (TypeError, ValueError):
+        raise ValueError("k and target must be numbers")
+
+    mu, sigma = _current_ratings(canonical)
+
+    suggestions = []
+    import balance  # numpy
+
+    for mafia, p in balance.suggest(mu, sigma, RATING_CONFIG, target, k=k):
+        suggestions.append(
+            {
+                "mafia": [names[i] for i in mafia],
+                "town": [n for i, n in enumerate(names) if i not in mafia],
+                "mafia_win_probability": round(p, 4),
+            }
+        )
+    return {"target": target, "suggestions": suggestions}
+
+
+def _name_list(body, key):
+    names = body.get(key)
+    if names is None:
+        return []
+    if isinstance(names, str):  # GET: key=Alice,Bob
+        names = names.split(",")
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        raise ValueError(f"{key} must be a list of names")
+    return [n.strip() for n in names if n.strip()]
+
+
+def _current_ratings(canonical):
+    """(mu list, sigma list) for canonical names; unknown players get the prior."""
+    ratings = {
+        p["name"]: p for p in _players_payload(
+            get_sheet().worksheet("MatchRatings").get_all_values()
+        )["players"]
+    }
+    mu = [ratings[n]["mu"] if n in ratings else TRUESKILL_MU for n in canonical]
+    sigma = [ratings[n]["sigma"] if n in ratings else TRUESKILL_SIGMA for n in canonical]
+    return mu, sigma
 
+
+def predict_game(body):
+    """Pre-game odds for a set of teams under the current ratings.
+
+    body: mafia, town (name lists, or comma-separated for GET), real players
+    only; ghosts are padded in exactly as record_game would rate the game.
+    """
+    mafia = _name_list(body, "mafia")
+    town = _name_list(body, "town")
+    if not mafia or not town:
+        raise ValueError("mafia and town must each name a player")
+    canonical = [NAME_ALIASES.get(n, n) for n in mafia + town]
+    if len(set(canonical)) != len(canonical):
+        raise ValueError("names must not repeat")
+
+    mu, sigma = _current_ratings(canonical)
+    n = len(mafia)
+    p = rating_engine.predict_mafia_win(
+        mu[:n], sigma[:n], mu[n:], sigma[n:], RATING_CONFIG
+    )
+
+    def team(names, mu, sigma):
+        return [
+            {"name": name, "rating": display_rating(m, s)}
+            for name, m, s in zip(names, mu, sigma)
+        ]
+
+    return {
+        "mafia_win_probability": round(float(p), 4),
+        "mafia": team(mafia, mu[:n], sigma[:n]),
+        "town": team(town, mu[n:], sigma[n:]),
+    }
+
+
+def get_player_histories(body):
+    """getPlayerHistory for several players at once:
+    {"histories": {name: games}} in the order asked for."""
+    names = _name_list(body, "player_names")
+    if not names:
+        raise ValueError("player_names is required")
+
+    h, rows = _player_history_rows(get_sheet(), names)
+    return {"histories": {n: _player_history_payload(h, rows[n]) for n in names}}
+
+
+def _player_history_rows(ss, names):
+    """(MatchHistory as a History, {name: offsets of that player's rows}),
+    newest first.
+
+    The GCS storages answer from json_store's per-generation player index;
+    on Sheets the index is built once from this request's read.
+    """
+    h = _match_history(ss)
+    if STORAGE in JSON_STORAGES:
+        return h, {n: ss.player_rows(n) for n in names}
+    index = json_store.build_player_index(h)
+    return h, {n: index.get(n, []) for n in names}
+
+
+def _player_history_payload(h, rows):
+    s = h.strings
     games = []
-    for row in history_data[1:]:
-        if row[1] != player_name:
-            continue
+    for i in map(h.column_index, rows):
         entry = {
-            "game_id": int(float(row[0])),
-            "alignment": row[2],
-            "result": row[3],
-            "rate_change": int(float(row[4])) if row[4] else 0,
+            "game_id": h.game[i],
+            "alignment": s[h.alignment[i]],
+            "result": s[h.result[i]],
+            "rate_change": _history_int(h.rate_change[i]),
         }
-        if row[5]:
-            entry["old_rating"] = int(float(row[8]))
-            entry["new_rating"] = int(float(row[9]))
+        if _is_rated(h, i):
+            entry["old_rating"] = h.old_rating[i]
+            entry["new_rating"] = h.new_rating[i]
         games.append(entry)
+    return games
 
-    return {"player_name": player_name, "games": games}
 
+def get_match_history(body=None):
+    """Return games as last-game-style payloads, newest first.
 
-def get_match_history():
-    """Return all games as last-game-style payloads, newest first."""
+    With `limit` and/or `before_game_id` in the body, returns one page: up
+    to `limit` games older than `before_game_id`, plus the cursor for the
+    next page (`next_before_game_id`, None on the last page). Without
+    either, returns every game as before.
+    """
     ss = get_sheet()
+    if _is_paged(body):
+        return _match_history_page(ss, body)
+    return _match_history_payload(_match_history(ss))
+
+
+MATCH_HISTORY_PAGE = 20  # default page size
+MATCH_HISTORY_MAX_PAGE = 100
+
+# STORAGE -> (document version, index); see _match_history_index
+_history_index_cache: dict[str, tuple[int, tuple[list[int], list[tuple[int, int]]]]] = {}
+
+
+def _is_paged(body):
+    return bool(body) and (
+        body.get("limit") is not None or body.get("before_game_id") is not None
+    )
+
+
+def _match_history_index(ss, ws):
+    """(game ids, (first_row, last_row) per game), both newest first, with
+    1-based sheet rows.
+
+    Built from column A alone (History.game on the GCS storages, where it is
+    also kept per document version, so pages served between writes don't
+    rescan the history).
+    """
+    if STORAGE not in JSON_STORAGES:
+        return _game_spans(ws.col_values(1))
+    version = ss.version()
+    cached = _history_index_cache.get(STORAGE)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    h = ss.match_history()
+    index = _game_spans([h[0][0], *reversed(h.game)])
+    _history_index_cache[STORAGE] = (version, index)
+    return index
+
+
+def _game_spans(col_a):
+    """(game ids, (first_row, last_row) per game) from a GameID column,
+    header included, for a tab whose games are contiguous row blocks. The
+    column is the cells as read or, below the header, History.game ints."""
+    ids, spans = [], []
+    for row, gid in enumerate(col_a[1:], start=2):
+        if not gid or gid == json_store.BLANK:
+            continue
+        gid = int(float(gid))
+        if ids and ids[-1] == gid:
+            spans[-1] = (spans[-1][0], row)
+        else:
+            ids.append(gid)
+            spans.append((row, row))
+    return ids, spans
+
+
+def _match_history_page(ss, body):
+    try:
+        limit = int(body.get("limit") or MATCH_HISTORY_PAGE)
+        before = body.get("before_game_id")
+        before = int(float(before)) if before not in (None, "") else None
+    except (TypeError, ValueError):
+        raise ValueError("limit and before_game_id must be numbers")
+    limit = max(1, min(limit, MATCH_HISTORY_MAX_PAGE))
+
     ws = ss.worksheet("MatchHistory")
-    rows = ws.get_all_values()[1:]
+    ids, spans = _match_history_index(ss, ws)
+    # ids are descending: the page starts at the first id below the cursor.
+    start = 0 if before is None else bisect.bisect_left(ids, 1 - before, key=operator.neg)
+    page = spans[start : start + limit]
+    if not page:
+        return {"games": [], "next_before_game_id": None}
+    if STORAGE in JSON_STORAGES:
+        games = _match_history_payload(ss.match_history(), page[0][0] - 1, page[-1][1])
+    else:
+        rows = ws.get_values(f"A{page[0][0]}:K{page[-1][1]}")
+        games = _match_history_payload(json_store.History([[], *rows]))  # no header
+    more = start + limit < len(ids)
+    return {
+        "games": games["games"],
+        "next_before_game_id": ids[start + limit - 1] if more else None,
+    }
+
+
+def _match_history_payload(h, start=1, stop=None):
+    """Games from sheet-order History rows start:stop (default: all but the
+    header), in that order."""
+    s = h.strings
     games = {}
     order = []
-    for r in rows:
-        gid = r[0]
-        if not gid:
+    for i in h.column_range(start, stop):
+        gid = h.game[i]
+        if gid == json_store.BLANK:
             continue
         if gid not in games:
             games[gid] = {
-                "game_id": int(float(gid)),
+                "game_id": gid,
                 "winner": None,
                 "players": [],
             }
             order.append(gid)
         g = games[gid]
-        name, role, result = r[1], r[2], r[3]
+        role, result = s[h.alignment[i]], s[h.result[i]]
         entry = {
-            "player": name,
+            "player": s[h.player[i]],
             "role": role,
             "alignment": "Mafia" if role == "Mafia" else "Town",
             "result": result,
-            "rate_change": int(float(r[4])) if r[4] else 0,
+            "rate_change": _history_int(h.rate_change[i]),
         }
-        if r[5]:
-            entry.update(
-                {
-                    "old_mu": float(r[5]),
-                    "new_mu": float(r[6]),
-                    "new_sigma": float(r[7]),
-                    "old_rating": int(float(r[8])),
-                    "new_rating": int(float(r[9])),
-                    "old_sigma": float(r[10]),
-                }
-            )
+        if _is_rated(h, i):
+            entry.update(_rating_fields(h, i))
         g["players"].append(entry)
         if g["winner"] is None and result in ("Win", "Loss"):
             align = "Mafia" if role == "Mafia" else "Town"
@@ -841,21 +1340,148 @@ def get_match_history():
     return {"games": [games[gid] for gid in order]}
 
 
+DASHBOARD_FIELDS = ("players", "stats", "last_game", "match_history")
+
+
+def _read_tabs(ss, titles):
+    """{title: get_all_values()} for each tab; one values.batchGet on Sheets."""
+    if STORAGE != "sheets":
+        return {t: ss.worksheet(t).get_all_values() for t in titles}
+    from gspread.utils import absolute_range_name, fill_gaps
+
+    resp = ss.values_batch_get([absolute_range_name(t) for t in titles])
+    return {
+        t: fill_gaps(vr.get("values", []))
+        for t, vr in zip(titles, resp["valueRanges"])
+    }
+
+
+def get_dashboard(body):
+    """getPlayers / getStats / getLastGame / getMatchHistory in one call.
+
+    Each tab is read once and each payload is keyed by its field name;
+    body["fields"] picks a subset (default: all). `limit` / `before_game_id`
+    page match_history as in getMatchHistory. With the full match_history
+    selected, the stats game summary comes from its winners instead of a
+    second pass over MatchHistory.
+    """
+    fields = body.get("fields") or DASHBOARD_FIELDS
+    if isinstance(fields, str):  # GET: fields=players,last_game
+        fields = fields.split(",")
+    unknown = set(fields) - set(DASHBOARD_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown dashboard fields: {', '.join(sorted(unknown))}")
+
+    titles = []
+    if "players" in fields:
+        titles.append("MatchRatings")
+    if "stats" in fields:
+        titles.append("Stats Summary")
+    paged = "match_history" in fields and _is_paged(body)
+    need_history = {"stats", "last_game"} & set(fields) or (
+        "match_history" in fields and not paged
+    )
+    if need_history and STORAGE not in JSON_STORAGES:
+        titles.append("MatchHistory")  # in the same batchGet
+    ss = get_sheet()
+    tabs = _read_tabs(ss, titles)
+    history = _match_history(ss, tabs.get("MatchHistory")) if need_history else None
+
+    result = {}
+    if "players" in fields:
+        result["players"] = _players_payload(tabs["MatchRatings"])
+    if "last_game" in fields:
+        result["last_game"] = _last_game_payload(history)
+    if paged:
+        result["match_history"] = _match_history_page(ss, body)
+    elif "match_history" in fields:
+        result["match_history"] = _match_history_payload(history)
+    if "stats" in fields:
+        if "match_history" in result and not paged:
+            winners = [
+                g["winner"] for g in result["match_history"]["games"] if g["winner"]
+            ]
+        else:
+            winners = _game_winners(history)
+        result["stats"] = _stats_payload(tabs["Stats Summary"], winners)
+    return result
+
+
 # --- HTTP handler ---
 
 
-def make_response(data, status=200):
-    """Create a JSON response with CORS headers."""
+def make_response(data, status=200, etag=None):
+    """Create a JSON response with CORS headers.
+
+    Responses with an ETag may be cached but must be revalidated (the
+    client sends If-None-Match and gets a bodyless 304 if it still
+    matches); everything else is not stored.
+    """
     from flask import make_response as flask_response
 
-    resp = flask_response(json.dumps(data), status)
+    resp = flask_response("" if status == 304 else json.dumps(data), status)
     resp.headers["Content-Type"] = "application/json"
     resp.headers["Access-Control-Allow-Origin"] = "*"
-    resp.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
-    resp.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    resp.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    resp.headers["Access-Control-Allow-Headers"] = "Content-Type, If-None-Match"
+    if etag:
+        resp.headers["ETag"] = etag
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["Access-Control-Expose-Headers"] = "ETag"
+    else:
+        resp.headers["Cache-Control"] = "no-store"
     return resp
 
 
+# Replayed on a write conflict (see _run_write); each handler is safe to run
+# again on the same body.
+WRITE_ACTIONS = {
+    "recordGame": record_game,
+    "recordGames": record_games,
+    "undoLastGame": undo_last_game,
+    "editGame": edit_game,
+}
+
+# Actions that only read storage. They are also served over GET (query
+# string parameters) and carry an ETag for conditional requests.
+READ_ACTIONS = (
+    "getPlayers",
+    "getLastGame",
+    "getStats",
+    "getPlayerHistory",
+    "getPlayerHistories",
+    "getRatingsAt",
+    "predictGame",
+    "getMatchHistory",
+    "getDashboard",
+)
+
+
+def _storage_version():
+    """Generation of the stored document, without downloading it. None on
+    Sheets: the spreadsheets scope exposes no cheap revision marker, so
+    those ETags hash the payload instead."""
+    if STORAGE in JSON_STORAGES:
+        return get_sheet().version()
+    return None
+
+
+def _etag(action, body, version=None, result=None):
+    """Strong ETag for a read: the action and its parameters, the deployed
+    revision, and either the storage generation or the payload itself."""
+    params = {k: v for k, v in body.items() if k not in ("action", "password")}
+    key = [action, params, os.environ.get("K_REVISION", "")]
+    key.append([STORAGE, version] if version is not None else result)
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def _not_modified(request, etag):
+    header = request.headers.get("If-None-Match", "")
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag in tags or "*" in tags
+
+
 def _check_password(body):
     if body.get("password") != GAME_PASSWORD:
         raise ValueError("Incorrect password")
@@ -869,30 +1495,58 @@ def main(request):
 
     _reset_storage_state()
     try:
-        body = request.get_json(silent=True) or json.loads(request.data or "{}")
+        if request.method == "GET":
+            body = request.args.to_dict()
+        else:
+            body = request.get_json(silent=True) or json.loads(request.data or "{}")
         action = body.get("action")
+        if request.method == "GET" and action not in READ_ACTIONS:
+            return make_response({"error": f"{action} requires POST"}, 405)
+
+        # A warm instance answers an unchanged read from GCS metadata alone.
+        etag = None
+        if action in READ_ACTIONS:
+            version = _storage_version()
+            if version is not None:
+                etag = _etag(action, body, version)
+                if _not_modified(request, etag):
+                    return make_response(None, 304, etag)
 
         if action == "getPlayers":
             result = get_players()
         elif action == "getLastGame":
             result = get_last_game()
-        elif action == "recordGame":
-            _check_password(body)
-            result = record_game(body)
-        elif action == "undoLastGame":
+        elif action in WRITE_ACTIONS:
             _check_password(body)
-            result = undo_last_game()
+            handler = WRITE_ACTIONS[action]
+            result = _run_write(action, lambda: handler(body))
         elif action == "getStats":
             result = get_stats()
         elif action == "getPlayerHistory":
             result = get_player_history(body)
+        elif action == "getPlayerHistories":
+            result = get_player_histories(body)
+        elif action == "getRatingsAt":
+            result = get_ratings_at(body)
+        elif action == "suggestAssignments":
+            result = suggest_assignments(body)
+        elif action == "predictGame":
+            result = predict_game(body)
+        elif action == "previewGame":
+            result = preview_game(body)
         elif action == "getMatchHistory":
-            result = get_match_history()
+            result = get_match_history(body)
+        elif action == "getDashboard":
+            result = get_dashboard(body)
         else:
             return make_response({"error": f"Unknown action: {action}"}, 400)
 
         _flush_storage()
-        return make_response(result)
+        if action in READ_ACTIONS and etag is None:
+            etag = _etag(action, body, result=result)
+            if _not_modified(request, etag):
+                return make_response(None, 304, etag)
+        return make_response(result, etag=etag)
 
     except Exception as e:
         return make_response({"error": str(e)}, 500)
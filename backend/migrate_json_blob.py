@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Rewrite the gcs_json blob (or an event log snapshot) in another format.
+
+Reads the object in whatever format it is in and re-uploads it in format
+--version (default: json_store.FORMAT_VERSION), conditional on the
+generation it read, so a game recorded meanwhile is never overwritten.
+--version 1 is the rollback: the indented all-strings layout that code from
+before format 2 reads.
+
+Writes are dry-run unless --apply is given; either way the before/after
+sizes are printed.
+
+Usage:
+    python migrate_json_blob.py [--bucket B] [--object O] [--version N] [--apply]
+"""
+
+import argparse
+import os
+import sys
+
+import json_store
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bucket", default=os.environ.get("JSON_BUCKET"))
+    ap.add_argument("--object", default=os.environ.get("JSON_OBJECT", "mafia.json"))
+    ap.add_argument("--version", type=int, default=json_store.FORMAT_VERSION)
+    ap.add_argument("--apply", action="store_true")
+    args = ap.parse_args()
+    if not args.bucket:
+        sys.exit("--bucket (or JSON_BUCKET) is required")
+
+    bucket = json_store._default_storage_client().bucket(args.bucket)
+    blob = bucket.get_blob(args.object)
+    if blob is None:
+        sys.exit(f"gs://{args.bucket}/{args.object} does not exist")
+    raw = blob.download_as_bytes(raw_download=True, if_generation_match=blob.generation)
+    doc = json_store.decode_doc(raw)
+    body, encoding = json_store.encode_doc(doc, args.version)
+
+    tabs = ", ".join(f"{name}: {max(len(rows) - 1, 0)} rows" for name, rows in doc["tabs"].items())
+    print(f"gs://{args.bucket}/{args.object} (generation {blob.generation})")
+    print(f"  tabs:   {tabs or '-'}")
+    print(f"  before: {len(raw):>10,} bytes ({blob.content_encoding or 'identity'})")
+    print(f"  after:  {len(body):>10,} bytes ({encoding or 'identity'}, format {args.version})")
+
+    if not args.apply:
+        print("\nDry run. Re-run with --apply to write it.")
+        return
+    blob.content_encoding = encoding
+    blob.upload_from_string(
+        body, content_type="application/json", if_generation_match=blob.generation
+    )
+    print(f"\nWritten (generation {blob.generation}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+"""Shared TrueSkill engine for ghost-padded mafia-vs-town games.
+
+Every rating path in the repo (backend/main.py, the ego_mafia import scripts,
+the re-rate and simulation scripts) goes through compute_trueskill here, with
+a Config carrying the ghost mu/sigma, beta and tau it should use.
+
+A game is always exactly two teams, so the `trueskill` factor graph collapses
+to a single truncated-Gaussian comparison of team performances. For every
+participant i (real player, mafia avg filler or ghost):
+
+    s_i^2  = sigma_i^2 + tau^2
+    c^2    = sum_i (s_i^2 + beta^2)                      over both teams
+    t      = (sum mu_winner - sum mu_loser - draw_margin) / c
+    v      = pdf(t) / cdf(t),    w = v * (v + t)
+    mu_i'  = mu_i +/- s_i^2 / c * v                       (+ winners, - losers)
+    sigma_i' = sqrt(s_i^2 * (1 - s_i^2 / c^2 * w))
+
+Mafia is padded with (n_town - n_mafia) geometric-mean fillers plus n_town
+mafia ghosts; town with n_town town ghosts. cdf/pdf/ppf are ports of
+trueskill's builtin backend (including its erfc approximation and the small
+non-zero draw margin it yields for draw_probability=0) so the closed form
+matches `TrueSkill.rate` to ~1e-12. predict_mafia_win gives the pre-game
+mafia win probability cdf((sum mu_mafia - sum mu_town) / c) under the same
+padding.
+
+Backends, selected per call, via set_backend(), or with RATING_BACKEND:
+    "python"    — pure-Python closed form (default; fastest for one game)
+    "numpy"     — rate_arrays, also usable directly on batches of games
+    "trueskill" — the trueskill library's factor graph (reference)
+
+Run bench_rating_engine.py for games/second per backend.
+"""
+
+import functools
+import math
+import os
+from dataclasses import dataclass
+
+# numpy is imported inside the array functions below: the backend's
+# record / undo / read path only uses the pure-Python update, and numpy is
+# the largest import a cold start would otherwise pay for.
+
+PRIOR_MU = 25.0
+PRIOR_SIGMA = 25.0 / 3.0
+
+
+@dataclass(frozen=True)
+class Config:
+    mafia_ghost_mu: float
+    town_ghost_mu: float
+    beta: float
+    tau: float = 0.1
+    mafia_ghost_sigma: float = 0.8
+    town_ghost_sigma: float = 0.8
+    draw_probability: float = 0.0
+    label: str = ""
+
+
+# Original mafia site (Sheets) and ego-mafia (GCS JSON) production configs.
+MAIN = Config(25.7, 23.85, 5.5, label="Main (25.7/23.85 b5.5)")
+EGO = Config(25.275, 24.275, 5.0, label="Ego (25.275/24.275 b5.0)")
+
+
+# --- trueskill builtin backend, ported ---
+
+
+def _erfc_tail(z, exp):
+    """Numerical Recipes erfcc for z >= 0, as in trueskill.backends.erfc."""
+    t = 1.0 / (1.0 + z / 2.0)
+    return t * exp(-z * z - 1.26551223 + t * (1.00002368 + t * (
+        0.37409196 + t * (0.09678418 + t * (-0.18628806 + t * (
+            0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+                -0.82215223 + t * 0.17087277
+            )))
+        )))
+    )))
+
+
+def _erfc(x):
+    r = _erfc_tail(abs(x), math.exp)
+    return 2.0 - r if x < 0 else r
+
+
+def _erfc_np(x):
+    import numpy as np
+    r = _erfc_tail(np.abs(x), np.exp)
+    return np.where(x < 0, 2.0 - r, r)
+
+
+def cdf(x):
+    return 0.5 * _erfc(-x / math.sqrt(2))
+
+
+def pdf(x):
+    return 1 / math.sqrt(2 * math.pi) * math.exp(-(x ** 2) / 2)
+
+
+def _cdf_np(x):
+    return 0.5 * _erfc_np(-x / math.sqrt(2))
+
+
+def _pdf_np(x):
+    import numpy as np
+    return 1 / math.sqrt(2 * math.pi) * np.exp(-(x ** 2) / 2)
+
+
+def _erfcinv(y):
+    """trueskill.backends erfcinv, built on the same erfc approximation."""
+    if y >= 2:
+        return -100.0
+    elif y <= 0:
+        return 100.0
+    zero_point = y < 1
+    if not zero_point:
+        y = 2 - y
+    t = math.sqrt(-2 * math.log(y / 2.0))
+    x = -0.70711 * ((2.30753 + t * 0.27061) / (1.0 + t * (0.99229 + t * 0.04481)) - t)
+    for _ in range(2):
+        err = _erfc(x) - y
+        x += err / (1.12837916709551257 * math.exp(-(x ** 2)) - x * err)
+    return x if zero_point else -x
+
+
+def ppf(x):
+    return -math.sqrt(2) * _erfcinv(2 * x)
+
+
+def draw_margin(draw_probability, size, beta):
+    """trueskill.calc_draw_margin for a comparison of `size` players."""
+    return ppf((draw_probability + 1) / 2.0) * math.sqrt(size) * beta
+
+
+def _check_w(ok):
+    if not ok:
+        raise FloatingPointError("TrueSkill update left (0, 1) for w")
+
+
+# --- numpy backend ---
+
+
+def _ghost_terms(cfg):
+    """Per-config constants of the padding: tau^2, beta^2, and each ghost
+    seat's mu and performance variance (sigma^2 + tau^2 + beta^2)."""
+    import numpy as np
+    tau2 = np.asarray(cfg.tau, dtype=float) ** 2
+    beta2 = np.asarray(cfg.beta, dtype=float) ** 2
+    mafia_ghost_s2 = np.asarray(cfg.mafia_ghost_sigma, dtype=float) ** 2 + tau2
+    town_ghost_s2 = np.asarray(cfg.town_ghost_sigma, dtype=float) ** 2 + tau2
+    return (
+        tau2,
+        beta2,
+        np.asarray(cfg.mafia_ghost_mu, dtype=float),
+        np.asarray(cfg.town_ghost_mu, dtype=float),
+        mafia_ghost_s2 + beta2,
+        town_ghost_s2 + beta2,
+    )
+
+
+_ghost_terms_cached = functools.lru_cache(maxsize=32)(_ghost_terms)
+
+
+def ghost_terms(cfg):
+    """_ghost_terms, computed once per Config. Configs holding arrays (one
+    parameter set per game, as the fitter builds) are unhashable and are
+    computed per call instead."""
+    try:
+        return _ghost_terms_cached(cfg)
+    except TypeError:
+        return _ghost_terms(cfg)
+
+
+def _team_terms(mafia_mu, mafia_sigma, town_mu, town_sigma, cfg,
+                mafia_dup, town_dup):
+    """Ghost-padded team sums shared by rate_arrays and predict_mafia_win.
+
+    Config fields may be scalars or arrays broadcasting against the batch
+    shape (one parameter set per game, as the fitter uses).
+    """
+    import numpy as np
+    n_mafia = mafia_mu.shape[-1]
+    n_town = town_mu.shape[-1]
+    n_avg = max(n_town - n_mafia, 0)
+    (tau2, beta2, mafia_ghost_mu, town_ghost_mu,
+     mafia_ghost_var, town_ghost_var) = ghost_terms(cfg)
+    seat_tau2 = tau2[..., None]
+    seat_beta2 = beta2[..., None]
+
+    mafia_s2 = mafia_sigma ** 2 + seat_tau2
+    town_s2 = town_sigma ** 2 + seat_tau2
+    mafia_keep = 1.0 if mafia_dup is None else ~np.asarray(mafia_dup, dtype=bool)
+    town_keep = 1.0 if town_dup is None else ~np.asarray(town_dup, dtype=bool)
+
+    # Geometric-mean fillers: one Rating(mu_avg, sigma_avg) per missing seat.
+    mu_avg = np.prod(mafia_mu, axis=-1) ** (1 / n_mafia)
+    sigma_avg = np.prod(mafia_sigma, axis=-1) ** (1 / n_mafia)
+    avg_s2 = sigma_avg ** 2 + tau2
+
+    mafia_sum = (
+        np.sum(mafia_mu * mafia_keep, axis=-1)
+        + n_avg * mu_avg
+        + n_town * mafia_ghost_mu
+    )
+    town_sum = np.sum(town_mu * town_keep, axis=-1) + n_town * town_ghost_mu
+    mafia_var = (
+        np.sum((mafia_s2 + seat_beta2) * mafia_keep, axis=-1)
+        + n_avg * (avg_s2 + beta2)
+        + n_town * mafia_ghost_var
+    )
+    town_var = np.sum((town_s2 + seat_beta2) * town_keep, axis=-1) + n_town * town_ghost_var
+    n_members = (
+        np.sum(np.broadcast_to(mafia_keep, mafia_mu.shape), axis=-1)
+        + n_avg
+        + 2 * n_town
+        + np.sum(np.broadcast_to(town_keep, town_mu.shape), axis=-1)
+    )
+    return mafia_s2, town_s2, mafia_sum, town_sum, mafia_var + town_var, n_members
+
+
+def rate_arrays(
+    mafia_mu,
+    mafia_sigma,
+    town_mu,
+    town_sigma,
+    mafia_won,
+    cfg,
+    mafia_dup=None,
+    town_dup=None,
+):
+    """Rate one game (or a batch of same-shaped games) in closed form.
+
+    Inputs may carry any leading batch shape: mafia_mu[..., n_mafia],
+    town_mu[..., n_town], mafia_won[...].
+
+    `mafia_dup` / `town_dup` are optional boolean masks marking repeated
+    names. The Rating-dict construction collapses a repeated name to its
+    last occurrence, but the repeats still count toward the filler/ghost
+    counts and the mafia geometric mean; masked entries reproduce that.
+
+    Returns (new_mafia_mu, new_mafia_sigma, new_town_mu, new_town_sigma).
+    Raises FloatingPointError where trueskill would (w outside (0, 1)).
+    """
+    import numpy as np
+    mafia_mu = np.asarray(mafia_mu, dtype=float)
+    mafia_sigma = np.asarray(mafia_sigma, dtype=float)
+    town_mu = np.asarray(town_mu, dtype=float)
+    town_sigma = np.asarray(town_sigma, dtype=float)
+    mafia_won = np.asarray(mafia_won, dtype=bool)
+
+    mafia_s2, town_s2, mafia_sum, town_sum, c2, n_members = _team_terms(
+        mafia_mu, mafia_sigma, town_mu, town_sigma, cfg, mafia_dup, town_dup
+    )
+    c = np.sqrt(c2)
+    # draw_margin() over arrays of sizes (and betas, for per-game configs).
+    margin = ppf((cfg.draw_probability + 1) / 2.0) * np.sqrt(n_members) * cfg.beta
+    diff = np.where(mafia_won, mafia_sum - town_sum, town_sum - mafia_sum)
+    t = (diff - margin) / c
+    denom = _cdf_np(t)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v = np.where(denom > 0, _pdf_np(t) / denom, -t)
+    w = v * (v + t)
+    _check_w(np.all((w > 0) & (w < 1)))
+
+    sign = np.where(mafia_won, 1.0, -1.0)[..., None]
+    v_c = (v / c)[..., None]
+    w_c2 = (w / c2)[..., None]
+
+    new_mafia_mu = mafia_mu + sign * mafia_s2 * v_c
+    new_town_mu = town_mu - sign * town_s2 * v_c
+    new_mafia_sigma = np.sqrt(mafia_s2 * (1 - mafia_s2 * w_c2))
+    new_town_sigma = np.sqrt(town_s2 * (1 - town_s2 * w_c2))
+    return new_mafia_mu, new_mafia_sigma, new_town_mu, new_town_sigma
+
+
+def predict_mafia_win(
+    mafia_mu,
+    mafia_sigma,
+    town_mu,
+    town_sigma,
+    cfg,
+    mafia_dup=None,
+    town_dup=None,
+):
+    """P(mafia wins) before the game, same shapes and padding as rate_arrays.
+
+    cdf((sum mu_mafia - sum mu_town) / c) with c the performance spread the
+    update itself uses (sigma^2 + tau^2 + beta^2 per seat, ghosts included).
+    Any leading batch shape scores many candidate rosters in one call (the
+    ghost terms are per config, see ghost_terms); balance.py, season_sim.py
+    and the backend's predictGame all go through here.
+    """
+    import numpy as np
+    _, _, mafia_sum, town_sum, c2, _ = _team_terms(
+        np.asarray(mafia_mu, dtype=float),
+        np.asarray(mafia_sigma, dtype=float),
+        np.asarray(town_mu, dtype=float),
+        np.asarray(town_sigma, dtype=float),
+        cfg,
+        mafia_dup,
+        town_dup,
+    )
+    return _cdf_np((mafia_sum - town_sum) / np.sqrt(c2))
+
+
+def _dup_mask(names):
+    """True for every occurrence of a name except its last (dict semantics)."""
+    import numpy as np
+    last = {n: i for i, n in enumerate(names)}
+    return np.array([last[n] != i for i, n in enumerate(names)], dtype=bool)
+
+
+def _rate_numpy(mafia_players, town_players, mafia_won, cfg):
+    mafia_names = [p["name"] for p in mafia_players]
+    town_names = [p["name"] for p in town_players]
+    m_mu, m_sigma, t_mu, t_sigma = rate_arrays(
+        [p["mu"] for p in mafia_players],
+        [p["sigma"] for p in mafia_players],
+        [p["mu"] for p in town_players],
+        [p["sigma"] for p in town_players],
+        mafia_won,
+        cfg,
+        mafia_dup=_dup_mask(mafia_names),
+        town_dup=_dup_mask(town_names),
+    )
+    mafia_out = {}
+    for name, mu, sigma in zip(mafia_names, m_mu, m_sigma):
+        mafia_out[name] = {"mu": float(mu), "sigma": float(sigma)}
+    town_out = {}
+    for name, mu, sigma in zip(town_names, t_mu, t_sigma):
+        town_out[name] = {"mu": float(mu), "sigma": float(sigma)}
+    return mafia_out, town_out
+
+
+# --- pure-Python backend ---
+
+
+def _rate_python(mafia_players, town_players, mafia_won, cfg):
+    n_mafia = len(mafia_players)
+    n_town = len(town_players)
+    n_avg = max(n_town - n_mafia, 0)
+    tau2 = cfg.tau * cfg.tau
+    beta2 = cfg.beta * cfg.beta
+
+    # Dicts collapse repeated names exactly as the Rating-dict version does.
+    mafia = {}
+    mu_geo = 1.0
+    sigma_geo = 1.0
+    for p in mafia_players:
+        mafia[p["name"]] = (p["mu"], p["sigma"] ** 2 + tau2)
+        mu_geo *= p["mu"]
+        sigma_geo *= p["sigma"]
+    mu_avg = mu_geo ** (1 / n_mafia)
+    sigma_avg = sigma_geo ** (1 / n_mafia)
+    town = {p["name"]: (p["mu"], p["sigma"] ** 2 + tau2) for p in town_players}
+
+    mafia_sum = (
+        sum(mu for mu, _ in mafia.values())
+        + n_avg * mu_avg
+        + n_town * cfg.mafia_ghost_mu
+    )
+    town_sum = sum(mu for mu, _ in town.values()) + n_town * cfg.town_ghost_mu
+    c2 = (
+        sum(s2 for _, s2 in mafia.values())
+        + sum(s2 for _, s2 in town.values())
+        + n_avg * (sigma_avg ** 2 + tau2)
+        + n_town * (cfg.mafia_ghost_sigma ** 2 + cfg.town_ghost_sigma ** 2 + 2 * tau2)
+        + (len(mafia) + len(town) + n_avg + 2 * n_town) * beta2
+    )
+    c = math.sqrt(c2)
+    size = len(mafia) + len(town) + n_avg + 2 * n_town
+    margin = draw_margin(cfg.draw_probability, size, cfg.beta)
+
+    diff = mafia_sum - town_sum if mafia_won else town_sum - mafia_sum
+    t = (diff - margin) / c
+    denom = cdf(t)
+    v = pdf(t) / denom if denom else -t
+    w = v * (v + t)
+    _check_w(0 < w < 1)
+
+    sign = 1.0 if mafia_won else -1.0
+    return tuple(
+        {
+            name: {
+                "mu": mu + team_sign * s2 / c * v,
+                "sigma": math.sqrt(s2 * (1 - s2 / c2 * w)),
+            }
+            for name, (mu, s2) in team.items()
+        }
+        for team, team_sign in ((mafia, sign), (town, -sign))
+    )
+
+
+# --- trueskill factor-graph backend (reference) ---
+
+
+def _rate_trueskill(mafia_players, town_players, mafia_won, cfg):
+    from trueskill import Rating, TrueSkill
+
+    env = TrueSkill(
+        tau=cfg.tau, beta=cfg.beta, draw_probability=cfg.draw_probability
+    )
+    n_mafia = len(mafia_players)
+    n_town = len(town_players)
+
+    mafia_dict = {}
+    mu_geo = 1.0
+    sigma_geo = 1.0
+    for p in mafia_players:
+        mafia_dict[p["name"]] = Rating(p["mu"], p["sigma"])
+        mu_geo *= p["mu"]
+        sigma_geo *= p["sigma"]
+    mu_avg = mu_geo ** (1 / n_mafia)
+    sigma_avg = sigma_geo ** (1 / n_mafia)
+    for i in range(n_town - n_mafia):
+        mafia_dict[f"_mafia_avg{i}"] = Rating(mu_avg, sigma_avg)
+    for i in range(n_town):
+        mafia_dict[f"_mafia_ghost{i}"] = Rating(cfg.mafia_ghost_mu, cfg.mafia_ghost_sigma)
+
+    town_dict = {}
+    for p in town_players:
+        town_dict[p["name"]] = Rating(p["mu"], p["sigma"])
+    for i in range(n_town):
+        town_dict[f"_town_ghost{i}"] = Rating(cfg.town_ghost_mu, cfg.town_ghost_sigma)
+
+    ranks = [0, 1] if mafia_won else [1, 0]
+    rated = env.rate([mafia_dict, town_dict], ranks=ranks)
+    return tuple(
+        {p["name"]: {"mu": team[p["name"]].mu, "sigma": team[p["name"]].sigma}
+         for p in players}
+        for team, players in zip(rated, (mafia_players, town_players))
+    )
+
+
+BACKENDS = {
+    "python": _rate_python,
+    "numpy": _rate_numpy,
+    "trueskill": _rate_trueskill,
+}
+
+_backend = os.environ.get("RATING_BACKEND", "python")
+
+
+def set_backend(name):
+    """Select the default backend for compute_trueskill."""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"unknown rating backend: {name!r}")
+    _backend = name
+
+
+def get_backend():
+    return _backend
+
+
+def rate_teams(mafia_players, town_players, mafia_won, cfg, backend=None):
+    """Rate one game with ghost-padded teams, keeping the teams apart.
+
+    Each player dict has keys: name, mu, sigma. Returns (mafia, town), each
+    {name: {mu, sigma}} for that team's real players. `backend` overrides
+    the default chosen by set_backend / RATING_BACKEND.
+    """
+    name = backend or _backend
+    try:
+        rate = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown rating backend: {name!r}") from None
+    return rate(mafia_players, town_players, mafia_won, cfg)
+
+
+def compute_trueskill(mafia_players, town_players, mafia_won, cfg, backend=None):
+    """rate_teams merged into one {name: {mu, sigma}} dict.
+
+    A name listed on both teams keeps its town result, as the Rating-dict
+    code in backend/main.py always did.
+    """
+    mafia, town = rate_teams(mafia_players, town_players, mafia_won, cfg, backend)
+    return {**mafia, **town}
@@ -0,0 +1,243 @@
+"""Incremental downstream re-rate after a correction to one recorded game.
+
+fix_names.py and rerate_sheets.py replay the whole season to fix a handful
+of rows. rerate_from_game() instead takes MatchHistory as read (header
+first, newest game first) plus the corrected rows of game G, and replays
+only the games from G on:
+
+  - Every player starts on their stored trajectory. A replayed game whose
+    result for a player differs from the stored one by more than EPSILON
+    (in mu or sigma) marks them as drifting; they carry the recomputed
+    rating into their next game, and drop back out once a game brings them
+    within EPSILON of the stored value again.
+  - A game with no drifting player is skipped, and the replay stops as
+    soon as nobody is drifting.
+
+The result is a minimal diff: the MatchHistory cells that changed (as A1
+ranges within single rows) and the final rating of every drifting player,
+for the caller to write back in one batch. edit_game_rows() builds the
+corrected rows for the usual fixes (names, roles, the winner).
+"""
+
+from dataclasses import dataclass, field
+
+import rating_engine
+
+EPSILON = 1e-6
+
+_COLS = "ABCDEFGHIJK"
+_RATED = ("Win", "Loss")
+_ROLES = ("Mafia", "Town", "Cop", "Medic", "Vigilante")  # the Alignment column
+_NUMERIC_FROM = 4  # RateChange onward
+
+
+@dataclass
+class Rerate:
+    """What an edit changes. `ratings` holds the final (mu, sigma) of each
+    player whose rating moved; `removed` the names left with no games;
+    `rows` each changed MatchHistory row in full, by sheet row."""
+
+    cells: list[tuple[str, list[list]]] = field(default_factory=list)
+    rows: dict[int, list] = field(default_factory=dict)
+    ratings: dict[str, tuple[float, float]] = field(default_factory=dict)
+    removed: list[str] = field(default_factory=list)
+    games: list[int] = field(default_factory=list)  # game ids replayed
+
+
+def _gid(row) -> int | None:
+    return int(float(row[0])) if row and row[0] else None
+
+
+def game_rows(history, game_id) -> list[tuple[int, list[str]]]:
+    """(1-based sheet row, row) for each MatchHistory row of game_id."""
+    out = []
+    for i, row in enumerate(history[1:], start=2):
+        gid = _gid(row)
+        if gid == game_id:
+            out.append((i, row))
+        elif out or (gid is not None and gid < game_id):
+            break  # newest first: the game's rows are one block
+    return out
+
+
+def _winner(rows) -> str:
+    for r in rows:
+        if r[3] in _RATED:
+            team = "Mafia" if r[2] == "Mafia" else "Town"
+            return team if r[3] == "Win" else ("Town" if team == "Mafia" else "Mafia")
+    raise ValueError("game has no rated players")
+
+
+def edit_game_rows(rows, rename=None, roles=None, winner=None) -> list[list[str]]:
+    """Corrected copies of one game's MatchHistory rows.
+
+    `roles` ({name: role}, by the name as recorded) fixes the Alignment
+    column, `rename` ({old: new}, new names already normalized) the Player
+    column, and `winner` ("Mafia" / "Town", default unchanged) the Win/Loss
+    results. Ghost and Night Zero rows keep their result.
+    """
+    rename, roles = rename or {}, roles or {}
+    names = [r[1] for r in rows]
+    for name in [*rename, *roles]:
+        if name not in names:
+            raise ValueError(f"{name} is not in game {rows[0][0]}")
+    for name, role in roles.items():
+        if role not in _ROLES:
+            raise ValueError(f"{name}'s role must be one of {', '.join(_ROLES)}")
+    for name, new in rename.items():
+        if not isinstance(new, str) or not new:
+            raise ValueError(f"{name} must be renamed to a name")
+    if winner is None:
+        winner = _winner(rows)
+    elif winner not in ("Mafia", "Town"):
+        raise ValueError("winner must be Mafia or Town")
+
+    out = []
+    for r in rows:
+        r = list(r) + [""] * (len(_COLS) - len(r))
+        r[2] = roles.get(r[1], r[2])
+        r[1] = rename.get(r[1], r[1])
+        if r[3] in _RATED:
+            r[3] = "Win" if (r[2] == "Mafia") == (winner == "Mafia") else "Loss"
+        out.append(r)
+
+    new_names = [r[1] for r in out]
+    dup = {n for n in new_names if new_names.count(n) > 1} - {
+        n for n in names if names.count(n) > 1
+    }
+    if dup:
+        raise ValueError(f"{', '.join(sorted(dup))} would appear twice in the game")
+    rated = [r for r in out if r[3] in _RATED]
+    if not any(r[2] == "Mafia" for r in rated) or all(r[2] == "Mafia" for r in rated):
+        raise ValueError("both teams need a rated player")
+    return out
+
+
+def _close(a, b, eps) -> bool:
+    return abs(a[0] - b[0]) <= eps and abs(a[1] - b[1]) <= eps
+
+
+def _same_cell(old: str, new, col: int) -> bool:
+    if col >= _NUMERIC_FROM and old != "" and new != "":
+        try:
+            return abs(float(old) - float(new)) <= 1e-9
+        except ValueError:
+            pass
+    return str(old) == str(new)
+
+
+def _diff_row(sheet_row, old, new):
+    """A1 range + values spanning the changed cells of one row, or None."""
+    old = list(old) + [""] * (len(new) - len(old))
+    changed = [c for c in range(len(new)) if not _same_cell(old[c], new[c], c)]
+    if not changed:
+        return None
+    lo, hi = changed[0], changed[-1]
+    return f"{_COLS[lo]}{sheet_row}:{_COLS[hi]}{sheet_row}", [new[lo : hi + 1]]
+
+
+def _rate(rows, inputs, cfg):
+    """Recompute one game's rated rows from {name: (mu, sigma)} inputs."""
+    mafia, town = [], []
+    for r in rows:
+        if r[3] in _RATED:
+            mu, sigma = inputs[r[1]]
+            (mafia if r[2] == "Mafia" else town).append(
+                {"name": r[1], "mu": mu, "sigma": sigma}
+            )
+    mafia_won = _winner(rows) == "Mafia"
+    new = rating_engine.compute_trueskill(mafia, town, mafia_won, cfg)
+
+    out = []
+    for r in rows:
+        if r[3] not in _RATED:
+            out.append([r[0], r[1], r[2], r[3], 0, "", "", "", "", "", ""])
+            continue
+        old_mu, old_sigma = inputs[r[1]]
+        new_mu, new_sigma = new[r[1]]["mu"], new[r[1]]["sigma"]
+        old_rating = round((old_mu - 1.5 * old_sigma) * 68)
+        new_rating = round((new_mu - 1.5 * new_sigma) * 68)
+        out.append([
+            r[0], r[1], r[2], r[3], new_rating - old_rating,
+            old_mu, new_mu, new_sigma, old_rating, new_rating, old_sigma,
+        ])
+    return out, {n: (v["mu"], v["sigma"]) for n, v in new.items()}
+
+
+def rerate_from_game(history, game_id, new_rows, cfg, eps=EPSILON) -> Rerate:
+    """Replay game_id with new_rows (same row count and order as stored)
+    and the games after it, as far as any rating differs; see module doc."""
+    block = game_rows(history, game_id)
+    if not block:
+        raise ValueError(f"Game {game_id} not found")
+    if len(new_rows) != len(block):
+        raise ValueError("an edit must keep the game's rows")
+    first_row, last_row = block[0][0], block[-1][0]
+    newer = history[1 : first_row - 1]
+    older = history[last_row:]
+
+    old_rated = {r[1]: r for _, r in block if r[3] in _RATED and r[6]}
+    new_names = {r[1] for r in new_rows if r[3] in _RATED}
+    before = {}  # rating entering game_id, for everyone it touches
+    wanted = set(old_rated) | new_names
+    for r in older:
+        if r[1] in wanted and r[1] not in before and r[6]:
+            before[r[1]] = (float(r[6]), float(r[7]))
+    prior = (rating_engine.PRIOR_MU, rating_engine.PRIOR_SIGMA)
+    inputs = {n: before.get(n, prior) for n in new_names}
+
+    result = Rerate(games=[game_id])
+    rows, after = _rate(new_rows, inputs, cfg)
+    for (sheet_row, old), new in zip(block, rows):
+        cells = _diff_row(sheet_row, old, new)
+        if cells:
+            result.cells.append(cells)
+            result.rows[sheet_row] = new
+
+    drift = {}
+    for name in set(old_rated) | new_names:
+        now = after[name] if name in after else before.get(name, prior)
+        if name in old_rated:
+            stored = (float(old_rated[name][6]), float(old_rated[name][7]))
+        else:
+            stored = before.get(name, prior)
+        if not _close(now, stored, eps):
+            drift[name] = now
+
+    # Later games, oldest first, with their sheet rows.
+    games = []
+    for i, r in zip(range(first_row - 1, 1, -1), reversed(newer)):
+        gid = _gid(r)
+        if gid is None:
+            continue
+        if not games or games[-1][0] != gid:
+            games.append((gid, []))
+        games[-1][1].insert(0, (i, r))  # keep the sheet's in-game order
+
+    for gid, later in games:
+        if not drift:
+            break
+        rated = [r for _, r in later if r[3] in _RATED]
+        if not any(r[1] in drift for r in rated):
+            continue
+        inputs = {
+            r[1]: drift.get(r[1], (float(r[5]), float(r[10]))) for r in rated
+        }
+        rows, after = _rate([r for _, r in later], inputs, cfg)
+        result.games.append(gid)
+        for (sheet_row, old), new in zip(later, rows):
+            cells = _diff_row(sheet_row, old, new)
+            if cells:
+                result.cells.append(cells)
+                result.rows[sheet_row] = new
+        for r in rated:
+            stored = (float(r[6]), float(r[7]))
+            if _close(after[r[1]], stored, eps):
+                drift.pop(r[1], None)
+            else:
+                drift[r[1]] = after[r[1]]
+
+    result.ratings = drift
+    others = {r[1] for r in newer} | {r[1] for r in older} | {r[1] for r in new_rows}
+    result.removed = sorted({r[1] for _, r in block} - others)
+    return result
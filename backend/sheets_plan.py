@@ -0,0 +1,341 @@
+"""Write planning for record_game / undo_last_game.
+
+Handlers describe their writes to a plan instead of calling worksheet
+methods directly. On the Sheets backend, SheetsWritePlan collects them and
+commit() sends the whole game as one spreadsheets.values.batchUpdate (cell
+values) followed by at most one spreadsheets.batchUpdate (row inserts and
+deletes, new tabs, formula copies, the Stats Summary sort and its
+formatting). A
+game used to cost one round trip per rated player plus several for new
+players and the sort, which ran into the per-minute write quota on busy
+nights.
+
+Value ranges are addressed against the sheet as the handler read it, since
+they land before any structural request; structural requests run in the
+order planned, each seeing the layout the previous one left. An update to
+a sheet that already has a structural change planned would be ambiguous and
+raises ValueError.
+
+The JSON storages already defer everything to one flush, so for them
+ImmediateWrites just calls the worksheet methods as before.
+"""
+
+import numbers
+import zlib
+
+STATS_COLS = 12  # A:L
+RATING_COL = 11  # L, 0-based
+
+
+def _cell(v) -> dict:
+    """CellData for a RAW value, as gspread's insert_rows would write it."""
+    if v is None or v == "":
+        return {}
+    if isinstance(v, bool):
+        return {"userEnteredValue": {"boolValue": v}}
+    if isinstance(v, numbers.Real):
+        return {"userEnteredValue": {"numberValue": float(v)}}
+    return {"userEnteredValue": {"stringValue": str(v)}}
+
+
+def stats_format_requests(sheet_id: int, last_row: int, banding_ids=()) -> list[dict]:
+    """Alternating row colors and borders for Stats Summary rows 1..last_row."""
+    if last_row < 1:
+        return []
+
+    def grid(col_s=0, col_e=STATS_COLS):
+        return {
+            "sheetId": sheet_id,
+            "startRowIndex": 0,
+            "endRowIndex": last_row,
+            "startColumnIndex": col_s,
+            "endColumnIndex": col_e,
+        }
+
+    # Remove existing banded ranges on this sheet
+    requests = [{"deleteBanding": {"bandedRangeId": b}} for b in banding_ids]
+
+    # Add banded range for alternating row colors
+    requests.append(
+        {
+            "addBanding": {
+                "bandedRange": {
+                    "range": grid(),
+                    "rowProperties": {
+                        "headerColor": {"red": 0.208, "green": 0.408, "blue": 0.329},
+                        "firstBandColor": {"red": 1.0, "green": 1.0, "blue": 1.0},
+                        "secondBandColor": {"red": 0.965, "green": 0.973, "blue": 0.976},
+                    },
+                }
+            }
+        }
+    )
+
+    # Outer border around entire block
+    border = {"style": "SOLID", "color": {"red": 0.0, "green": 0.0, "blue": 0.0}}
+    requests.append(
+        {
+            "updateBorders": {
+                "range": grid(),
+                "top": border,
+                "bottom": border,
+                "left": border,
+                "right": border,
+            }
+        }
+    )
+
+    # Vertical borders on both sides of Rating column (L, index 11)
+    requests.append(
+        {
+            "updateBorders": {
+                "range": grid(RATING_COL, RATING_COL + 1),
+                "left": border,
+                "right": border,
+            }
+        }
+    )
+
+    # Vertically center all text
+    requests.append(
+        {
+            "repeatCell": {
+                "range": grid(),
+                "cell": {"userEnteredFormat": {"verticalAlignment": "MIDDLE"}},
+                "fields": "userEnteredFormat.verticalAlignment",
+            }
+        }
+    )
+    return requests
+
+
+class PlannedWorksheet:
+    """A tab SheetsWritePlan.add_worksheet creates at commit: the title and
+    sheet id its later requests in the plan refer to."""
+
+    def __init__(self, title: str, sheet_id: int):
+        self.title = title
+        self.id = sheet_id
+
+
+class ImmediateWrites:
+    """Plan that applies each write at once (JSON storages)."""
+
+    def __init__(self, ss):
+        self._ss = ss
+
+    def add_worksheet(self, title: str, header):
+        ws = self._ss.add_worksheet(title, rows=2, cols=len(header))
+        ws.append_row(header)
+        return ws
+
+    def get_all_values(self, ws) -> list[list[str]]:
+        return ws.get_all_values()
+
+    def update(self, ws, a1: str, values) -> None:
+        ws.update(a1, values)
+
+    def insert_rows(self, ws, rows, row: int) -> None:
+        ws.insert_rows(rows, row=row)
+
+    def delete_rows(self, ws, start: int, end: int | None = None) -> None:
+        ws.delete_rows(start, end)
+
+    def add_stats_rows(self, ws_stats, names) -> None:
+        pass  # Stats Summary is computed on read
+
+    def sort_stats_summary(self, ws_stats) -> None:
+        pass  # the read path orders Stats Summary
+
+    def commit(self) -> None:
+        pass  # the dispatcher's flush is the single write
+
+
+class SheetsWritePlan:
+    """Plan that batches a handler's writes into two Sheets API calls."""
+
+    def __init__(self, ss):
+        self._ss = ss
+        self._data: list[dict] = []  # values.batchUpdate ranges
+        self._requests: list[dict] = []  # spreadsheets.batchUpdate requests
+        self._restructured: set[int] = set()  # sheet ids with structural requests
+        self._rows: dict[int, int] = {}  # sheet id -> row count after the plan
+        self._sort = None  # Stats Summary worksheet to sort at commit, if any
+
+    def get_all_values(self, ws) -> list[list[str]]:
+        """ws.get_all_values(), remembered for the plan's own row counting."""
+        values = ws.get_all_values()
+        self._rows.setdefault(ws.id, len(values))
+        return values
+
+    def _row_count(self, ws) -> int:
+        if ws.id not in self._rows:
+            self.get_all_values(ws)
+        return self._rows[ws.id]
+
+    def _structural(self, ws, *requests) -> None:
+        self._restructured.add(ws.id)
+        self._requests.extend(requests)
+
+    def add_worksheet(self, title: str, header) -> PlannedWorksheet:
+        """A new tab holding just header, added by the structural batch.
+
+        The plan picks the sheet id (a hash of the title) so the requests
+        that fill the tab can go in the same batch. Write to it with
+        insert_rows; its values land after values.batchUpdate has run.
+        """
+        ws = PlannedWorksheet(title, zlib.crc32(title.encode()) & 0x7FFFFFFF)
+        self._structural(
+            ws,
+            {
+                "addSheet": {
+                    "properties": {
+                        "sheetId": ws.id,
+                        "title": title,
+                        "gridProperties": {"rowCount": 2, "columnCount": len(header)},
+                    }
+                }
+            },
+            {
+                "updateCells": {
+                    "rows": [{"values": [_cell(v) for v in header]}],
+                    "fields": "userEnteredValue",
+                    "start": {"sheetId": ws.id, "rowIndex": 0, "columnIndex": 0},
+                }
+            },
+        )
+        self._rows[ws.id] = 1
+        return ws
+
+    def update(self, ws, a1: str, values) -> None:
+        from gspread.utils import absolute_range_name  # deferred: JSON storages never need gspread
+
+        if ws.id in self._restructured:
+            raise ValueError(f"update to {ws.title}!{a1} after a structural change")
+        self._data.append({"range": absolute_range_name(ws.title, a1), "values": values})
+
+    def insert_rows(self, ws, rows, row: int) -> None:
+        start = row - 1
+        self._structural(
+            ws,
+            {
+                "insertDimension": {
+                    "range": {
+                        "sheetId": ws.id,
+                        "dimension": "ROWS",
+                        "startIndex": start,
+                        "endIndex": start + len(rows),
+                    },
+                    "inheritFromBefore": False,
+                }
+            },
+            {
+                "updateCells": {
+                    "rows": [{"values": [_cell(v) for v in r]} for r in rows],
+                    "fields": "userEnteredValue",
+                    "start": {"sheetId": ws.id, "rowIndex": start, "columnIndex": 0},
+                }
+            },
+        )
+        if ws.id in self._rows:
+            self._rows[ws.id] += len(rows)
+
+    def delete_rows(self, ws, start: int, end: int | None = None) -> None:
+        end = start if end is None else end
+        self._structural(
+            ws,
+            {
+                "deleteDimension": {
+                    "range": {
+                        "sheetId": ws.id,
+                        "dimension": "ROWS",
+                        "startIndex": start - 1,
+                        "endIndex": end,
+                    }
+                }
+            },
+        )
+        if ws.id in self._rows:
+            self._rows[ws.id] -= end - start + 1
+
+    def add_stats_rows(self, ws_stats, names) -> None:
+        """Append names to Stats Summary, copying row 2's formulas to B:L."""
+        if not names:
+            return
+        first = self._row_count(ws_stats) + 1
+        self.update(
+            ws_stats, f"A{first}:A{first + len(names) - 1}", [[n] for n in names]
+        )
+        self._structural(
+            ws_stats,
+            {
+                "copyPaste": {
+                    "source": {
+                        "sheetId": ws_stats.id,
+                        "startRowIndex": 1,
+                        "endRowIndex": 2,
+                        "startColumnIndex": 1,
+                        "endColumnIndex": STATS_COLS,
+                    },
+                    # A taller destination repeats the one-row source.
+                    "destination": {
+                        "sheetId": ws_stats.id,
+                        "startRowIndex": first - 1,
+                        "endRowIndex": first - 1 + len(names),
+                        "startColumnIndex": 1,
+                        "endColumnIndex": STATS_COLS,
+                    },
+                    "pasteType": "PASTE_FORMULA",
+                }
+            },
+        )
+        self._rows[ws_stats.id] += len(names)
+
+    def sort_stats_summary(self, ws_stats) -> None:
+        """Sort Stats Summary by Rating descending and re-band it, at commit."""
+        self._row_count(ws_stats)
+        self._sort = ws_stats
+
+    def commit(self) -> None:
+        requests = list(self._requests)
+        if self._sort is not None:
+            ws = self._sort
+            last_row = self._rows[ws.id]
+            if last_row > 1:
+                requests.append(
+                    {
+                        "sortRange": {
+                            "range": {
+                                "sheetId": ws.id,
+                                "startRowIndex": 1,
+                                "endRowIndex": last_row,
+                                "startColumnIndex": 0,
+                                "endColumnIndex": STATS_COLS,
+                            },
+                            "sortSpecs": [
+                                {"dimensionIndex": RATING_COL, "sortOrder": "DESCENDING"}
+                            ],
+                        }
+                    }
+                )
+            requests.extend(
+                stats_format_requests(ws.id, last_row, self._banding_ids(ws.id))
+            )
+
+        if self._data:
+            self._ss.values_batch_update(
+                {"valueInputOption": "RAW", "data": self._data}
+            )
+        if requests:
+            self._ss.batch_update({"requests": requests})
+        self._data, self._requests, self._sort = [], [], None
+        self._restructured.clear()
+
+    def _banding_ids(self, sheet_id: int) -> list[int]:
+        meta = self._ss.fetch_sheet_metadata(
+            params={"fields": "sheets(properties.sheetId,bandedRanges.bandedRangeId)"}
+        )
+        for sheet in meta.get("sheets", []):
+            if sheet["properties"]["sheetId"] == sheet_id:
+                return [b["bandedRangeId"] for b in sheet.get("bandedRanges", [])]
+        return []
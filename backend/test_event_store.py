@@ -0,0 +1,244 @@
+"""Smoke test for event_store (STORAGE=gcs_eventlog) + main.py against a
+fake GCS bucket.
+
+Run from /home/user/mafia/backend:
+    python test_event_store.py
+"""
+
+import json
+import os
+
+from fake_gcs import FakeClient, FakeStore
+
+# --- Test setup ---
+
+STORE = FakeStore()
+HEADER = [
+    "GameID", "Player", "Alignment", "Result", "RateChange",
+    "old_mu", "new_mu", "new_sigma", "old_rating", "new_rating", "old_sigma",
+]
+# Seed document, as left behind by a gcs_json deployment.
+STORE.put(
+    "test.json",
+    json.dumps({
+        "tabs": {
+            "MatchRatings": [["Player", "mu", "sigma"]],
+            "MatchHistory": [HEADER],
+        }
+    }),
+)
+
+os.environ["STORAGE"] = "gcs_eventlog"
+os.environ["JSON_BUCKET"] = "test"
+os.environ["JSON_OBJECT"] = "test.json"
+os.environ["EVENTLOG_COMPACT_EVERY"] = "3"
+os.environ["GAME_PASSWORD"] = "x"
+
+import event_store
+import json_store
+import main
+
+
+def open_log():
+    return event_store.EventLogSpreadsheet(
+        "test", "log/", client=FakeClient(STORE), seed_object="test.json"
+    )
+
+
+event_store.get_event_log_spreadsheet = lambda bucket=None, prefix=None: open_log()
+
+
+def run(action, **body):
+    main._reset_storage_state()
+    if action == "getPlayers":
+        r = main.get_players()
+    elif action == "getLastGame":
+        r = main.get_last_game()
+    elif action == "recordGame":
+        r = main.record_game(body)
+    elif action == "undoLastGame":
+        r = main.undo_last_game()
+    elif action == "getStats":
+        r = main.get_stats()
+    else:
+        raise ValueError(action)
+    main._flush_storage()
+    return r
+
+
+def cold_state():
+    """Tabs as a fresh instance would fold them (no warm cache)."""
+    json_store._doc_cache.clear()
+    json_store._summary_cache.clear()
+    event_store._snapshots.clear()
+    ss = open_log()
+    return {t: ss.worksheet(t).get_all_values() for t in ("MatchRatings", "MatchHistory")}
+
+
+def events():
+    return sorted(n for n in STORE._data if n.startswith("log/events/"))
+
+
+names = [f"P{i}" for i in range(1, 16)]
+assignments = [
+    {
+        "position": i,
+        "name": name,
+        "role": "Mafia" if i <= 3 else "Cop" if i == 4 else "Town",
+        "is_ghost": False,
+    }
+    for i, name in enumerate(names, start=1)
+]
+
+# 1. Empty log reads through to the seed document.
+assert run("getPlayers") == {"players": []}
+print("PASS: empty log starts from the gcs_json seed document")
+
+# 2. Each recordGame appends exactly one small event; nothing else is written.
+seed_gen = STORE.get_generation("test.json")
+r = run("recordGame", assignments=assignments, winner="Town", night0_kills=[])
+assert r["game_id"] == 46, r
+assert events() == ["log/events/0000000001.json"], events()
+assert "log/snapshot.json" not in STORE._data
+assert STORE.get_generation("test.json") == seed_gen
+event = json.loads(STORE.get(events()[0]))
+assert event["seq"] == 1 and {op["tab"] for op in event["ops"]} == {
+    "MatchHistory", "MatchRatings"
+}
+print(f"PASS: recordGame wrote one {len(STORE.get(events()[0]))}-byte event")
+
+# 3. A warm read folds nothing and downloads nothing.
+before = STORE.downloads
+r = run("getLastGame")
+assert r["game"]["game_id"] == 46
+assert STORE.downloads == before
+print("PASS: warm read reuses the folded doc")
+
+# 4. A cold instance folds snapshot + tail to the same state.
+warm = {t: open_log().worksheet(t).get_all_values() for t in ("MatchRatings", "MatchHistory")}
+assert cold_state() == warm
+print("PASS: cold fold matches warm state")
+
+# 5. Undo is an event too; the third event triggers compaction.
+run("recordGame", assignments=assignments, winner="Mafia", night0_kills=[])
+r = run("undoLastGame")
+assert r["undone_game_id"] == 47, r
+snapshot = json_store.decode_doc(STORE.get("log/snapshot.json"))
+assert snapshot["seq"] == 3, snapshot["seq"]
+assert events() == [], events()
+assert len(snapshot["tabs"]["MatchHistory"]) == 16
+print("PASS: undo logged; tail compacted into snapshot seq 3")
+
+# 6. After compaction a cold read folds only the bounded tail.
+run("recordGame", assignments=assignments, winner="Mafia", night0_kills=[])
+state = cold_state()
+assert events() == ["log/events/0000000004.json"]
+assert state["MatchHistory"][1][0] == "47"
+r = run("getStats")
+p1 = next(p for p in r["players"] if p["name"] == "P1")
+assert (p1["mafia_games"], p1["mafia_wins"]) == (2, 1), p1
+print("PASS: cold read = snapshot + 1 event; stats follow")
+
+# 7. Two writers racing for the same seq: the second one fails cleanly.
+a, b = open_log(), open_log()
+a.worksheet("MatchRatings").append_row(["A", 25.0, 8.0])
+b.worksheet("MatchRatings").append_row(["B", 25.0, 8.0])
+a.flush()
+try:
+    b.flush()
+    raise AssertionError("second writer should hit the create-only precondition")
+except json_store.WriteConflict:
+    pass
+players = {p["name"] for p in run("getPlayers")["players"]}
+assert "A" in players and "B" not in players, players
+print("PASS: concurrent append for the same seq is rejected")
+
+# 8. A warm cache older than a compaction refolds from the new snapshot.
+stale = open_log()
+stale._ensure_loaded()  # warm at seq 5
+for i in range(3):
+    other = open_log()
+    other.worksheet("MatchRatings").append_row([f"C{i}", 25.0, 8.0])
+    other.flush()
+assert json_store.decode_doc(STORE.get("log/snapshot.json"))["seq"] == 6
+json_store._doc_cache[("test", "log/")] = (stale._generation, stale._doc)
+event_store._snapshots[("test", "log/")] = (stale._snapshot, stale._snapshot_gen)
+players = {p["name"] for p in run("getPlayers")["players"]}
+assert {"C0", "C1", "C2"} <= players, players
+print("PASS: stale warm cache recovers after compaction")
+
+# 9. Creating the RatingSnapshots tab is logged and folds like any other op.
+main.RATING_SNAPSHOT_EVERY = 2
+r = run("recordGame", assignments=assignments, winner="Town", night0_kills=[])
+assert r["game_id"] == 48, r
+warm = open_log().worksheet("RatingSnapshots").get_all_values()
+cold_state()
+assert open_log().worksheet("RatingSnapshots").get_all_values() == warm
+assert [row[0] for row in warm[1:]] == ["48"] * 15 + ["46"] * 15, warm
+main.RATING_SNAPSHOT_EVERY = 25
+print("PASS: RatingSnapshots created through the event log")
+
+# 10. Losing the race for a seq replays the game on top of the winner's event.
+main.WRITE_BACKOFF = 0.0
+tries = []
+def record_racing():
+    r = main.record_game({"assignments": assignments, "winner": "Mafia"})
+    if not tries:
+        other = open_log()
+        other.worksheet("MatchRatings").append_row(["Racer", 25.0, 8.0])
+        other.flush()  # takes the seq this attempt was going to write
+    tries.append(r["game_id"])
+    return r
+main._reset_storage_state()
+r = main._run_write("recordGame", record_racing)
+assert tries == [49, 49] and r["game_id"] == 49, tries
+state = cold_state()
+assert "Racer" in {row[0] for row in state["MatchRatings"]}
+assert state["MatchHistory"][1][0] == "49"
+print("PASS: a lost seq race is replayed on the new tail")
+
+# 11. A stale instance writing after another instance compacted: the seq it
+#     would take was deleted by the compaction, so it could be created again
+#     below the new snapshot, where no reader folds it.
+KEY = ("test", "log/")
+others = iter(range(1000))
+
+
+def compact_by_others():
+    """Add players from other instances until one of them compacts."""
+    added = []
+    while True:
+        other = open_log()
+        added.append(f"S{next(others)}")
+        other.worksheet("MatchRatings").append_row([added[-1], 25.0, 8.0])
+        other.flush()
+        if not events():
+            return added
+
+
+last = run("getLastGame")["game"]["game_id"]
+stale = (json_store._doc_cache[KEY], event_store._snapshots[KEY])
+added = compact_by_others()
+json_store._doc_cache[KEY], event_store._snapshots[KEY] = stale  # a warm instance
+assert set(added) <= {p["name"] for p in run("getPlayers")["players"]}
+r = run("recordGame", assignments=assignments, winner="Mafia", night0_kills=[])
+assert r["game_id"] == last + 1, r
+assert cold_state()["MatchHistory"][1][0] == str(last + 1)
+
+tries = []
+def record_while_compacting():
+    r = main.record_game({"assignments": assignments, "winner": "Mafia"})
+    if not tries:
+        compact_by_others()  # deletes the seq this attempt is about to take
+    tries.append(r["game_id"])
+    return r
+main._reset_storage_state()
+r = main._run_write("recordGame", record_while_compacting)
+assert tries == [last + 2, last + 2] and r["game_id"] == last + 2, tries
+snapshot = json_store.decode_doc(STORE.get("log/snapshot.json"))["seq"]
+assert all(int(n[-15:-5]) > snapshot for n in events()), (events(), snapshot)
+state = cold_state()
+assert state["MatchHistory"][1][0] == str(last + 2) and len(state["MatchRatings"]) > 20
+print("PASS: a stale instance never writes below a newer snapshot")
+
+print("\nAll event log smoke tests passed.")
@@ -4,72 +4,19 @@ Run from /home/user/mafia/backend:
     python test_json_store.py
 """
 
+import dataclasses
+import itertools
 import json
 import os
+import time
 
+import numpy as np
 
-# --- Fake GCS client ---
-
-class _FakeBlob:
-    def __init__(self, store, name):
-        self._store = store
-        self._name = name
-        self.generation = 0
-
-    def exists(self):
-        return self._name in self._store._data
-
-    def reload(self):
-        self.generation = self._store.get_generation(self._name)
-
-    def download_as_text(self):
-        return self._store.get(self._name) or ""
-
-    def upload_from_string(self, body, content_type=None, if_generation_match=None):
-        if (
-            if_generation_match is not None
-            and if_generation_match != self._store.get_generation(self._name)
-        ):
-            raise RuntimeError("generation precondition failed")
-        self._store.put(self._name, body)
-        self.generation = self._store.get_generation(self._name)
-
-
-class _FakeBucket:
-    def __init__(self, store):
-        self._store = store
-
-    def blob(self, name):
-        return _FakeBlob(self._store, name)
-
-
-class _FakeStore:
-    def __init__(self):
-        self._data = {}
-        self._gen = {}
-
-    def get(self, name):
-        return self._data.get(name)
-
-    def get_generation(self, name):
-        return self._gen.get(name, 0)
-
-    def put(self, name, body):
-        self._data[name] = body
-        self._gen[name] = self._gen.get(name, 0) + 1
-
-
-class _FakeClient:
-    def __init__(self, store):
-        self._store = store
-
-    def bucket(self, _name):
-        return _FakeBucket(self._store)
-
+from fake_gcs import FakeClient, FakeStore
 
 # --- Test setup ---
 
-STORE = _FakeStore()
+STORE = FakeStore()
 STORE.put(
     "test.json",
     json.dumps({
@@ -88,11 +35,12 @@ os.environ["JSON_BUCKET"] = "test"
 os.environ["JSON_OBJECT"] = "test.json"
 os.environ["GAME_PASSWORD"] = "x"
 
+import balance
 import json_store
 import main
 
 json_store.get_json_spreadsheet = lambda bucket=None, obj=None: json_store.JsonSpreadsheet(
-    "test", "test.json", client=_FakeClient(STORE)
+    "test", "test.json", client=FakeClient(STORE)
 )
 
 
@@ -106,12 +54,30 @@ def run(action, **body):
         r = main.get_last_game()
     elif action == "recordGame":
         r = main.record_game(body)
+    elif action == "recordGames":
+        r = main.record_games(body)
     elif action == "undoLastGame":
         r = main.undo_last_game()
     elif action == "getStats":
         r = main.get_stats()
+    elif action == "getPlayerHistory":
+        r = main.get_player_history(body)
+    elif action == "getPlayerHistories":
+        r = main.get_player_histories(body)
+    elif action == "suggestAssignments":
+        r = main.suggest_assignments(body)
+    elif action == "predictGame":
+        r = main.predict_game(body)
+    elif action == "previewGame":
+        r = main.preview_game(body)
+    elif action == "editGame":
+        r = main.edit_game(body)
+    elif action == "getRatingsAt":
+        r = main.get_ratings_at(body)
     elif action == "getMatchHistory":
-        r = main.get_match_history()
+        r = main.get_match_history(body)
+    elif action == "getDashboard":
+        r = main.get_dashboard(body)
     else:
         raise ValueError(action)
     main._flush_storage()
@@ -186,9 +152,568 @@ assert r["game"]["game_id"] == 46
 print("PASS: undo brought back game 46 as latest")
 
 # 9. Confirm GCS state is persisted between flushes.
-final_doc = json.loads(STORE.get("test.json"))
+final_doc = json_store.decode_doc(STORE.get("test.json"))
 assert "MatchRatings" in final_doc["tabs"]
 assert len(final_doc["tabs"]["MatchHistory"]) == 16  # header + 15 game-46 rows
 print(f"PASS: final blob has {len(final_doc['tabs']['MatchHistory'])} history rows (1 header + 15)")
 
+# 10. Warm cache: unchanged blob is not re-downloaded across requests.
+run("getStats")
+before = STORE.downloads
+run("getPlayers")
+run("getMatchHistory")
+assert STORE.downloads == before, (STORE.downloads, before)
+print("PASS: warm reads reuse the cached doc (no re-download)")
+
+# 11. An outside write bumps the generation and forces one re-download.
+doc = json_store.decode_doc(STORE.get("test.json"))
+doc["tabs"]["MatchRatings"].append(["Outsider", "25.0", "8.0"])
+STORE.put("test.json", json.dumps(doc))
+r = run("getPlayers")
+assert "Outsider" in {p["name"] for p in r["players"]}, r
+assert STORE.downloads == before + 1
+print("PASS: generation change triggers exactly one re-download")
+
+# 12. A failed flush leaves the cached doc untouched.
+ss = json_store.get_json_spreadsheet()
+ss.worksheet("MatchRatings").append_row(["Ghosty", 1.0, 1.0])
+STORE.put("test.json", STORE.get("test.json"))  # concurrent writer
+try:
+    ss.flush()
+    raise AssertionError("flush should hit the generation precondition")
+except json_store.WriteConflict:
+    pass
+r = run("getPlayers")
+assert "Ghosty" not in {p["name"] for p in r["players"]}, r
+print("PASS: unflushed writes never leak into the shared cache")
+
+# 13. Stats Summary is memoized and follows MatchHistory edits incrementally.
+def recomputed(ss):
+    per = {}
+    json_store._count_history(per, ss._tab("MatchHistory")[1:], 1)
+    return json_store._build_summary(per, ss._tab("MatchRatings"))
+
+ss = json_store.get_json_spreadsheet()
+first = ss._stats_summary()
+assert ss._stats_summary() is first
+mh = ss.worksheet("MatchHistory")
+mh.insert_rows([["48", "P1", "Mafia", "Win", "5", "", "", "", "", "", ""]], row=2)
+mh.append_row(["48", "Outsider", "Cop", "Loss", "-5", "", "", "", "", "", ""])
+assert ss._stats_summary() == recomputed(ss)
+mh.delete_rows(2)
+mh.update("D17", [["Win"]])
+assert ss._stats_summary() == recomputed(ss)
+p1 = next(r for r in ss._stats_summary() if r[0] == "P1")
+assert p1[4:6] == ("1", "0"), p1
+print("PASS: Stats Summary memoized and maintained incrementally")
+
+# 14. getDashboard returns the four read payloads from one load.
+dash = run("getDashboard")
+assert dash == {
+    "players": run("getPlayers"),
+    "stats": run("getStats"),
+    "last_game": run("getLastGame"),
+    "match_history": run("getMatchHistory"),
+}
+assert run("getDashboard", fields=["players", "last_game"]).keys() == {
+    "players", "last_game"
+}
+stats_only = run("getDashboard", fields=["stats"])["stats"]
+assert stats_only == dash["stats"]
+try:
+    run("getDashboard", fields=["players", "bogus"])
+    raise AssertionError("unknown field should be rejected")
+except ValueError:
+    pass
+print("PASS: getDashboard matches the single-payload actions, honours fields")
+
+# 15. Reads carry a generation-keyed ETag and revalidate to a bodyless 304.
+import flask
+
+app = flask.Flask(__name__)
+
+
+def http(method, headers=None, **kw):
+    with app.test_request_context("/", method=method, headers=headers, **kw):
+        return main.main(flask.request)
+
+
+r = http("GET", query_string={"action": "getStats"})
+etag = r.headers["ETag"]
+assert r.status_code == 200 and r.headers["Cache-Control"] == "no-cache"
+assert json.loads(r.get_data()) == run("getStats")
+before = STORE.downloads
+json_store._doc_cache.clear()  # cold instance: metadata alone answers
+r = http("GET", {"If-None-Match": etag}, query_string={"action": "getStats"})
+assert r.status_code == 304 and r.get_data() == b"" and r.headers["ETag"] == etag
+assert STORE.downloads == before
+r = http("GET", {"If-None-Match": etag}, query_string={"action": "getPlayers"})
+assert r.status_code == 200 and r.headers["ETag"] != etag
+r = http("POST", {"If-None-Match": etag}, json={"action": "getStats"})
+assert r.status_code == 304
+run("recordGame", assignments=assignments, winner="Mafia", night0_kills=[])
+r = http("GET", {"If-None-Match": etag}, query_string={"action": "getStats"})
+assert r.status_code == 200 and r.headers["ETag"] != etag
+r = http("GET", query_string={"action": "undoLastGame", "password": "x"})
+assert r.status_code == 405
+r = http("POST", json={"action": "undoLastGame", "password": "x"})
+assert r.status_code == 200 and r.headers["Cache-Control"] == "no-store"
+assert "ETag" not in r.headers
+print("PASS: ETag / If-None-Match -> 304 on reads, keyed by generation")
+
+# 16. getMatchHistory pages newest-first through a game_id -> rows index.
+for winner in ("Mafia", "Town", "Mafia"):
+    run("recordGame", assignments=assignments, winner=winner, night0_kills=[])
+full = run("getMatchHistory")["games"]
+assert [g["game_id"] for g in full] == [49, 48, 47, 46]
+pages, cursor = [], None
+while True:
+    page = run("getMatchHistory", limit=3, before_game_id=cursor)
+    pages.append([g["game_id"] for g in page["games"]])
+    assert page["games"] == [g for g in full if cursor is None or g["game_id"] < cursor][:3]
+    cursor = page["next_before_game_id"]
+    if cursor is None:
+        break
+assert pages == [[49, 48, 47], [46]], pages
+scans = 0
+col_values = json_store.JsonWorksheet.col_values
+def counting(self, col):
+    global scans
+    scans += 1
+    return col_values(self, col)
+json_store.JsonWorksheet.col_values = counting
+assert run("getMatchHistory", limit=1, before_game_id=48)["games"][0]["game_id"] == 47
+assert run("getDashboard", fields="match_history", limit="2")["match_history"][
+    "next_before_game_id"] == 48
+assert scans == 0  # index reused while the generation is unchanged
+json_store.JsonWorksheet.col_values = col_values
+print("PASS: getMatchHistory pages via cursor; index cached per generation")
+
+# 17. Player histories come from a per-generation player -> rows index.
+def scanned(name):
+    return [
+        {"game_id": g["game_id"], "result": p["result"]}
+        for g in full for p in g["players"] if p["player"] == name
+    ]
+r = run("getPlayerHistory", player_name="P1")
+assert [{k: g[k] for k in ("game_id", "result")} for g in r["games"]] == scanned("P1")
+r = run("getPlayerHistories", player_names="P2,P9,Nobody")
+assert list(r["histories"]) == ["P2", "P9", "Nobody"]
+assert r["histories"]["P9"] == run("getPlayerHistory", player_name="P9")["games"]
+assert r["histories"]["Nobody"] == []
+builds = 0
+build_player_index = json_store.build_player_index
+def counting(history):
+    global builds
+    builds += 1
+    return build_player_index(history)
+json_store.build_player_index = counting
+run("getPlayerHistories", player_names=["P3", "P4"])
+try:
+    run("getPlayerHistories", player_names={"P3": 1})
+    raise AssertionError("player_names must be a list")
+except ValueError as e:
+    assert str(e) == "player_names must be a list of names", e
+assert builds == 0  # index reused while the generation is unchanged
+run("recordGame", assignments=assignments, winner="Town", night0_kills=[])
+r = run("getPlayerHistory", player_name="P3")
+assert builds == 1 and r["games"][0]["game_id"] == 50, (builds, r["games"][0])
+json_store.build_player_index = build_player_index
+print("PASS: getPlayerHistory / getPlayerHistories via per-generation index")
+
+# 18. getRatingsAt = nearest RatingSnapshots checkpoint + the games since.
+def replayed(game_id):
+    ratings = {}
+    for g in reversed(run("getMatchHistory")["games"]):
+        for p in g["players"]:
+            if g["game_id"] <= game_id and "new_mu" in p:
+                ratings[p["player"]] = (p["new_mu"], p["new_sigma"])
+    return ratings
+def ratings_at(game_id):
+    r = run("getRatingsAt", game_id=str(game_id))
+    return {p["name"]: (p["mu"], p["sigma"]) for p in r["players"]}
+snaps = lambda: json_store.decode_doc(STORE.get("test.json"))["tabs"]["RatingSnapshots"]
+assert {row[0] for row in snaps()[1:]} == {"50"}  # game 50 was a checkpoint
+main.RATING_SNAPSHOT_EVERY = 2
+for winner in ("Mafia", "Town"):
+    run("recordGame", assignments=assignments, winner=winner, night0_kills=[])
+assert [row[0] for row in snaps()[1:]][::15] == ["52", "50"]
+for game_id in range(45, 54):
+    assert ratings_at(game_id) == replayed(game_id), game_id
+current = {p["name"]: (p["mu"], p["sigma"]) for p in run("getPlayers")["players"]}
+del current["Outsider"]  # step 11's rating-only row: no games to replay
+assert ratings_at(52) == current
+run("undoLastGame")
+assert {row[0] for row in snaps()[1:]} == {"50"}
+assert ratings_at(52) == ratings_at(51) == replayed(51)
+main.RATING_SNAPSHOT_EVERY = 25
+print("PASS: getRatingsAt from checkpoints; undo drops the undone checkpoint")
+
+# 19. editGame re-rates downstream only as far as ratings differ, and ends
+#     where a replay of the whole season from scratch would.
+def tabs():
+    return json_store.decode_doc(STORE.get("test.json"))["tabs"]
+def full_replay(history):
+    ratings, rows = {}, {}
+    for gid in sorted({int(r[0]) for r in history[1:]}):
+        game = [r for r in history[1:] if int(r[0]) == gid]
+        mafia_won = any(r[2] == "Mafia" and r[3] == "Win" for r in game)
+        teams = ([], [])
+        for r in game:
+            if r[3] in ("Win", "Loss"):
+                mu, sigma = ratings.get(r[1], (25.0, 25 / 3))
+                teams[r[2] != "Mafia"].append({"name": r[1], "mu": mu, "sigma": sigma})
+        new = main.compute_trueskill(*teams, mafia_won)
+        for r in game:
+            if r[1] in new:
+                rows[gid, r[1]] = (new[r[1]]["mu"], new[r[1]]["sigma"])
+                ratings[r[1]] = rows[gid, r[1]]
+    return ratings, rows
+def stored(history):
+    return {(int(r[0]), r[1]): (float(r[6]), float(r[7])) for r in history[1:] if r[6]}
+def close(a, b):
+    return a.keys() == b.keys() and all(
+        abs(x - y) < 1e-9 for k in a for x, y in zip(a[k], b[k])
+    )
+def checkpoint_matches_replay(game_id=50):
+    # RatingSnapshots is rewritten in the edit's own write, not dropped
+    history = tabs()["MatchHistory"]
+    expected, _ = full_replay([history[0], *(r for r in history[1:] if int(r[0]) <= game_id)])
+    got = {r[1]: (float(r[2]), float(r[3])) for r in snaps()[1:] if r[0] == str(game_id)}
+    return close(got, expected)
+
+before = tabs()
+r = run("editGame", game_id=49, winner="Town")
+assert r["games_rerated"] == [49, 50, 51], r
+history = tabs()["MatchHistory"]
+assert {row[3] for row in history[1:] if row[0] == "49" and row[2] == "Mafia"} == {"Loss"}
+final, rows = full_replay(history)
+assert close(stored(history), rows)
+ratings = {row[0]: (float(row[1]), float(row[2])) for row in tabs()["MatchRatings"][1:]}
+del ratings["Outsider"]
+assert close(ratings, final)
+assert all(row == old for row, old in zip(history[46:], before["MatchHistory"][46:]))  # games < 49
+assert checkpoint_matches_replay() and ratings_at(51) == replayed(51)
+
+r = run("editGame", game_id=51, rename={"P15": "Q15"})
+assert r["games_rerated"] == [51] and r["players_added"] == ["Q15"], r
+assert "Q15" in {p["name"] for p in run("getPlayers")["players"]}
+r = run("editGame", game_id=51, rename={"Q15": "P15"})
+assert r["players_deleted"] == ["Q15"], r
+r = run("editGame", game_id=48, rename={"P15": "Q15"}, roles={"P4": "Mafia", "P1": "Town"})
+assert checkpoint_matches_replay() and "Q15" in {r[1] for r in snaps()[1:]}
+r = run("editGame", game_id=48, rename={"Q15": "P15"}, roles={"P4": "Cop", "P1": "Mafia"})
+assert r["players_deleted"] == ["Q15"], r  # an older game than the last replayed
+assert checkpoint_matches_replay() and "Q15" not in {r[1] for r in snaps()[1:]}
+assert "Q15" not in {p["name"] for p in run("getPlayers")["players"]}
+assert close(stored(tabs()["MatchHistory"]), rows)
+
+run("editGame", game_id=49, winner="Mafia")
+r = run("editGame", game_id=47)  # no-op edit: nothing drifts, nothing written
+assert (r["games_rerated"], r["cells_changed"], r["players"]) == ([47], 0, []), r
+assert close(stored(tabs()["MatchHistory"]), stored(before["MatchHistory"]))
+after = STORE.get_generation("test.json")
+for bad in (
+    {"rename": {"Nobody": "P1"}},  # not in the game
+    {"roles": {"P15": "mafia"}},  # would be rated as Town
+    {"roles": {"P3": "Banana"}},
+    {"rename": {"P3": ""}},
+    {"rename": {"P3": "  "}},
+    {"rename": {"P3": None}},
+):
+    try:
+        run("editGame", game_id=49, **bad)
+        raise AssertionError(f"editGame should reject {bad}")
+    except ValueError:
+        pass
+assert STORE.get_generation("test.json") == after
+r = run("editGame", game_id=51, rename={"P15": " Striker "})  # stripped, then aliased
+assert r["players_added"] == ["Strik3r"], r
+run("editGame", game_id=51, rename={"Strik3r": "P15"})
+print("PASS: editGame replays downstream and matches a full re-rate")
+
+# 20. suggestAssignments scores every mafia split in one batch, fast.
+lobby = names[:13] + ["Newcomer"]
+rated = {p["name"]: p for p in run("getPlayers")["players"]}
+mu = np.array([rated.get(n, {"mu": 25.0})["mu"] for n in lobby])
+sigma = np.array([rated.get(n, {"sigma": 25 / 3})["sigma"] for n in lobby])
+def predicted(mafia):
+    m = [lobby.index(n) for n in mafia]
+    t = [i for i in range(len(lobby)) if i not in m]
+    return float(main.rating_engine.predict_mafia_win(
+        mu[m], sigma[m], mu[t], sigma[t], main.RATING_CONFIG))
+gaps = sorted(
+    abs(predicted(c) - 0.56) for c in itertools.combinations(lobby, 3)
+)
+t0 = time.perf_counter()
+r = run("suggestAssignments", names=lobby, k=4)
+elapsed = time.perf_counter() - t0
+assert elapsed < 0.1, elapsed
+got = r["suggestions"]
+assert len(got) == 4 and len({tuple(g["mafia"]) for g in got}) == 4
+for g in got:
+    assert len(g["mafia"]) == 3 and sorted(g["mafia"] + g["town"]) == sorted(lobby)
+    assert abs(g["mafia_win_probability"] - predicted(g["mafia"])) < 1e-4
+gap = [abs(predicted(g["mafia"]) - 0.56) for g in got]
+assert gap == sorted(gap) and gap[-1] <= gaps[3] + balance.TIE + 1e-12
+draws = {tuple(run("suggestAssignments", names=lobby, k=1)["suggestions"][0]["mafia"])
+         for _ in range(20)}
+assert len(draws) > 1  # near-ties are drawn at random
+r = run("suggestAssignments", names=lobby, k=1, target=0)  # 0 is a target, not "unset"
+low = min(predicted(c) for c in itertools.combinations(lobby, 3))
+assert r["target"] == 0 and predicted(r["suggestions"][0]["mafia"]) <= low + balance.TIE + 1e-12
+for bad in ({"names": lobby[:12]}, {"names": 5}, {"names": [*lobby[:13], 5]}):
+    try:
+        run("suggestAssignments", **bad)
+        raise AssertionError(f"{bad} should be rejected")
+    except ValueError:
+        pass
+print(f"PASS: suggestAssignments over C(14,3) splits in {elapsed * 1e3:.1f} ms")
+
+# 21. predictGame: pre-game odds through the shared batched predictor, whose
+#     per-config ghost terms are memoized (array configs bypass the cache).
+r = run("predictGame", mafia=",".join(lobby[:3]), town=",".join(lobby[3:]))
+assert r["mafia_win_probability"] == round(predicted(lobby[:3]), 4), r
+assert [p["name"] for p in r["town"]] == lobby[3:]
+assert r["mafia"][0]["rating"] == main.display_rating(mu[0], sigma[0])
+cfg = main.RATING_CONFIG
+assert main.rating_engine.ghost_terms(cfg) is main.rating_engine.ghost_terms(cfg)
+batch = dataclasses.replace(cfg, beta=np.full(5, cfg.beta))
+m, t = np.tile(mu[:3], (5, 1)), np.tile(mu[3:13], (5, 1))
+ms, ts = np.tile(sigma[:3], (5, 1)), np.tile(sigma[3:13], (5, 1))
+assert np.array_equal(
+    main.rating_engine.predict_mafia_win(m, ms, t, ts, batch),
+    main.rating_engine.predict_mafia_win(m, ms, t, ts, cfg),
+)
+for bad in ({"mafia": "P1", "town": ""}, {"mafia": "P1", "town": "P1,P2"}, {"mafia": 5, "town": "P2"}):
+    try:
+        run("predictGame", **bad)
+        raise AssertionError(f"{bad} should be rejected")
+    except ValueError:
+        pass
+print("PASS: predictGame matches predict_mafia_win; ghost terms memoized")
+
+# 22. previewGame: both outcomes' deltas, read-only, matching what
+#     recordGame then writes for the actual result.
+seats = [dict(a, name=n) for a, n in zip(assignments, lobby)]
+gen = STORE.get_generation("test.json")
+r = run("previewGame", assignments=seats, night0_kills=[lobby[5]])
+assert STORE.get_generation("test.json") == gen  # nothing written
+preview = {p["name"]: p for p in r["players"]}
+assert lobby[5] not in preview and len(preview) == 13
+assert all(p["mafia_win"] > 0 > p["town_win"] for p in r["players"] if p["team"] == "Mafia")
+assert all(p["town_win"] > 0 > p["mafia_win"] for p in r["players"] if p["team"] == "Town")
+assert 0 < r["mafia_win_probability"] < 1
+rec = run("recordGame", assignments=seats, winner="Town", night0_kills=[lobby[5]])
+for p in rec["players"]:
+    if p["result"] in ("Win", "Loss"):
+        assert p["rate_change"] == preview[p["name"]]["town_win"], p
+print("PASS: previewGame deltas match the recorded result, no writes")
+
+# 23. recordGames: a backfill is one upload; a bad game aborts the batch.
+gen = STORE.get_generation("test.json")
+last = run("getLastGame")["game"]["game_id"]
+r = run("recordGames", games=[
+    {"assignments": seats, "winner": "Mafia"},
+    {"assignments": assignments, "winner": "Town", "night0_kills": ["P9"]},
+])
+assert [g["game_id"] for g in r["games"]] == [last + 1, last + 2]
+assert STORE.get_generation("test.json") == gen + 1
+assert run("getLastGame")["game"]["game_id"] == last + 2
+gen += 1
+try:
+    run("recordGames", games=[{"assignments": seats, "winner": "Town"},
+                              {"assignments": seats}])
+    raise AssertionError("a game without a winner should abort the batch")
+except KeyError:
+    pass
+assert STORE.get_generation("test.json") == gen
+assert run("getLastGame")["game"]["game_id"] == last + 2
+print("PASS: recordGames writes a batch in one upload, all or nothing")
+
+# 24. A write that loses the generation race is replayed on fresh state:
+#     the other writer's change survives and nothing is lost.
+main.WRITE_BACKOFF = 0.0
+def race():
+    doc = json_store.decode_doc(STORE.get("test.json"))
+    doc["tabs"]["MatchRatings"].append([f"Racer{STORE.get_generation('test.json')}", "25.0", "8.0"])
+    STORE.put("test.json", json.dumps(doc))
+attempts = []
+def record_racing(body):
+    r = main.record_game(body)
+    if not attempts:
+        race()  # lands between our read and our flush
+    attempts.append(r["game_id"])
+    return r
+last = run("getLastGame")["game"]["game_id"]
+stats = dict(main._write_stats)
+body = {"assignments": seats, "winner": "Town"}
+main._reset_storage_state()
+r = main._run_write("recordGame", lambda: record_racing(body))
+assert attempts == [last + 1, last + 1] and r["game_id"] == last + 1, attempts
+assert main._write_stats["conflicts"] == stats["conflicts"] + 1
+assert main._write_stats["retried"] == stats["retried"] + 1
+players = {p["name"] for p in run("getPlayers")["players"]}
+assert any(n.startswith("Racer") for n in players)  # not overwritten
+assert run("getLastGame")["game"]["game_id"] == last + 1
+
+# An undo pins the game it saw, so a replay can't undo a newer one.
+try:
+    main._run_write("undoLastGame", lambda: main.undo_last_game({"game_id": last}))
+    raise AssertionError("undoing a game that is no longer last should fail")
+except ValueError:
+    pass
+
+# Past WRITE_RETRIES the conflict surfaces.
+main.WRITE_RETRIES = 1
+def always_racing():
+    r = main.undo_last_game()
+    race()
+    return r
+try:
+    main._run_write("undoLastGame", always_racing)
+    raise AssertionError("a write that always loses should give up")
+except json_store.WriteConflict:
+    pass
+assert main._write_stats["gave_up"] == stats["gave_up"] + 1
+assert run("getLastGame")["game"]["game_id"] == last + 1
+main.WRITE_RETRIES = 4
+print("PASS: write conflicts are replayed against fresh state, then give up")
+
+# 25. Format 2 blob: gzipped typed columns, read back cell for cell; format 1
+#     blobs still load, and the next flush converts them.
+run("recordGame", assignments=seats, winner="Town")  # game last + 2
+raw = STORE.get("test.json")
+assert raw[:2] == b"\x1f\x8b"
+legacy = json_store.encode_doc(json_store.decode_doc(raw), version=1)[0]
+assert len(raw) * 4 < len(legacy), (len(raw), len(legacy))
+tricky = {"tabs": {
+    "T": [["a", "b", "c"], ["007", "1e5", "x"], ["-0.0", "", "2"], ["12", "0.1"],
+          ["1.0000000000000002", "NaN", "3"]],
+    "Mixed": [["m", "z"], ["1", "-0"], ["2.5", ""], ["", "7"]],
+    "Empty": [],
+    "HeaderOnly": [["h"]],
+}}
+body, encoding = json_store.encode_doc(tricky)
+assert encoding == "gzip" and json_store.decode_doc(body) == tricky
+assert json_store.decode_doc(json_store.encode_doc(tricky, version=1)[0]) == tricky
+STORE.put("test.json", legacy)
+before = run("getStats")
+assert json_store.decode_doc(STORE.get("test.json")) == json_store.decode_doc(raw)
+run("recordGame", assignments=seats, winner="Mafia")
+assert STORE.get("test.json")[:2] == b"\x1f\x8b"
+run("undoLastGame")
+assert run("getStats") == before
+json_store.WRITE_FORMAT = 1
+run("recordGame", assignments=seats, winner="Mafia")
+assert json.loads(STORE.get("test.json"))["tabs"]["MatchHistory"][1][0] == str(last + 3)
+run("undoLastGame")
+json_store.WRITE_FORMAT = json_store.FORMAT_VERSION
+run("undoLastGame")
+print(f"PASS: format 2 blob is {len(raw)} bytes vs {len(legacy)}; format 1 still reads")
+
+# 26. The stores hold MatchHistory as a History: typed columns that read and
+#     write like the list of rows, cell for cell.
+ss = main.get_sheet()
+h = ss.match_history()
+assert isinstance(h, json_store.History)
+rows = [list(r) for r in h]
+assert rows == ss.worksheet("MatchHistory").get_all_values()
+assert main._match_history_payload(json_store.History(rows)) == run("getMatchHistory")
+j = h.column_index(1)  # the columns are oldest first
+assert j == len(h) - 2 and h.game[j] == int(rows[1][0])
+assert h.strings[h.player[j]] == rows[1][1] and h.new_mu[j] == float(rows[1][6])
+assert h.new_rating[-1] == int(rows[1][9]) and h.old_sigma[0] == float(rows[-1][10])
+ghost = json_store.History([rows[0], ["50", "G", "Town", "Ghost", "0", *[""] * 6]])
+assert ghost.old_rating[0] == json_store.BLANK and ghost.old_mu[0] != ghost.old_mu[0]
+assert ghost[1] == ("50", "G", "Town", "Ghost", "0", *[""] * 6)
+model, typed = [list(r) for r in rows[:4]], json_store.History(rows[:4])
+odd = [["46.0", "P1", "Town", "Win", "", "25", "26.0", "8.0", "0", "1", "8.0"],
+       ["47", "P2", "Mafia"], ["", "", "", "", "x", "nan", "", "", "", "", "", "extra"]]
+for edit in (
+    lambda t: t.insert(1, odd[0]),
+    lambda t: t.__setitem__(slice(2, 2), odd[1:]),
+    lambda t: t.__setitem__(3, rows[5]),
+    lambda t: t.__delitem__(slice(1, 3)),
+    lambda t: t.append(rows[6]),
+    lambda t: t.__delitem__(-1),
+    lambda t: t.insert(0, ["a new header"]),
+    lambda t: t.__delitem__(0),
+):
+    copy = typed.copy()
+    edit(model)
+    edit(typed)
+    assert [list(r) for r in typed] == model and list(map(list, typed[1:3])) == model[1:3]
+    assert [list(r) for r in copy] != model  # copies are independent
+kept = json_store.History([rows[0], *odd])  # rows kept as given
+assert [list(r) for r in kept] == [rows[0], *odd]
+assert kept.game[2] == 46 and kept.old_mu[2] == 25.0  # the nearest reading
+assert kept.game[0] == kept.rate_change[0] == json_store.BLANK
+body, _ = json_store.encode_doc({"tabs": {"MatchHistory": typed}})
+assert json_store.decode_doc(body)["tabs"]["MatchHistory"] == model
+body, _ = json_store.encode_doc({"tabs": {"MatchHistory": h}})
+assert json_store.decode_doc(body)["tabs"]["MatchHistory"] == rows
+print("PASS: MatchHistory is held as typed columns with a row-for-row view")
+
+# 27. History keeps its rows oldest first, so recording a game appends to
+#     the columns and undoing it truncates them; older rows stay put.
+games, cached = h.game.tolist(), h._rows[:]
+run("recordGame", assignments=seats, winner="Town")
+h = main.get_sheet().match_history()
+assert h.game.tolist() == games + [games[-1] + 1] * len(seats)
+assert all(a is b for a, b in zip(h._rows, cached))
+assert h[1][0] == str(games[-1] + 1) and list(h[len(seats) + 1]) == rows[1]
+run("undoLastGame")
+h = main.get_sheet().match_history()
+assert h.game.tolist() == games and [list(r) for r in h] == rows
+print("PASS: recordGame appends to MatchHistory's columns; undo truncates them")
+
+# 28. get_all_values() is a read-only view of the tab, not a copy; it keeps
+#     showing the tab as read through later writes, and copy() is mutable.
+ss = main.get_sheet()
+ws = ss.worksheet("MatchRatings")
+view = ws.get_all_values()
+assert isinstance(view, json_store.RowsView) and view._rows is ss._tab("MatchRatings")
+assert view == [list(r) for r in view] and view[1] is ws.get_all_values()[1]
+for mutate in (lambda: view[1].append("x"), lambda: view.append(()), lambda: view.__setitem__(1, ())):
+    try:
+        mutate()
+        raise AssertionError("a view was modified")
+    except (AttributeError, TypeError):
+        pass
+snapshot = view.copy()
+ws.update("B2", [["30"]])  # detaches: the view keeps the cached tab
+again = ws.get_all_values()
+ws.update("B2", [["31"]])  # lent from the private doc: copied first
+ws.delete_rows(2)
+assert view == snapshot and again[1][1] == "30" and len(again) == len(view)
+assert ws.get_all_values()[1] == tuple(snapshot[2])
+snapshot.append(["Q", "25", "8"])  # a plain list of lists
+assert len(ws.get_all_values()) == len(view) - 1
+print("PASS: get_all_values is an uncopied read-only view; copy() is mutable")
+
+# 29. A write copies only the tabs it touches, and a History copy shares the
+#     original's columns while it only appends or drops its newest rows.
+run("getPlayers")
+ss = main.get_sheet()
+tabs = dict(ss._doc["tabs"])
+ss.worksheet("MatchRatings").update("B2", [["32"]])
+assert ss._doc["tabs"]["MatchHistory"] is tabs["MatchHistory"]
+assert ss._doc["tabs"]["MatchRatings"] is not tabs["MatchRatings"]
+h = tabs["MatchHistory"]
+rows = [list(r) for r in h]
+copy = h.copy()
+copy[1:1] = [rows[1], rows[2]]  # a game recorded on the copy
+assert copy._base[0] is h._cols and len(copy._cols[0]) == 2
+del copy[1:4]  # undone, and one row more
+assert copy._base[0] is h._cols and len(copy._cols[0]) == 0
+assert [list(r) for r in copy] == rows[:1] + rows[2:]
+assert copy.game.tolist() == h.game.tolist()[:-1]  # a column read merges
+assert copy._base is None and copy.game is not h.game
+assert [list(r) for r in h] == rows
+fork = h.copy()
+fork[len(fork) - 1] = rows[1]  # an older row: copies before changing it
+assert fork._base is None and [list(r) for r in h] == rows
+print("PASS: writes copy only the touched tabs; History copies append in place")
+
 print("\nAll smoke tests passed.")
@@ -0,0 +1,355 @@
+"""Smoke test for the batched Sheets write path (sheets_plan + main.py)
+against a fake gspread spreadsheet that applies the batch requests.
+
+Run from /home/user/mafia/backend:
+    python test_sheets_plan.py
+"""
+
+import json
+import os
+
+import gspread
+
+from fake_gcs import FakeClient, FakeStore
+
+os.environ["STORAGE"] = "sheets"
+os.environ["GAME_PASSWORD"] = "x"
+
+import json_store
+import main
+
+HISTORY_HEADER = [
+    "GameID", "Player", "Alignment", "Result", "RateChange",
+    "old_mu", "new_mu", "new_sigma", "old_rating", "new_rating", "old_sigma",
+]
+
+
+def _text(cell: dict) -> str:
+    v = cell.get("userEnteredValue", {})
+    if "numberValue" in v:
+        n = v["numberValue"]
+        return str(int(n)) if n == int(n) else repr(n)
+    return str(v.get("stringValue", v.get("boolValue", "")))
+
+
+class FakeWorksheet:
+    def __init__(self, ss, title, sheet_id, rows):
+        self._ss = ss
+        self.title = title
+        self.id = sheet_id
+        self.rows = rows
+
+    def get_all_values(self):
+        return [list(r) for r in self.rows]
+
+    def col_values(self, col):
+        return [r[col - 1] if len(r) >= col else "" for r in self.rows]
+
+    def get_values(self, range_name):
+        row_s, row_e, col_s, col_e = json_store._parse_a1(range_name)
+        return [
+            (list(r) + [""] * (col_e + 1 - len(r)))[col_s : col_e + 1]
+            for r in self.rows[row_s : row_e + 1]
+        ]
+
+    def _row(self, i):
+        while len(self.rows) <= i:
+            self.rows.append([])
+        return self.rows[i]
+
+
+class FakeSpreadsheet:
+    """Applies values.batchUpdate / batchUpdate bodies to in-memory tabs.
+
+    Stats Summary has no formulas here: copyPaste copies row 2's values and
+    the tests only check row counts and order there.
+    """
+
+    def __init__(self):
+        self.sheets = {}
+        self.values_calls = []
+        self.batch_calls = []
+        self.batch_gets = 0
+        self.bandings = {}
+        self._next_banding = 1
+
+    def add(self, title, rows):
+        self.sheets[title] = FakeWorksheet(self, title, len(self.sheets) + 1, rows)
+
+    def worksheet(self, title):
+        if title not in self.sheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.sheets[title]
+
+    def _by_id(self, sheet_id):
+        return next(ws for ws in self.sheets.values() if ws.id == sheet_id)
+
+    def values_batch_update(self, body):
+        self.values_calls.append(body)
+        for item in body["data"]:
+            title, a1 = item["range"].split("!")
+            ws = self.sheets[title.strip("'")]
+            row_s, _, col_s, _ = json_store._parse_a1(a1)
+            for ri, vals in enumerate(item["values"]):
+                row = ws._row(row_s + ri)
+                for ci, v in enumerate(vals):
+                    while len(row) <= col_s + ci:
+                        row.append("")
+                    row[col_s + ci] = json_store._stringify(v)
+
+    def batch_update(self, body):
+        self.batch_calls.append(body)
+        for req in body["requests"]:
+            (kind, r), = req.items()
+            getattr(self, "_" + kind)(r)
+
+    def values_batch_get(self, ranges, params=None):
+        self.batch_gets += 1
+
+        def trimmed(row):  # the API drops trailing empty cells
+            row = list(row)
+            while row and row[-1] == "":
+                row.pop()
+            return row
+
+        return {
+            "valueRanges": [
+                {"values": [trimmed(r) for r in self.sheets[t.strip("'")].rows]}
+                for t in ranges
+            ]
+        }
+
+    def fetch_sheet_metadata(self, params=None):
+        return {
+            "sheets": [
+                {
+                    "properties": {"sheetId": ws.id},
+                    "bandedRanges": [
+                        {"bandedRangeId": b}
+                        for b, sid in self.bandings.items() if sid == ws.id
+                    ],
+                }
+                for ws in self.sheets.values()
+            ]
+        }
+
+    def _insertDimension(self, r):
+        rng = r["range"]
+        ws = self._by_id(rng["sheetId"])
+        ws.rows[rng["startIndex"]:rng["startIndex"]] = [
+            [] for _ in range(rng["endIndex"] - rng["startIndex"])
+        ]
+
+    def _deleteDimension(self, r):
+        rng = r["range"]
+        del self._by_id(rng["sheetId"]).rows[rng["startIndex"]:rng["endIndex"]]
+
+    def _addSheet(self, r):
+        props = r["properties"]
+        assert props["sheetId"] not in {ws.id for ws in self.sheets.values()}
+        self.sheets[props["title"]] = FakeWorksheet(self, props["title"], props["sheetId"], [])
+
+    def _updateCells(self, r):
+        ws = self._by_id(r["start"]["sheetId"])
+        for i, row in enumerate(r["rows"]):
+            ws._row(r["start"]["rowIndex"] + i)[:] = [_text(c) for c in row["values"]]
+
+    def _copyPaste(self, r):
+        src, dst = r["source"], r["destination"]
+        ws = self._by_id(src["sheetId"])
+        cells = ws.rows[src["startRowIndex"]][src["startColumnIndex"]:src["endColumnIndex"]]
+        for i in range(dst["startRowIndex"], dst["endRowIndex"]):
+            row = ws._row(i)
+            row[dst["startColumnIndex"]:dst["endColumnIndex"]] = cells
+
+    def _sortRange(self, r):
+        rng, (spec,) = r["range"], r["sortSpecs"]
+        ws = self._by_id(rng["sheetId"])
+        col = spec["dimensionIndex"]
+        ws.rows[rng["startRowIndex"]:rng["endRowIndex"]] = sorted(
+            ws.rows[rng["startRowIndex"]:rng["endRowIndex"]],
+            key=lambda row: float(row[col] or 0),
+            reverse=spec["sortOrder"] == "DESCENDING",
+        )
+
+    def _deleteBanding(self, r):
+        del self.bandings[r["bandedRangeId"]]
+
+    def _addBanding(self, r):
+        self.bandings[self._next_banding] = r["bandedRange"]["range"]["sheetId"]
+        self._next_banding += 1
+
+    def _updateBorders(self, r):
+        pass
+
+    def _repeatCell(self, r):
+        pass
+
+
+SS = FakeSpreadsheet()
+SS.add("MatchRatings", [["Player", "mu", "sigma"]])
+SS.add("MatchHistory", [HISTORY_HEADER])
+SS.add("Stats Summary", [json_store._SUMMARY_HEADER, ["Seed"] + ["0"] * 11])
+
+main.get_sheet = lambda: SS
+
+names = [f"P{i}" for i in range(1, 16)]
+assignments = [
+    {
+        "position": i,
+        "name": name,
+        "role": "Mafia" if i <= 3 else "Cop" if i == 4 else "Town",
+        "is_ghost": False,
+    }
+    for i, name in enumerate(names, start=1)
+]
+
+
+def calls():
+    return len(SS.values_calls), len(SS.batch_calls)
+
+
+# 1. A game with 15 new players: one values call, one structural call.
+r = main.record_game({"assignments": assignments, "winner": "Town"})
+assert r["game_id"] == 46, r
+assert calls() == (1, 1), calls()
+assert len(SS.sheets["MatchHistory"].rows) == 16
+assert SS.sheets["MatchHistory"].rows[1][:4] == ["46", "P1", "Mafia", "Loss"]
+assert len(SS.sheets["MatchRatings"].rows) == 16
+assert len(SS.sheets["Stats Summary"].rows) == 17
+assert len(SS.bandings) == 1
+print("PASS: first game (15 new players) = 1 values.batchUpdate + 1 batchUpdate")
+
+# 2. A game with only known players: still one of each.
+r = main.record_game({"assignments": assignments, "winner": "Mafia"})
+assert r["game_id"] == 47, r
+assert calls() == (2, 2), calls()
+assert len(SS.sheets["Stats Summary"].rows) == 17
+assert len(SS.bandings) == 1
+print("PASS: repeat game = 1 values.batchUpdate + 1 batchUpdate")
+
+# 3. The sheets match what the JSON store computes for the same games.
+store = FakeStore()
+store.put("o.json", json.dumps({"tabs": {"MatchRatings": [["Player", "mu", "sigma"]],
+                                         "MatchHistory": [HISTORY_HEADER]}}))
+json_ss = json_store.JsonSpreadsheet("b", "o.json", client=FakeClient(store))
+main.get_sheet = lambda: json_ss
+main.STORAGE = "gcs_json"
+main.record_game({"assignments": assignments, "winner": "Town"})
+main.record_game({"assignments": assignments, "winner": "Mafia"})
+main.STORAGE = "sheets"
+main.get_sheet = lambda: SS
+for tab in ("MatchRatings", "MatchHistory"):
+    got = SS.sheets[tab].rows
+    want = json_ss.worksheet(tab).get_all_values()
+    assert [[float(v) if v[:1].isdigit() else v for v in r] for r in got] == [
+        [float(v) if v[:1].isdigit() else v for v in r] for r in want
+    ], tab
+print("PASS: batched writes leave the same MatchRatings / MatchHistory as json_store")
+
+# 4. Undo is batched too and removes players left with no games.
+SS.sheets["MatchHistory"].rows[1:1] = [["48", "Newbie", "Town", "Win", "10",
+                                        "25", "26", "8", "0", "10", "8.3"]]
+SS.sheets["MatchRatings"].rows.append(["Newbie", "26", "8"])
+SS.sheets["Stats Summary"].rows.append(["Newbie"] + ["0"] * 11)
+r = main.undo_last_game()
+assert r == {"undone_game_id": 48, "players_restored": ["Newbie"],
+             "players_deleted": ["Newbie"]}, r
+assert calls() == (3, 3), calls()
+assert "Newbie" not in {row[0] for row in SS.sheets["MatchRatings"].rows}
+assert "Newbie" not in {row[0] for row in SS.sheets["Stats Summary"].rows}
+assert SS.sheets["MatchHistory"].rows[1][0] == "47"
+print("PASS: undo = 1 values.batchUpdate + 1 batchUpdate")
+
+# 5. getDashboard reads every tab it needs in one values.batchGet.
+dash = main.get_dashboard({})
+assert SS.batch_gets == 1
+assert dash["last_game"] == main.get_last_game()
+assert dash["players"] == main.get_players()
+assert dash["stats"]["game_summary"]["total_games"] == 2
+print("PASS: getDashboard = 1 values.batchGet")
+
+# 6. A match history page reads column A plus the page's rows.
+page = main.get_match_history({"limit": 1})
+assert [g["game_id"] for g in page["games"]] == [47]
+assert page["next_before_game_id"] == 47
+page = main.get_match_history({"limit": 1, "before_game_id": 47})
+assert [g["game_id"] for g in page["games"]] == [46]
+assert page["next_before_game_id"] is None
+assert page["games"] == main.get_match_history()["games"][1:]
+print("PASS: paged getMatchHistory on Sheets")
+
+# 7. getPlayerHistories indexes one read of MatchHistory per request.
+r = main.get_player_histories({"player_names": ["P1", "P2"]})
+assert [g["game_id"] for g in r["histories"]["P1"]] == [47, 46]
+assert r["histories"]["P2"] == main.get_player_history({"player_name": "P2"})["games"]
+print("PASS: getPlayerHistories on Sheets")
+
+# 8. A checkpoint game creates RatingSnapshots, backfills the earlier
+#    checkpoints and still costs one call of each kind; undo drops it.
+main.RATING_SNAPSHOT_EVERY = 2
+r = main.record_game({"assignments": assignments, "winner": "Town"})
+assert r["game_id"] == 48, r
+assert calls() == (4, 4), calls()
+assert any("addSheet" in req for req in SS.batch_calls[-1]["requests"])  # same batch
+snaps = SS.sheets["RatingSnapshots"].rows
+assert snaps[0] == main.SNAPSHOT_HEADER
+assert [row[0] for row in snaps[1:]] == ["48"] * 15 + ["46"] * 15
+at = lambda g: {p["name"]: (p["mu"], p["sigma"]) for p in main.get_ratings_at({"game_id": g})["players"]}
+assert at(48) == {p["name"]: (p["mu"], p["sigma"]) for p in main.get_players()["players"]}
+assert at(47) == {
+    row[1]: (float(row[6]), float(row[7])) for row in SS.sheets["MatchHistory"].rows
+    if row[0] == "47"
+}
+main.undo_last_game()
+assert calls() == (5, 5), calls()
+assert [row[0] for row in SS.sheets["RatingSnapshots"].rows[1:]] == ["46"] * 15
+assert at(48) == at(47)
+main.RATING_SNAPSHOT_EVERY = 25
+print("PASS: RatingSnapshots checkpoints and getRatingsAt on Sheets")
+
+# 9. editGame writes its re-rate as one values.batchUpdate (+ the sort).
+r = main.edit_game({"game_id": 46, "winner": "Mafia"})
+assert r["games_rerated"] == [46, 47], r
+assert calls() == (6, 6), calls()
+history = SS.sheets["MatchHistory"].rows
+assert {row[3] for row in history[1:] if row[0] == "46" and row[2] == "Mafia"} == {"Win"}
+latest = {row[1]: row[6:8] for row in history[1:] if row[0] == "47"}
+assert all(row[1:3] == latest[row[0]] for row in SS.sheets["MatchRatings"].rows[1:])
+print("PASS: editGame on Sheets = 1 values.batchUpdate + 1 batchUpdate")
+
+# 10. recordGames: three games (new players, two checkpoints) in one call of
+#     each kind, leaving what recording them one by one leaves.
+main.RATING_SNAPSHOT_EVERY = 2
+store = FakeStore()
+store.put("seq.json", json.dumps({"tabs": {
+    tab: [list(row) for row in SS.sheets[tab].rows]
+    for tab in ("MatchRatings", "MatchHistory", "RatingSnapshots")
+}}))
+json_ss = json_store.JsonSpreadsheet("b", "seq.json", client=FakeClient(store))
+newcomers = [dict(a, name=n) for a, n in zip(assignments, names[:13] + ["New1", "New2"])]
+games = [
+    {"assignments": newcomers, "winner": "Town"},
+    {"assignments": assignments, "winner": "Mafia", "night0_kills": ["P7"]},
+    {"assignments": newcomers, "winner": "Mafia"},
+]
+main.get_sheet = lambda: json_ss
+main.STORAGE = "gcs_json"
+one_by_one = [main.record_game(json.loads(json.dumps(g))) for g in games]
+main.STORAGE = "sheets"
+main.get_sheet = lambda: SS
+r = main.record_games({"games": games})
+assert r["games"] == one_by_one, r
+assert [g["game_id"] for g in r["games"]] == [48, 49, 50]
+assert calls() == (7, 7), calls()
+for tab in ("MatchRatings", "MatchHistory", "RatingSnapshots"):
+    got = SS.sheets[tab].rows
+    want = json_ss.worksheet(tab).get_all_values()
+    assert [[float(v) if v[:1].isdigit() else v for v in r] for r in got] == [
+        [float(v) if v[:1].isdigit() else v for v in r] for r in want
+    ], tab
+assert [row[0] for row in SS.sheets["RatingSnapshots"].rows[1::17]] == ["50", "48", "46"]
+main.RATING_SNAPSHOT_EVERY = 25
+print("PASS: recordGames = 1 values.batchUpdate + 1 batchUpdate, same as one by one")
+
+print("\nAll Sheets write plan smoke tests passed.")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Verify the closed-form rating engine against trueskill's factor graph.
+
+Rates every game in every MatchHistory-style sheet of Elo Mafia Rankings.xlsx
+(using each row's stored old_mu/old_sigma as the pre-game rating) and replays
+ego_mafia/games_input.csv from scratch, under both the main and ego-mafia
+ghost configs. Each game goes through the "trueskill" factor-graph backend
+and through every closed-form backend of rating_engine; the largest |mu| /
+|sigma| difference per backend is reported.
+
+Usage: python verify_closed_form.py    (exit status 1 if any diff > 1e-9)
+"""
+
+import csv
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+import openpyxl
+
+import rating_engine
+
+REPO = Path(__file__).resolve().parent.parent
+XLSX = REPO / "Elo Mafia Rankings.xlsx"
+GAMES_CSV = REPO / "ego_mafia" / "games_input.csv"
+
+TOLERANCE = 1e-9
+
+CONFIGS = {"main": rating_engine.MAIN, "ego": rating_engine.EGO}
+CLOSED_FORM = [name for name in rating_engine.BACKENDS if name != "trueskill"]
+
+
+def factor_graph(mafia, town, mafia_won, cfg):
+    return rating_engine.rate_teams(mafia, town, mafia_won, cfg, backend="trueskill")
+
+
+def max_diff(a, b):
+    """Largest |mu| / |sigma| gap between two rate_teams results."""
+    return max(
+        max(abs(ta[n]["mu"] - tb[n]["mu"]), abs(ta[n]["sigma"] - tb[n]["sigma"]))
+        for ta, tb in zip(a, b)
+        for n in ta
+    )
+
+
+def xlsx_games():
+    """Yield (label, mafia_players, town_players, mafia_won) per stored game."""
+    wb = openpyxl.load_workbook(XLSX, data_only=True, read_only=True)
+    for sheet in wb.sheetnames:
+        if not sheet.endswith("MatchHistory"):
+            continue
+        games = defaultdict(list)
+        for row in wb[sheet].iter_rows(min_row=2, values_only=True):
+            if not row[0] or row[3] not in ("Win", "Loss") or row[5] in (None, ""):
+                continue
+            games[int(row[0])].append(row)
+        for gid in sorted(games):
+            rows = games[gid]
+            mafia_won = any(r[2] == "Mafia" and r[3] == "Win" for r in rows)
+            mafia, town = [], []
+            for r in rows:
+                p = {"name": r[1], "mu": float(r[5]), "sigma": float(r[10])}
+                (mafia if r[2] == "Mafia" else town).append(p)
+            if mafia and town:
+                yield f"{sheet} #{gid}", mafia, town, mafia_won
+
+
+def csv_games(cfg):
+    """Replay games_input.csv from scratch, yielding each game as rated."""
+    games = defaultdict(list)
+    order = []
+    with open(GAMES_CSV, newline="") as f:
+        for row in csv.DictReader(f):
+            gid = row["GameID"].strip()
+            if gid not in games:
+                order.append(gid)
+            games[gid].append(row)
+    ratings = {}
+    for gid in order:
+        rows = games[gid]
+        winner = next(r["Winner"] for r in rows if r["Winner"].strip())
+        mafia_won = winner.strip().lower().startswith("maf")
+        mafia, town = [], []
+        for r in rows:
+            if r["IsGhost"].upper() == "TRUE" or r["NightZero"].upper() == "TRUE":
+                continue
+            name = r["Name"].strip()
+            cur = ratings.get(
+                name, {"mu": rating_engine.PRIOR_MU, "sigma": rating_engine.PRIOR_SIGMA}
+            )
+            p = {"name": name, "mu": cur["mu"], "sigma": cur["sigma"]}
+            (mafia if r["Role"] == "Mafia" else town).append(p)
+        new = rating_engine.compute_trueskill(
+            mafia, town, mafia_won, cfg, backend="trueskill"
+        )
+        yield f"games_input.csv #{gid}", mafia, town, mafia_won
+        ratings.update(new)
+
+
+def main():
+    worst = 0.0
+    n_games = 0
+    for key, cfg in CONFIGS.items():
+        cfg_worst = dict.fromkeys(CLOSED_FORM, 0.0)
+        for source in (xlsx_games(), csv_games(cfg)):
+            for label, mafia, town, mafia_won in source:
+                ref = factor_graph(mafia, town, mafia_won, cfg)
+                for backend in CLOSED_FORM:
+                    got = rating_engine.rate_teams(
+                        mafia, town, mafia_won, cfg, backend=backend
+                    )
+                    d = max_diff(ref, got)
+                    if d > TOLERANCE:
+                        print(f"  [{key}/{backend}] {label}: max diff {d:.3e}")
+                    cfg_worst[backend] = max(cfg_worst[backend], d)
+                n_games += 1
+        for backend, d in cfg_worst.items():
+            print(f"{key:<5} {backend:<7} max |diff| = {d:.3e}")
+            worst = max(worst, d)
+
+    print(f"\n{n_games} game ratings compared, worst diff {worst:.3e} "
+          f"(tolerance {TOLERANCE:.0e})")
+    sys.exit(0 if worst <= TOLERANCE else 1)
+
+
+if __name__ == "__main__":
+    main()
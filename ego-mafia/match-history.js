@@ -30,54 +30,114 @@ function showToast(msg) {
 	toast._timer = setTimeout(() => toast.classList.add('hidden'), 4000);
 }
 
-async function api(action, data = {}) {
-	const resp = await fetch(window.SCRIPT_URL, {
-		method: 'POST',
-		headers: { 'Content-Type': 'application/json' },
-		body: JSON.stringify({ action, ...data }),
-	});
+// Reads go over GET so the browser keeps the response and revalidates it
+// with If-None-Match, like ./data.json; the backend answers 304 with no
+// body while nothing has been recorded since.
+async function apiGet(action, params = {}) {
+	const qs = new URLSearchParams({ action, ...params });
+	const resp = await fetch(`${window.SCRIPT_URL}?${qs}`, { cache: 'no-cache' });
 	const result = await resp.json();
 	if (result.error) throw new Error(result.error);
 	return result;
 }
 
+const PAGE_SIZE = 20;
+
+let rankMap = new Map();
+let nextBefore = null; // before_game_id of the next page; null on the last page
+let fetching = false;
+let observer = null;
+let localGames = null; // ./data.json fallback: every game, paged here
+
 async function load() {
+	const container = $('#games-list');
 	try {
-		let players, games;
+		let players, first;
 		if (window.SCRIPT_URL) {
-			const [stats, mh] = await Promise.all([
-				api('getStats'),
-				api('getMatchHistory'),
-			]);
-			players = stats.players;
-			games = mh.games;
+			const data = await apiGet('getDashboard', {
+				fields: ['stats', 'match_history'],
+				limit: PAGE_SIZE,
+			});
+			players = data.stats.players;
+			first = data.match_history;
 		} else {
 			const resp = await fetch('./data.json', { cache: 'no-cache' });
 			if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
 			const data = await resp.json();
 			players = data.players;
-			games = data.games;
+			localGames = data.games || [];
+			first = await fetchPage(null);
 		}
-		const rankMap = new Map();
 		const byRating = [...(players || [])].sort((a, b) => b.rating - a.rating);
 		byRating.forEach((p, i) => rankMap.set(p.name, i + 1));
-		render(games || [], rankMap);
+
+		container.innerHTML = '';
+		if (!first.games.length) {
+			container.innerHTML = '<p style="color: var(--text-muted)">No games yet.</p>';
+			return;
+		}
+		appendPage(first);
 	} catch (e) {
 		showToast('Failed to load match history: ' + e.message);
 	}
 }
 
-function render(games, rankMap) {
+async function fetchPage(before) {
+	if (localGames) {
+		const rest = before === null ? localGames : localGames.filter((g) => g.game_id < before);
+		const games = rest.slice(0, PAGE_SIZE);
+		const more = rest.length > PAGE_SIZE;
+		return { games, next_before_game_id: more ? games[games.length - 1].game_id : null };
+	}
+	return apiGet('getMatchHistory', { limit: PAGE_SIZE, before_game_id: before });
+}
+
+function appendPage(page) {
 	const container = $('#games-list');
-	container.innerHTML = '';
+	for (const g of page.games || []) {
+		container.appendChild(renderGame(g, rankMap));
+	}
+	nextBefore = page.next_before_game_id ?? null;
+	watchSentinel();
+}
 
-	if (!games.length) {
-		container.innerHTML = '<p style="color: var(--text-muted)">No games yet.</p>';
+// Infinite scroll: a sentinel after the list pulls the next page once it
+// comes within a screen of the viewport.
+function watchSentinel() {
+	let sentinel = $('#games-more');
+	if (nextBefore === null) {
+		sentinel?.remove();
+		observer?.disconnect();
 		return;
 	}
+	if (!sentinel) {
+		sentinel = document.createElement('div');
+		sentinel.id = 'games-more';
+		$('#games-list').after(sentinel);
+	}
+	if (!observer) {
+		observer = new IntersectionObserver(
+			(entries) => {
+				if (entries.some((e) => e.isIntersecting)) loadMore();
+			},
+			{ rootMargin: '100% 0px' }
+		);
+	}
+	// Re-observing reports the current intersection, so a page that leaves
+	// the sentinel on screen pulls the next one straight away.
+	observer.unobserve(sentinel);
+	observer.observe(sentinel);
+}
 
-	for (const g of games) {
-		container.appendChild(renderGame(g, rankMap));
+async function loadMore() {
+	if (fetching || nextBefore === null) return;
+	fetching = true;
+	try {
+		appendPage(await fetchPage(nextBefore));
+	} catch (e) {
+		showToast('Failed to load more games: ' + e.message);
+	} finally {
+		fetching = false;
 	}
 }
 
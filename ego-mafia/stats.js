@@ -15,12 +15,12 @@ function showToast(msg) {
 	toast._timer = setTimeout(() => toast.classList.add('hidden'), 4000);
 }
 
-async function api(action, data = {}) {
-	const resp = await fetch(window.SCRIPT_URL, {
-		method: 'POST',
-		headers: { 'Content-Type': 'application/json' },
-		body: JSON.stringify({ action, ...data }),
-	});
+// Reads go over GET so the browser keeps the response and revalidates it
+// with If-None-Match, like ./data.json; the backend answers 304 with no
+// body while nothing has been recorded since.
+async function apiGet(action, params = {}) {
+	const qs = new URLSearchParams({ action, ...params });
+	const resp = await fetch(`${window.SCRIPT_URL}?${qs}`, { cache: 'no-cache' });
 	const result = await resp.json();
 	if (result.error) throw new Error(result.error);
 	return result;
@@ -57,15 +57,20 @@ function buildHistoryMap(games) {
 async function loadStats() {
 	try {
 		if (window.SCRIPT_URL) {
-			const [stats, mh] = await Promise.all([
-				api('getStats'),
-				api('getMatchHistory'),
-			]);
+			const data = await apiGet('getDashboard', { fields: ['stats'] });
 			statsData = {
-				players: stats.players,
-				game_summary: stats.game_summary,
-				history: buildHistoryMap(mh.games),
+				players: data.stats.players,
+				game_summary: data.stats.game_summary,
+				history: {},
 			};
+			// Every player's games in one call, fetched while the
+			// leaderboard renders instead of the whole match history.
+			const names = statsData.players.map((p) => p.name);
+			if (names.length) {
+				statsData.historyLoaded = apiGet('getPlayerHistories', {
+					player_names: names.join(','),
+				}).then((h) => { statsData.history = h.histories; });
+			}
 		} else {
 			const resp = await fetch('./data.json', { cache: 'no-cache' });
 			if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
@@ -159,7 +164,7 @@ function renderLeaderboard(players) {
 	});
 }
 
-function showPlayerDetail(playerName) {
+async function showPlayerDetail(playerName) {
 	const detailPanel = $('#player-detail');
 	const tbody = $('#detail-tbody');
 
@@ -171,6 +176,14 @@ function showPlayerDetail(playerName) {
 	detailPanel.classList.remove('hidden');
 	tbody.innerHTML = '';
 
+	if (statsData.historyLoaded) {
+		try {
+			await statsData.historyLoaded;
+		} catch (e) {
+			showToast('Failed to load player history: ' + e.message);
+			return;
+		}
+	}
 	const games = (statsData.history[playerName] || []);
 	for (const g of games) {
 		const tr = document.createElement('tr');
@@ -29,17 +29,17 @@ from pathlib import Path
 
 from google.cloud import storage
 from google.oauth2.service_account import Credentials
-from trueskill import Rating, TrueSkill
 
 HERE = Path(__file__).parent
+sys.path.insert(0, str(HERE.parent / "backend"))
+
+import rating_engine  # noqa: E402  (shared with the Cloud Function backend)
+
 INPUT_CSV = HERE / "games_input.csv"
 
 TRUESKILL_MU = 25
 TRUESKILL_SIGMA = 25 / 3
-MAFIA_GHOST_MU = 25.275
-MAFIA_GHOST_SIGMA = 0.8
-TOWN_GHOST_MU = 24.275
-TOWN_GHOST_SIGMA = 0.8
+RATING_CONFIG = rating_engine.EGO
 
 SCOPES = [
     "https://www.googleapis.com/auth/devstorage.read_write",
@@ -52,8 +52,6 @@ HISTORY_HEADER = [
     "old_mu", "new_mu", "new_sigma", "old_rating", "new_rating", "old_sigma",
 ]
 
-env = TrueSkill(tau=0.1, beta=5.0, draw_probability=0.0)
-
 
 def display_rating(mu, sigma):
     return round((mu - 1.5 * sigma) * 68)
@@ -64,39 +62,9 @@ def parse_bool(v):
 
 
 def compute_trueskill(mafia_players, town_players, mafia_won):
-    n_mafia = len(mafia_players)
-    n_town = len(town_players)
-
-    mafia_dict = {}
-    mu_geo = 1.0
-    sigma_geo = 1.0
-    for p in mafia_players:
-        mafia_dict[p["name"]] = Rating(p["mu"], p["sigma"])
-        mu_geo *= p["mu"]
-        sigma_geo *= p["sigma"]
-    mu_avg = mu_geo ** (1 / n_mafia)
-    sigma_avg = sigma_geo ** (1 / n_mafia)
-    for i in range(n_town - n_mafia):
-        mafia_dict[f"_mafia_avg{i}"] = Rating(mu_avg, sigma_avg)
-    for i in range(n_town):
-        mafia_dict[f"_mafia_ghost{i}"] = Rating(MAFIA_GHOST_MU, MAFIA_GHOST_SIGMA)
-
-    town_dict = {}
-    for p in town_players:
-        town_dict[p["name"]] = Rating(p["mu"], p["sigma"])
-    for i in range(n_town):
-        town_dict[f"_town_ghost{i}"] = Rating(TOWN_GHOST_MU, TOWN_GHOST_SIGMA)
-
-    ranks = [0, 1] if mafia_won else [1, 0]
-    rated = env.rate([mafia_dict, town_dict], ranks=ranks)
-    out = {}
-    for p in mafia_players:
-        r = rated[0][p["name"]]
-        out[p["name"]] = {"mu": r.mu, "sigma": r.sigma}
-    for p in town_players:
-        r = rated[1][p["name"]]
-        out[p["name"]] = {"mu": r.mu, "sigma": r.sigma}
-    return out
+    return rating_engine.compute_trueskill(
+        mafia_players, town_players, mafia_won, RATING_CONFIG
+    )
 
 
 def load_games():
@@ -12,24 +12,23 @@ Usage:
 
 import csv
 import json
+import sys
 from pathlib import Path
 
 from openpyxl import Workbook
-from trueskill import Rating, TrueSkill
 
 HERE = Path(__file__).parent
+sys.path.insert(0, str(HERE.parent / "backend"))
+
+import rating_engine  # noqa: E402  (shared with the Cloud Function backend)
+
 INPUT_CSV = HERE / "games_input.csv"
 OUTPUT_XLSX = HERE / "match_results.xlsx"
 SITE_DATA = HERE.parent / "ego-mafia" / "data.json"
 
 TRUESKILL_MU = 25
 TRUESKILL_SIGMA = 25 / 3
-MAFIA_GHOST_MU = 25.275
-MAFIA_GHOST_SIGMA = 0.8
-TOWN_GHOST_MU = 24.275
-TOWN_GHOST_SIGMA = 0.8
-
-env = TrueSkill(tau=0.1, beta=5.0, draw_probability=0.0)
+RATING_CONFIG = rating_engine.EGO
 
 
 def display_rating(mu, sigma):
@@ -41,41 +40,9 @@ def parse_bool(v):
 
 
 def compute_trueskill(mafia_players, town_players, mafia_won):
-    n_mafia = len(mafia_players)
-    n_town = len(town_players)
-
-    mafia_dict = {}
-    mu_geo = 1.0
-    sigma_geo = 1.0
-    for p in mafia_players:
-        mafia_dict[p["name"]] = Rating(p["mu"], p["sigma"])
-        mu_geo *= p["mu"]
-        sigma_geo *= p["sigma"]
-
-    mu_avg = mu_geo ** (1 / n_mafia)
-    sigma_avg = sigma_geo ** (1 / n_mafia)
-    for i in range(n_town - n_mafia):
-        mafia_dict[f"_mafia_avg{i}"] = Rating(mu_avg, sigma_avg)
-    for i in range(n_town):
-        mafia_dict[f"_mafia_ghost{i}"] = Rating(MAFIA_GHOST_MU, MAFIA_GHOST_SIGMA)
-
-    town_dict = {}
-    for p in town_players:
-        town_dict[p["name"]] = Rating(p["mu"], p["sigma"])
-    for i in range(n_town):
-        town_dict[f"_town_ghost{i}"] = Rating(TOWN_GHOST_MU, TOWN_GHOST_SIGMA)
-
-    ranks = [0, 1] if mafia_won else [1, 0]
-    rated = env.rate([mafia_dict, town_dict], ranks=ranks)
-
-    out = {}
-    for p in mafia_players:
-        r = rated[0][p["name"]]
-        out[p["name"]] = {"mu": r.mu, "sigma": r.sigma}
-    for p in town_players:
-        r = rated[1][p["name"]]
-        out[p["name"]] = {"mu": r.mu, "sigma": r.sigma}
-    return out
+    return rating_engine.compute_trueskill(
+        mafia_players, town_players, mafia_won, RATING_CONFIG
+    )
 
 
 def load_games():
@@ -333,18 +300,23 @@ def write_site_data(order, games, winners, ratings, history_rows):
         })
     games_summary.sort(key=lambda g: g["game_id"], reverse=True)
 
-    SITE_DATA.parent.mkdir(parents=True, exist_ok=True)
-    SITE_DATA.write_text(
-        json.dumps(
-            {
-                "players": players,
-                "game_summary": game_summary,
-                "history": history,
-                "games": games_summary,
-            },
-            indent=2,
-        )
+    text = json.dumps(
+        {
+            "players": players,
+            "game_summary": game_summary,
+            "history": history,
+            "games": games_summary,
+        },
+        indent=2,
     )
+    # The site revalidates data.json on every load (fetch cache: 'no-cache');
+    # leaving an unchanged file alone keeps the host's ETag / Last-Modified
+    # valid, so repeat visitors get a 304.
+    if SITE_DATA.exists() and SITE_DATA.read_text() == text:
+        print(f"{SITE_DATA} unchanged")
+        return
+    SITE_DATA.parent.mkdir(parents=True, exist_ok=True)
+    SITE_DATA.write_text(text)
     print(f"Wrote {SITE_DATA}")
 
 
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+"""Maximum-likelihood fit of the ghost gap, beta and tau to real games.
+
+Replays MatchHistory from Elo Mafia Rankings.xlsx under candidate
+parameters, scoring every game's outcome with the pre-game predicted mafia
+win probability (rating_engine.predict_mafia_win) before applying the
+update. The replay is vectorized over parameter sets: ratings are
+(candidates, players) arrays and each game is one rate_arrays call for all
+candidates, so the objective and its central-difference gradient come out
+of a single pass and L-BFGS-B needs one pass per step.
+
+The ghost midpoint is not identifiable from outcomes: both teams carry
+n_town ghosts, so only the gap (mafia ghost mu - town ghost mu) reaches the
+team difference. It is held at --midpoint and only (gap, beta, tau) are fit.
+
+Prints negative log-likelihood and Brier score for the MAIN and EGO configs
+and the fit, then the rerate_with_new_params.py report under the fit.
+
+Usage: python fit_ghost_params.py [--xlsx PATH] [--midpoint MU] [--no-report]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+
+import rating_engine  # noqa: E402  (shared with the Cloud Function backend)
+import rerate_with_new_params  # noqa: E402
+
+XLSX = Path("Elo Mafia Rankings.xlsx")
+
+MIDPOINT = 24.775  # current ego-mafia midpoint, (25.275 + 24.275) / 2
+
+# (gap, beta, tau): starting point and L-BFGS-B bounds
+X0 = (1.0, 5.0, 0.1)
+BOUNDS = [(-4.0, 8.0), (1.0, 15.0), (1e-3, 2.0)]
+
+# Central-difference step for the gradient
+STEP = 1e-4
+
+# Keeps log(p) finite for games the parameters call with certainty
+P_CLIP = 1e-12
+
+
+def dup_mask(idx):
+    """True for every index but the last occurrence (dict-collapse order)."""
+    mask = np.zeros(len(idx), dtype=bool)
+    seen = set()
+    for i in range(len(idx) - 1, -1, -1):
+        mask[i] = idx[i] in seen
+        seen.add(idx[i])
+    return mask
+
+
+def load_games(xlsx=XLSX):
+    """[(mafia_idx, town_idx, mafia_dup, town_dup, mafia_won)], player count.
+
+    Same game selection and rosters as rerate_with_new_params.report.
+    """
+    mh = pd.read_excel(xlsx, sheet_name="MatchHistory")
+    mh = mh[mh.Result.isin(["Win", "Loss"])]
+    index = {}
+    games = []
+    for _, g in mh.groupby("GameID", sort=True):
+        mafia = [index.setdefault(p, len(index))
+                 for p in g[g.Alignment == "Mafia"].Player]
+        town = [index.setdefault(p, len(index))
+                for p in g[g.Alignment == "Town"].Player]
+        if not mafia or not town:
+            continue
+        mafia_won = bool((g[g.Alignment == "Mafia"].Result == "Win").any())
+        games.append((np.array(mafia), np.array(town), dup_mask(mafia),
+                      dup_mask(town), mafia_won))
+    return games, len(index)
+
+
+def configs_for(x, midpoint):
+    """One Config whose fields are arrays over the candidate rows of x."""
+    x = np.atleast_2d(x)
+    gap, beta, tau = x[:, 0], x[:, 1], x[:, 2]
+    return rating_engine.Config(
+        mafia_ghost_mu=midpoint + gap / 2,
+        town_ghost_mu=midpoint - gap / 2,
+        beta=beta,
+        tau=tau,
+    )
+
+
+def replay(games, n_players, x, midpoint=MIDPOINT):
+    """Replay all games for every candidate row of x.
+
+    Returns (nll, brier) arrays with one entry per candidate.
+    """
+    cfg = configs_for(x, midpoint)
+    n = len(cfg.beta)
+    mu = np.full((n, n_players), rating_engine.PRIOR_MU)
+    sigma = np.full((n, n_players), rating_engine.PRIOR_SIGMA)
+    nll = np.zeros(n)
+    sq_err = np.zeros(n)
+    for mafia, town, mafia_dup, town_dup, mafia_won in games:
+        m_mu, m_sigma = mu[:, mafia], sigma[:, mafia]
+        t_mu, t_sigma = mu[:, town], sigma[:, town]
+        p = rating_engine.predict_mafia_win(
+            m_mu, m_sigma, t_mu, t_sigma, cfg, mafia_dup, town_dup
+        )
+        p = np.clip(p, P_CLIP, 1 - P_CLIP)
+        nll -= np.log(p if mafia_won else 1 - p)
+        sq_err += (p - mafia_won) ** 2
+        new_m_mu, new_m_sigma, new_t_mu, new_t_sigma = rating_engine.rate_arrays(
+            m_mu, m_sigma, t_mu, t_sigma, np.full(n, mafia_won), cfg,
+            mafia_dup, town_dup,
+        )
+        # Town written last: a name on both teams keeps its town result.
+        keep_m, keep_t = ~mafia_dup, ~town_dup
+        mu[:, mafia[keep_m]] = new_m_mu[:, keep_m]
+        sigma[:, mafia[keep_m]] = new_m_sigma[:, keep_m]
+        mu[:, town[keep_t]] = new_t_mu[:, keep_t]
+        sigma[:, town[keep_t]] = new_t_sigma[:, keep_t]
+    return nll, sq_err / len(games)
+
+
+def objective(games, n_players, midpoint):
+    """f(x) -> (nll, grad) from one batched replay of x and its ±STEP probes."""
+    def f(x):
+        x = np.asarray(x, dtype=float)
+        probes = [x]
+        for i in range(len(x)):
+            for sign in (1, -1):
+                xi = x.copy()
+                xi[i] += sign * STEP
+                probes.append(xi)
+        try:
+            nll, _ = replay(games, n_players, np.array(probes), midpoint)
+        except FloatingPointError:
+            return np.inf, np.zeros_like(x)
+        grad = (nll[1::2] - nll[2::2]) / (2 * STEP)
+        return nll[0], grad
+    return f
+
+
+def fit(games, n_players, midpoint=MIDPOINT, x0=X0):
+    """L-BFGS-B over (gap, beta, tau). Returns the scipy OptimizeResult."""
+    return minimize(objective(games, n_players, midpoint), np.array(x0),
+                    jac=True, method="L-BFGS-B", bounds=BOUNDS)
+
+
+def config_x(cfg):
+    return (cfg.mafia_ghost_mu - cfg.town_ghost_mu, cfg.beta, cfg.tau)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--xlsx", type=Path, default=XLSX)
+    ap.add_argument("--midpoint", type=float, default=MIDPOINT)
+    ap.add_argument("--no-report", action="store_true",
+                    help="skip the rerate_with_new_params.py report")
+    args = ap.parse_args()
+
+    games, n_players = load_games(args.xlsx)
+    t0 = time.perf_counter()
+    replay(games, n_players, X0, args.midpoint)
+    per_eval = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    res = fit(games, n_players, args.midpoint)
+    fit_time = time.perf_counter() - t0
+    gap, beta, tau = res.x
+
+    print("=" * 90)
+    print(f"ML fit over {len(games)} games, {n_players} players  "
+          f"(one replay {per_eval * 1e3:.1f} ms, fit {fit_time:.2f} s, "
+          f"{res.nfev} batched replays)")
+    print("=" * 90)
+    print(f"{'Config':<28}{'gap':>7}{'beta':>7}{'tau':>7}"
+          f"{'NLL':>10}{'NLL/game':>10}{'Brier':>8}")
+    print("-" * 77)
+    rows = [(c.label, config_x(c)) for c in (rating_engine.MAIN, rating_engine.EGO)]
+    rows.append(("ML fit", res.x))
+    for label, x in rows:
+        nll, brier = replay(games, n_players, x, args.midpoint)
+        print(f"{label:<28}{x[0]:>7.3f}{x[1]:>7.3f}{x[2]:>7.3f}"
+              f"{nll[0]:>10.3f}{nll[0] / len(games):>10.4f}{brier[0]:>8.4f}")
+    print(f"\nCoin flip: NLL/game = {np.log(2):.4f}, Brier = 0.2500")
+    if not res.success:
+        print(f"WARNING: optimizer did not converge: {res.message}")
+    for name, v, (lo, hi) in zip(("gap", "beta", "tau"), res.x, BOUNDS):
+        if np.isclose(v, lo) or np.isclose(v, hi):
+            print(f"NOTE: {name} = {v:.3f} sits on its bound [{lo}, {hi}]; "
+                  f"the likelihood is still improving past it.")
+
+    cfg = rating_engine.Config(
+        mafia_ghost_mu=round(args.midpoint + gap / 2, 3),
+        town_ghost_mu=round(args.midpoint - gap / 2, 3),
+        beta=round(beta, 3),
+        tau=round(tau, 3),
+        label="ML fit",
+    )
+    print(f"\nFitted params: MAFIA_GHOST_MU={cfg.mafia_ghost_mu}  "
+          f"TOWN_GHOST_MU={cfg.town_ghost_mu}  beta={cfg.beta}  tau={cfg.tau}")
+    if not args.no_report:
+        print()
+        rerate_with_new_params.report(cfg, args.xlsx)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,50 +33,101 @@ function showToast(msg) {
 	toast._timer = setTimeout(() => toast.classList.add('hidden'), 4000);
 }
 
-async function api(action, data = {}) {
+// Reads go over GET so the browser keeps the response and revalidates it
+// with If-None-Match; the backend answers 304 with no body while
+// nothing has been recorded since.
+async function apiGet(action, params = {}) {
 	if (!SCRIPT_URL) throw new Error('Backend not configured for this site');
-	const resp = await fetch(SCRIPT_URL, {
-		method: 'POST',
-		headers: { 'Content-Type': 'application/json' },
-		body: JSON.stringify({ action, ...data }),
-	});
+	const qs = new URLSearchParams({ action, ...params });
+	const resp = await fetch(`${SCRIPT_URL}?${qs}`, { cache: 'no-cache' });
 	const result = await resp.json();
 	if (result.error) throw new Error(result.error);
 	return result;
 }
 
-async function load() {
-	let rankMap = new Map();
-	try {
-		const players = await api('getPlayers');
-		const byRating = [...players.players].sort((a, b) => b.rating - a.rating);
-		byRating.forEach((p, i) => rankMap.set(p.name, i + 1));
-	} catch (_) {
-		// non-critical; ranks fall back to '-'
-	}
+const PAGE_SIZE = 20;
+
+let rankMap = new Map();
+let nextBefore = null; // before_game_id of the next page; null on the last page
+let fetching = false;
+let observer = null;
 
+async function load() {
+	const container = $('#games-list');
+	let data;
 	try {
-		const data = await api('getMatchHistory');
-		render(data.games || [], rankMap);
+		data = await apiGet('getDashboard', {
+			fields: ['players', 'match_history'],
+			limit: PAGE_SIZE,
+		});
 	} catch (e) {
-		const container = $('#games-list');
 		container.innerHTML = '';
 		showToast('Failed to load match history: ' + e.message);
+		return;
 	}
-}
 
-function render(games, rankMap) {
-	const container = $('#games-list');
-	container.innerHTML = '';
+	const byRating = [...data.players.players].sort((a, b) => b.rating - a.rating);
+	byRating.forEach((p, i) => rankMap.set(p.name, i + 1));
 
-	if (!games.length) {
+	container.innerHTML = '';
+	if (!data.match_history.games.length) {
 		container.innerHTML = '<p style="color: var(--text-muted)">No games yet.</p>';
 		return;
 	}
+	appendPage(data.match_history);
+}
+
+function fetchPage(before) {
+	return apiGet('getMatchHistory', { limit: PAGE_SIZE, before_game_id: before });
+}
 
-	for (const g of games) {
+function appendPage(page) {
+	const container = $('#games-list');
+	for (const g of page.games || []) {
 		container.appendChild(renderGame(g, rankMap));
 	}
+	nextBefore = page.next_before_game_id ?? null;
+	watchSentinel();
+}
+
+// Infinite scroll: a sentinel after the list pulls the next page once it
+// comes within a screen of the viewport.
+function watchSentinel() {
+	let sentinel = $('#games-more');
+	if (nextBefore === null) {
+		sentinel?.remove();
+		observer?.disconnect();
+		return;
+	}
+	if (!sentinel) {
+		sentinel = document.createElement('div');
+		sentinel.id = 'games-more';
+		$('#games-list').after(sentinel);
+	}
+	if (!observer) {
+		observer = new IntersectionObserver(
+			(entries) => {
+				if (entries.some((e) => e.isIntersecting)) loadMore();
+			},
+			{ rootMargin: '100% 0px' }
+		);
+	}
+	// Re-observing reports the current intersection, so a page that leaves
+	// the sentinel on screen pulls the next one straight away.
+	observer.unobserve(sentinel);
+	observer.observe(sentinel);
+}
+
+async function loadMore() {
+	if (fetching || nextBefore === null) return;
+	fetching = true;
+	try {
+		appendPage(await fetchPage(nextBefore));
+	} catch (e) {
+		showToast('Failed to load more games: ' + e.message);
+	} finally {
+		fetching = false;
+	}
 }
 
 function renderGame(g, rankMap) {
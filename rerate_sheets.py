@@ -26,12 +26,15 @@ Usage:
 """
 
 import argparse
-import math
-from dataclasses import dataclass
+import sys
+from pathlib import Path
 
 import pandas as pd
 from openpyxl import load_workbook
-from trueskill import Rating, TrueSkill
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+
+import rating_engine  # noqa: E402  (shared with the Cloud Function backend)
 
 XLSX = "Elo Mafia Rankings.xlsx"
 SOURCE_HISTORY = "MatchHistory"
@@ -46,24 +49,7 @@ HISTORY_COLS = [
 ]
 
 
-@dataclass(frozen=True)
-class Config:
-    key: str
-    label: str
-    mafia_ghost_mu: float
-    town_ghost_mu: float
-    beta: float
-    ghost_sigma: float = 0.8
-
-    @property
-    def env(self):
-        return TrueSkill(tau=0.1, beta=self.beta, draw_probability=0.0)
-
-
-CONFIGS = {
-    "main": Config("main", "Main (25.7/23.85 b5.5)", 25.7, 23.85, 5.5),
-    "ego": Config("ego", "Ego (25.275/24.275 b5.0)", 25.275, 24.275, 5.0),
-}
+CONFIGS = {"main": rating_engine.MAIN, "ego": rating_engine.EGO}
 
 # Games where a player was logged on BOTH teams (data-entry error). Dan
 # confirmed the true alignment; the other row is dropped. Other duplicate
@@ -78,38 +64,7 @@ def display_rating(mu, sigma):
 def compute_trueskill(mafia, town, mafia_won, cfg):
     """Ghost-padded TrueSkill update. `mafia`/`town` are lists of
     {name, mu, sigma}. Returns {name: {mu, sigma}} for real players only."""
-    env = cfg.env
-    n_m, n_t = len(mafia), len(town)
-
-    mafia_dict = {}
-    mu_geo = sigma_geo = 1.0
-    for p in mafia:
-        mafia_dict[p["name"]] = Rating(p["mu"], p["sigma"])
-        mu_geo *= p["mu"]
-        sigma_geo *= p["sigma"]
-    mu_avg = mu_geo ** (1 / n_m)
-    sigma_avg = sigma_geo ** (1 / n_m)
-    for i in range(n_t - n_m):
-        mafia_dict[f"_mafia_avg{i}"] = Rating(mu_avg, sigma_avg)
-    for i in range(n_t):
-        mafia_dict[f"_mafia_ghost{i}"] = Rating(cfg.mafia_ghost_mu, cfg.ghost_sigma)
-
-    town_dict = {}
-    for p in town:
-        town_dict[p["name"]] = Rating(p["mu"], p["sigma"])
-    for i in range(n_t):
-        town_dict[f"_town_ghost{i}"] = Rating(cfg.town_ghost_mu, cfg.ghost_sigma)
-
-    ranks = [0, 1] if mafia_won else [1, 0]
-    rated = env.rate([mafia_dict, town_dict], ranks=ranks)
-    out = {}
-    for p in mafia:
-        r = rated[0][p["name"]]
-        out[p["name"]] = {"mu": r.mu, "sigma": r.sigma}
-    for p in town:
-        r = rated[1][p["name"]]
-        out[p["name"]] = {"mu": r.mu, "sigma": r.sigma}
-    return out
+    return rating_engine.compute_trueskill(mafia, town, mafia_won, cfg)
 
 
 def rerate(mh, cfg):
@@ -222,13 +177,13 @@ def validate_main(mh):
           "live config, not a single static one)")
 
 
-def write_sheets(mh, cfg):
-    hist_rows, ratings = rerate(mh, cfg)
+def write_sheets(mh, key):
+    hist_rows, ratings = rerate(mh, CONFIGS[key])
     stats = build_stats(mh, ratings)
 
     wb = load_workbook(XLSX)
-    hist_name = f"{cfg.key.capitalize()} MatchHistory"
-    stats_name = f"{cfg.key.capitalize()} Stats Summary"
+    hist_name = f"{key.capitalize()} MatchHistory"
+    stats_name = f"{key.capitalize()} Stats Summary"
     for nm in (hist_name, stats_name):
         if nm in wb.sheetnames:
             del wb[nm]
@@ -273,7 +228,7 @@ def main():
     for key in args.configs:
         cfg = CONFIGS[key]
         print(f"Writing sheets for {cfg.label}:")
-        write_sheets(mh, cfg)
+        write_sheets(mh, key)
         print()
 
 
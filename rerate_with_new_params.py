@@ -9,11 +9,14 @@ Reports:
 - Per-player final rating: original vs re-rated
 """
 
-import math
+import sys
 from pathlib import Path
 
 import pandas as pd
-from trueskill import Rating, TrueSkill
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+
+import rating_engine  # noqa: E402  (shared with the Cloud Function backend)
 
 XLSX = Path("Elo Mafia Rankings.xlsx")
 
@@ -21,67 +24,42 @@ PRIOR_MU = 25.0
 PRIOR_SIGMA = 25.0 / 3.0
 
 # NEW ego-mafia params
-MAFIA_GHOST_MU = 25.275
-MAFIA_GHOST_SIGMA = 0.8
-TOWN_GHOST_MU = 24.275
-TOWN_GHOST_SIGMA = 0.8
-
-env = TrueSkill(tau=0.1, beta=5.0, draw_probability=0.0)
+CONFIG = rating_engine.EGO
 
 
 def display_rating(mu, sigma):
     return max(round((mu - 1.5 * sigma) * 68), 0)
 
 
-def rate_game(mafia_players, town_players, mafia_won, ratings):
+def rate_game(mafia_players, town_players, mafia_won, ratings, cfg=CONFIG):
     """Apply one game's rating update in-place on `ratings` (dict name → (mu,sigma))."""
-    mafia_dict = {}
-    mu_geo = 1.0
-    sigma_geo = 1.0
-    for name in mafia_players:
-        mu, sigma = ratings.get(name, (PRIOR_MU, PRIOR_SIGMA))
-        mafia_dict[name] = Rating(mu, sigma)
-        mu_geo *= mu
-        sigma_geo *= sigma
-    n_m = len(mafia_players)
-    mu_avg = mu_geo ** (1 / n_m)
-    sigma_avg = sigma_geo ** (1 / n_m)
-
-    n_t = len(town_players)
-    for i in range(n_t - n_m):
-        mafia_dict[f"_mafia_avg{i}"] = Rating(mu_avg, sigma_avg)
-    for i in range(n_t):
-        mafia_dict[f"_mafia_ghost{i}"] = Rating(MAFIA_GHOST_MU, MAFIA_GHOST_SIGMA)
-
-    town_dict = {}
-    for name in town_players:
-        mu, sigma = ratings.get(name, (PRIOR_MU, PRIOR_SIGMA))
-        town_dict[name] = Rating(mu, sigma)
-    for i in range(n_t):
-        town_dict[f"_town_ghost{i}"] = Rating(TOWN_GHOST_MU, TOWN_GHOST_SIGMA)
-
-    ranks = [0, 1] if mafia_won else [1, 0]
-    rated = env.rate([mafia_dict, town_dict], ranks=ranks)
+    def players(names):
+        out = []
+        for name in names:
+            mu, sigma = ratings.get(name, (PRIOR_MU, PRIOR_SIGMA))
+            out.append({"name": name, "mu": mu, "sigma": sigma})
+        return out
+
+    rated = rating_engine.rate_teams(
+        players(mafia_players), players(town_players), mafia_won, cfg
+    )
 
     deltas = {}
-    for name in mafia_players:
-        old = display_rating(*ratings.get(name, (PRIOR_MU, PRIOR_SIGMA)))
-        r = rated[0][name]
-        ratings[name] = (r.mu, r.sigma)
-        deltas[name] = display_rating(r.mu, r.sigma) - old
-    for name in town_players:
-        old = display_rating(*ratings.get(name, (PRIOR_MU, PRIOR_SIGMA)))
-        r = rated[1][name]
-        ratings[name] = (r.mu, r.sigma)
-        deltas[name] = display_rating(r.mu, r.sigma) - old
+    for names, team in zip((mafia_players, town_players), rated):
+        for name in names:
+            old = display_rating(*ratings.get(name, (PRIOR_MU, PRIOR_SIGMA)))
+            r = team[name]
+            ratings[name] = (r["mu"], r["sigma"])
+            deltas[name] = display_rating(r["mu"], r["sigma"]) - old
     return deltas
 
 
-def main():
-    mh = pd.read_excel(XLSX, sheet_name="MatchHistory")
+def report(cfg=CONFIG, xlsx=XLSX):
+    """Re-rate every MatchHistory game under cfg and print the comparison."""
+    mh = pd.read_excel(xlsx, sheet_name="MatchHistory")
     mh = mh[mh.Result.isin(["Win", "Loss"])].copy()
 
-    ss = pd.read_excel(XLSX, sheet_name="Stats Summary")
+    ss = pd.read_excel(xlsx, sheet_name="Stats Summary")
     orig = {row["Name"]: row for _, row in ss.iterrows()}
 
     ratings = {}
@@ -98,7 +76,7 @@ def main():
         mafia_won = (g.query("Alignment == 'Mafia'").Result == "Win").any()
         if mafia_won:
             n_mafia_wins += 1
-        deltas = rate_game(mafia, town, mafia_won, ratings)
+        deltas = rate_game(mafia, town, mafia_won, ratings, cfg)
         for name in mafia:
             d = deltas[name]
             if mafia_won:
@@ -118,9 +96,9 @@ def main():
 
     n_games = len(gids)
     print("=" * 90)
-    print(f"Re-rating {n_games} games from Elo Mafia Rankings.xlsx")
-    print(f"NEW params: ghosts {MAFIA_GHOST_MU} / {TOWN_GHOST_MU}, "
-          f"beta={env.beta}")
+    print(f"Re-rating {n_games} games from {Path(xlsx).name}")
+    print(f"NEW params: ghosts {cfg.mafia_ghost_mu} / {cfg.town_ghost_mu}, "
+          f"beta={cfg.beta}, tau={cfg.tau}")
     print("=" * 90)
     print(f"\nMafia winrate (historical): {n_mafia_wins / n_games:.1%} "
           f"({n_mafia_wins}/{n_games})  — unchanged, this is historical outcome")
@@ -181,5 +159,9 @@ def main():
         print(f"{name:<14}{d:>+7d}  {mg:>6d}{tg:>6d}{mwp:>9.1%}")
 
 
+def main():
+    report(CONFIG)
+
+
 if __name__ == "__main__":
     main()
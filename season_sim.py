@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""Batched Monte Carlo season simulator.
+
+Runs every simulated season in lockstep: hidden true skill, mu and sigma for
+all runs live in (runs, players) arrays, and each step samples one roster per
+run, draws every run's winner and rates every run's game with a single
+`rating_engine.rate_arrays` call. simulate_player_pool.py and
+stat_test_vs_real.py build their reports on top of `simulate_seasons`.
+
+Per-season semantics match the old one-season-at-a-time loop:
+- roster: ROSTER_SIZE players drawn without replacement with probability
+  proportional to participation weight (Efraimidis-Spirakis keys), shuffled,
+  first NUM_MAFIA are mafia and the next NUM_TOWN are town (rest sit out)
+- winner: Bernoulli of the ghost-padded win probability over true skills
+- rating: the shared closed-form TrueSkill update, ghosts included
+
+run_sweep spreads a configs × runs grid over a ProcessPoolExecutor in
+fixed-size chunks, each with its own SeedSequence stream, so results are
+bit-identical whatever the worker count.
+
+Usage: python season_sim.py [--runs N] [--games N] [--seed N] [--workers N]
+"""
+
+import argparse
+import dataclasses
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+
+import rating_engine  # noqa: E402  (shared with the Cloud Function backend)
+
+XLSX = "Elo Mafia Rankings.xlsx"
+
+TRUE_SKILL_MEAN = 25.0
+TRUE_SKILL_STD = 25.0 / 3.0
+
+# Near-zero sigma for the "true skill" teams used to sample winners.
+TRUE_SKILL_EPS = 1e-6
+
+# Runs per sweep task. Fixed (not derived from --workers) so every task, and
+# therefore every seed stream, is the same whatever the worker count.
+CHUNK_RUNS = 100
+
+METRICS = ["mafia_winrate", "maf_w_d", "maf_l_d", "twn_w_d", "twn_l_d",
+           "maf_net", "twn_net", "spearman"]
+
+
+def load_real_weights(xlsx=XLSX):
+    """Per-player participation weights (real `Total Games`).
+
+    Falls back to counting MatchHistory rows when the Stats Summary formulas
+    were saved without cached values (pandas then reads them as NaN).
+    """
+    ss = pd.read_excel(xlsx, sheet_name="Stats Summary")
+    weights = ss["Total Games"].dropna().to_numpy(dtype=float)
+    if len(weights):
+        return weights
+    mh = pd.read_excel(xlsx, sheet_name="MatchHistory")
+    return mh.groupby("Player").size().to_numpy(dtype=float)
+
+
+def display_rating(mu, sigma):
+    """Vectorized display rating, same rounding as the sheet (half-to-even)."""
+    return np.maximum(np.round((mu - 1.5 * sigma) * 68), 0)
+
+
+def mafia_win_probability(mafia_true, town_true, cfg):
+    """P(mafia wins) per run from true skills, ghost padding included.
+
+    The shared rating_engine.predict_mafia_win over near-certain skills:
+    every real seat gets sigma TRUE_SKILL_EPS and no skill drift (tau).
+    """
+    return rating_engine.predict_mafia_win(
+        mafia_true, np.full(mafia_true.shape, TRUE_SKILL_EPS),
+        town_true, np.full(town_true.shape, TRUE_SKILL_EPS),
+        dataclasses.replace(cfg, tau=0.0),
+    )
+
+
+def spearman_rows(a, b):
+    """Spearman rho of a[i] vs b[i] for every row i (average-rank ties)."""
+    ra = rankdata(a, axis=1)
+    rb = rankdata(b, axis=1)
+    ra -= ra.mean(axis=1, keepdims=True)
+    rb -= rb.mean(axis=1, keepdims=True)
+    return (ra * rb).sum(axis=1) / np.sqrt(
+        (ra * ra).sum(axis=1) * (rb * rb).sum(axis=1)
+    )
+
+
+def simulate_seasons(weights, cfg, *, num_runs, num_games, snapshot_at=None,
+                     roster_size=13, num_mafia=3, num_town=10, seed=0):
+    """Simulate num_runs independent seasons of num_games games under cfg.
+
+    Returns {game: {metric: array(num_runs)}} for every game in snapshot_at
+    (default: the final game). Metrics are those of METRICS; the *_d deltas
+    are mean display-rating changes per player-row, *_net over all rows.
+    "unrated" counts games skipped because the mafia geometric mean was
+    undefined (some mafia mu <= 0); unrated games still count their deltas
+    as 0 and their winner toward mafia_winrate.
+    """
+    snapshot_at = sorted(snapshot_at or [num_games])
+    rng = np.random.default_rng(seed)
+    weights = np.asarray(weights, dtype=float)
+    n = len(weights)
+    runs = np.arange(num_runs)[:, None]
+
+    true_mu = rng.normal(TRUE_SKILL_MEAN, TRUE_SKILL_STD, (num_runs, n))
+    true_mu = true_mu.clip(min=1.0)
+    mu = np.full((num_runs, n), rating_engine.PRIOR_MU)
+    sigma = np.full((num_runs, n), rating_engine.PRIOR_SIGMA)
+    inv_w = 1.0 / weights
+
+    mafia_wins = np.zeros(num_runs)
+    unrated = np.zeros(num_runs)
+    sums = {k: np.zeros(num_runs) for k in ("maf_w", "maf_l", "twn_w", "twn_l")}
+    counts = {k: np.zeros(num_runs) for k in sums}
+
+    snaps = {}
+    for g in range(1, num_games + 1):
+        # Weighted sampling without replacement, then a random seat order.
+        keys = rng.random((num_runs, n)) ** inv_w
+        roster = np.argpartition(-keys, roster_size - 1, axis=1)[:, :roster_size]
+        order = rng.random((num_runs, roster_size)).argsort(axis=1)
+        roster = np.take_along_axis(roster, order, axis=1)
+        mafia = roster[:, :num_mafia]
+        town = roster[:, num_mafia:num_mafia + num_town]
+
+        p_mafia = mafia_win_probability(true_mu[runs, mafia],
+                                        true_mu[runs, town], cfg)
+        mafia_won = rng.random(num_runs) < p_mafia
+
+        m_mu, m_sigma = mu[runs, mafia], sigma[runs, mafia]
+        t_mu, t_sigma = mu[runs, town], sigma[runs, town]
+        # The filler's geometric mean is undefined once a mafia product goes
+        # non-positive (the scalar path crashed there); leave those games
+        # unrated and count them instead of aborting every run.
+        ok = np.prod(m_mu, axis=1) > 0
+        new_m_mu, new_m_sigma = m_mu.copy(), m_sigma.copy()
+        new_t_mu, new_t_sigma = t_mu.copy(), t_sigma.copy()
+        (new_m_mu[ok], new_m_sigma[ok],
+         new_t_mu[ok], new_t_sigma[ok]) = rating_engine.rate_arrays(
+            m_mu[ok], m_sigma[ok], t_mu[ok], t_sigma[ok], mafia_won[ok], cfg
+        )
+        unrated += ~ok
+        maf_d = (display_rating(new_m_mu, new_m_sigma)
+                 - display_rating(m_mu, m_sigma)).sum(axis=1)
+        twn_d = (display_rating(new_t_mu, new_t_sigma)
+                 - display_rating(t_mu, t_sigma)).sum(axis=1)
+        mu[runs, mafia], sigma[runs, mafia] = new_m_mu, new_m_sigma
+        mu[runs, town], sigma[runs, town] = new_t_mu, new_t_sigma
+
+        mafia_wins += mafia_won
+        won, lost = mafia_won, ~mafia_won
+        sums["maf_w"] += np.where(won, maf_d, 0)
+        sums["maf_l"] += np.where(lost, maf_d, 0)
+        sums["twn_w"] += np.where(lost, twn_d, 0)
+        sums["twn_l"] += np.where(won, twn_d, 0)
+        counts["maf_w"] += won * num_mafia
+        counts["maf_l"] += lost * num_mafia
+        counts["twn_w"] += lost * num_town
+        counts["twn_l"] += won * num_town
+
+        if g in snapshot_at:
+            n_maf = counts["maf_w"] + counts["maf_l"]
+            n_twn = counts["twn_w"] + counts["twn_l"]
+            snaps[g] = {
+                "mafia_winrate": mafia_wins / g,
+                "maf_w_d": sums["maf_w"] / np.maximum(counts["maf_w"], 1),
+                "maf_l_d": sums["maf_l"] / np.maximum(counts["maf_l"], 1),
+                "twn_w_d": sums["twn_w"] / np.maximum(counts["twn_w"], 1),
+                "twn_l_d": sums["twn_l"] / np.maximum(counts["twn_l"], 1),
+                "maf_net": (sums["maf_w"] + sums["maf_l"]) / np.maximum(n_maf, 1),
+                "twn_net": (sums["twn_w"] + sums["twn_l"]) / np.maximum(n_twn, 1),
+                "spearman": spearman_rows(display_rating(mu, sigma), true_mu),
+                "unrated": unrated.copy(),
+            }
+    return snaps
+
+
+def _sweep_tasks(configs, num_runs, seed):
+    """(config index, chunk index, runs, SeedSequence) for the whole grid.
+
+    Chunk k draws from SeedSequence(seed, spawn_key=(k,)) under every config,
+    so configs are compared on common random numbers, as the old
+    SEED + i loop did.
+    """
+    for ci in range(len(configs)):
+        for k, start in enumerate(range(0, num_runs, CHUNK_RUNS)):
+            runs = min(CHUNK_RUNS, num_runs - start)
+            yield ci, k, runs, np.random.SeedSequence(seed, spawn_key=(k,))
+
+
+def iter_sweep(weights, configs, *, num_runs, workers=None, seed=0, **kwargs):
+    """Simulate every config in chunks of CHUNK_RUNS runs across processes.
+
+    Yields (config index, chunk index, snaps) as chunks finish, in completion
+    order; kwargs go to simulate_seasons. workers=1 runs in-process.
+    """
+    tasks = list(_sweep_tasks(configs, num_runs, seed))
+    if workers == 1:
+        for ci, k, runs, ss in tasks:
+            yield ci, k, simulate_seasons(weights, configs[ci], num_runs=runs,
+                                          seed=ss, **kwargs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(simulate_seasons, weights, configs[ci], num_runs=runs,
+                        seed=ss, **kwargs): (ci, k)
+            for ci, k, runs, ss in tasks
+        }
+        for fut in as_completed(futures):
+            ci, k = futures[fut]
+            yield ci, k, fut.result()
+
+
+def run_sweep(weights, configs, *, num_runs, workers=None, seed=0,
+              progress=None, **kwargs):
+    """All configs × num_runs seasons: [{game: {metric: array(num_runs)}}].
+
+    One entry per config, runs in chunk order, so the arrays are
+    bit-identical for any worker count. progress(cfg, done, total) is called
+    as each chunk comes back.
+    """
+    chunks = [{} for _ in configs]
+    n_chunks = -(-num_runs // CHUNK_RUNS)
+    for ci, k, snaps in iter_sweep(weights, configs, num_runs=num_runs,
+                                   workers=workers, seed=seed, **kwargs):
+        chunks[ci][k] = snaps
+        if progress:
+            progress(configs[ci], len(chunks[ci]), n_chunks)
+    return [
+        {
+            g: {m: np.concatenate([c[k][g][m] for k in range(n_chunks)])
+                for m in c[0][g]}
+            for g in c[0]
+        }
+        for c in chunks
+    ]
+
+
+def print_progress(cfg, done, total):
+    """run_sweep progress callback: one stderr line per finished chunk."""
+    print(f"  [{cfg.label}] {done}/{total} chunks", file=sys.stderr, flush=True)
+
+
+def add_sweep_args(ap):
+    ap.add_argument("--workers", type=int, default=os.cpu_count(),
+                    help="worker processes (default: all cores; 1 = serial)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=1000)
+    ap.add_argument("--games", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=42)
+    add_sweep_args(ap)
+    args = ap.parse_args()
+
+    weights = load_real_weights()
+    configs = [rating_engine.MAIN, rating_engine.EGO]
+    print(f"{args.runs} runs × {args.games} games, pool of {len(weights)}, "
+          f"{args.workers} workers\n")
+    t0 = time.perf_counter()
+    results = run_sweep(weights, configs, num_runs=args.runs,
+                        num_games=args.games, workers=args.workers,
+                        seed=args.seed, progress=print_progress)
+    dt = time.perf_counter() - t0
+    print(f"{'Config':<28}{'MafWR':>8}{'MafW Δ':>8}{'MafL Δ':>8}"
+          f"{'TwnW Δ':>8}{'TwnL Δ':>8}{'Spear':>7}")
+    print("-" * 75)
+    for cfg, snaps in zip(configs, results):
+        m = snaps[args.games]
+        print(f"{cfg.label:<28}{m['mafia_winrate'].mean():>8.1%}"
+              f"{m['maf_w_d'].mean():>+8.2f}{m['maf_l_d'].mean():>+8.2f}"
+              f"{m['twn_w_d'].mean():>+8.2f}{m['twn_l_d'].mean():>+8.2f}"
+              f"{m['spearman'].mean():>7.3f}")
+    print(f"\n{dt:.1f}s total")
+
+
+if __name__ == "__main__":
+    main()
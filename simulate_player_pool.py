@@ -1,9 +1,10 @@
 #!/usr/bin/env python
-"""Compare two ghost-μ TrueSkill configurations across 100 simulated seasons each.
+"""Compare ghost-μ TrueSkill configurations across 100 simulated seasons each.
 
 Uses the empirical participation distribution from `Elo Mafia Rankings.xlsx`
 (86 players, real `Total Games` as per-game inclusion weights). For each
-config, runs 100 independent simulations of 500 games, samples each game's
+config, runs 100 independent simulations of 500 games (in lockstep via
+season_sim, chunks spread over --workers processes), samples each game's
 winner from the configured TrueSkill ghost-padded win-probability over hidden
 true skills, applies the standard rating update, and snapshots metrics at
 100 and 500 games. Prints distributional statistics (mean / std / quartile
@@ -11,15 +12,16 @@ band / fraction matching real-data 50% target) side-by-side so we can see
 which config produces a more realistic and fairer simulation.
 """
 
-import itertools
-import math
-import random
-from dataclasses import dataclass
+import argparse
+import sys
+from pathlib import Path
 
 import numpy as np
-import pandas as pd
-from scipy.stats import spearmanr
-from trueskill import Rating, TrueSkill
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+
+import rating_engine  # noqa: E402  (shared with the Cloud Function backend)
+import season_sim  # noqa: E402
 
 XLSX = "Elo Mafia Rankings.xlsx"
 
@@ -34,26 +36,16 @@ NUM_GAMES = 500
 SNAPSHOT_AT = [100, 500]  # game-count snapshots to report
 NUM_RUNS = 100
 
-PRIOR_MU = 25.0
-PRIOR_SIGMA = 25.0 / 3.0
-TRUE_SKILL_MEAN = 25.0
-TRUE_SKILL_STD = 25.0 / 3.0
+TRUE_SKILL_MEAN = season_sim.TRUE_SKILL_MEAN
+TRUE_SKILL_STD = season_sim.TRUE_SKILL_STD
 
 SEED = 42
 
 
-@dataclass
-class Config:
-    label: str
-    env: TrueSkill
-    mafia_ghost_mu: float
-    mafia_ghost_sigma: float
-    town_ghost_mu: float
-    town_ghost_sigma: float
+Config = rating_engine.Config
 
-
-# Shared env (matches ego_mafia/process_games.py beta=5.0)
-_ENV = TrueSkill(tau=0.1, beta=5.0, draw_probability=0.0)
+# Shared beta (matches ego_mafia/process_games.py beta=5.0)
+_BETA = 5.0
 
 
 def _mk(label, gap):
@@ -61,7 +53,7 @@ def _mk(label, gap):
     mid = 24.775
     return Config(
         label=label,
-        env=_ENV,
+        beta=_BETA,
         mafia_ghost_mu=mid + gap / 2,
         mafia_ghost_sigma=0.8,
         town_ghost_mu=mid - gap / 2,
@@ -73,7 +65,7 @@ def _mk(label, gap):
 CONFIGS = [
     Config(  # current NEW exactly as shipped
         label="NEW baseline (gap 0.37 — 24.96/24.59)",
-        env=_ENV,
+        beta=_BETA,
         mafia_ghost_mu=24.96, mafia_ghost_sigma=0.8,
         town_ghost_mu=24.59, town_ghost_sigma=0.8,
     ),
@@ -83,154 +75,25 @@ CONFIGS = [
 ]
 
 
-@dataclass
-class Player:
-    name: str
-    true_mu: float
-    weight: float
-    mu: float = PRIOR_MU
-    sigma: float = PRIOR_SIGMA
-
-
-def display_rating(mu, sigma):
-    return max(round((mu - 1.5 * sigma) * 68), 0)
-
-
-def win_probability(team1, team2, env):
-    delta_mu = sum(r.mu for r in team1) - sum(r.mu for r in team2)
-    sum_sigma = sum(r.sigma ** 2 for r in itertools.chain(team1, team2))
-    size = len(team1) + len(team2)
-    denom = math.sqrt(size * (env.beta * env.beta) + sum_sigma)
-    return env.cdf(delta_mu / denom)
-
-
-def sample_mafia_win(mafia, town, cfg, rng):
-    eps = 1e-6
-    mafia_team = [Rating(p.true_mu, eps) for p in mafia]
-    town_team = [Rating(p.true_mu, eps) for p in town]
-    mu_geo = math.prod(p.true_mu for p in mafia) ** (1 / len(mafia))
-    for _ in range(len(town) - len(mafia)):
-        mafia_team.append(Rating(mu_geo, eps))
-    for _ in range(len(town)):
-        mafia_team.append(Rating(cfg.mafia_ghost_mu, cfg.mafia_ghost_sigma))
-        town_team.append(Rating(cfg.town_ghost_mu, cfg.town_ghost_sigma))
-    return rng.random() < win_probability(mafia_team, town_team, cfg.env)
-
-
-def weighted_sample(players, k, rng):
-    keys = [(rng.random() ** (1.0 / p.weight), p) for p in players]
-    keys.sort(key=lambda kv: kv[0], reverse=True)
-    return [p for _, p in keys[:k]]
-
-
-def rate_game(mafia, town, mafia_won, cfg):
-    mafia_dict = {p.name: Rating(p.mu, p.sigma) for p in mafia}
-    town_dict = {p.name: Rating(p.mu, p.sigma) for p in town}
-    for i in range(len(town)):
-        town_dict[f"town_ghost{i}"] = Rating(cfg.town_ghost_mu, cfg.town_ghost_sigma)
-    mu_geo = math.prod(p.mu for p in mafia) ** (1 / len(mafia))
-    sigma_geo = math.prod(p.sigma for p in mafia) ** (1 / len(mafia))
-    for i in range(len(town) - len(mafia)):
-        mafia_dict[f"mafia_avg{i}"] = Rating(mu_geo, sigma_geo)
-    for i in range(len(town)):
-        mafia_dict[f"mafia_ghost{i}"] = Rating(cfg.mafia_ghost_mu, cfg.mafia_ghost_sigma)
-
-    ranks = [0, 1] if mafia_won else [1, 0]
-    rated = cfg.env.rate([mafia_dict, town_dict], ranks=ranks)
-
-    deltas = {}
-    for p in mafia:
-        old_r = display_rating(p.mu, p.sigma)
-        new = rated[0][p.name]
-        p.mu, p.sigma = new.mu, new.sigma
-        deltas[p.name] = display_rating(p.mu, p.sigma) - old_r
-    for p in town:
-        old_r = display_rating(p.mu, p.sigma)
-        new = rated[1][p.name]
-        p.mu, p.sigma = new.mu, new.sigma
-        deltas[p.name] = display_rating(p.mu, p.sigma) - old_r
-    return deltas
+def load_real_weights():
+    return season_sim.load_real_weights(XLSX)
 
 
-def load_real_weights():
-    ss = pd.read_excel(XLSX, sheet_name="Stats Summary")
-    return ss["Total Games"].to_numpy(dtype=float)
-
-
-def run_simulation(seed, weights, cfg):
-    rng = random.Random(seed)
-    np_rng = np.random.default_rng(seed)
-
-    n = len(weights)
-    true_skills = np_rng.normal(TRUE_SKILL_MEAN, TRUE_SKILL_STD, n).clip(min=1.0)
-    players = [
-        Player(name=f"P{i+1:03d}", true_mu=float(true_skills[i]),
-               weight=float(weights[i]))
-        for i in range(n)
-    ]
-
-    snaps = {}
-    mafia_win_count = 0
-    sum_maf_d = sum_maf_w_d = sum_maf_l_d = 0.0
-    sum_twn_d = sum_twn_w_d = sum_twn_l_d = 0.0
-    n_maf_rows = n_maf_w = n_maf_l = 0
-    n_twn_rows = n_twn_w = n_twn_l = 0
-
-    for g in range(1, NUM_GAMES + 1):
-        roster = weighted_sample(players, ROSTER_SIZE, rng)
-        rng.shuffle(roster)
-        mafia = roster[:NUM_MAFIA]
-        town = roster[NUM_MAFIA:NUM_MAFIA + NUM_TOWN]
-        mafia_won = sample_mafia_win(mafia, town, cfg, rng)
-        deltas = rate_game(mafia, town, mafia_won, cfg)
-
-        for p in mafia:
-            d = deltas[p.name]
-            sum_maf_d += d
-            n_maf_rows += 1
-            if mafia_won:
-                sum_maf_w_d += d
-                n_maf_w += 1
-            else:
-                sum_maf_l_d += d
-                n_maf_l += 1
-        for p in town:
-            d = deltas[p.name]
-            sum_twn_d += d
-            n_twn_rows += 1
-            if not mafia_won:
-                sum_twn_w_d += d
-                n_twn_w += 1
-            else:
-                sum_twn_l_d += d
-                n_twn_l += 1
-        if mafia_won:
-            mafia_win_count += 1
-
-        if g in SNAPSHOT_AT:
-            true_mus = np.array([p.true_mu for p in players])
-            disp = np.array([display_rating(p.mu, p.sigma) for p in players])
-            rho, _ = spearmanr(disp, true_mus)
-            snaps[g] = {
-                "mafia_winrate": mafia_win_count / g,
-                "maf_w_d": sum_maf_w_d / max(n_maf_w, 1),
-                "maf_l_d": sum_maf_l_d / max(n_maf_l, 1),
-                "twn_w_d": sum_twn_w_d / max(n_twn_w, 1),
-                "twn_l_d": sum_twn_l_d / max(n_twn_l, 1),
-                "maf_net": sum_maf_d / max(n_maf_rows, 1),
-                "twn_net": sum_twn_d / max(n_twn_rows, 1),
-                "spearman": float(rho),
-            }
-    return snaps
+def run_sweep(weights, configs, workers=None):
+    """NUM_RUNS seasons per config across worker processes, one snaps each."""
+    return season_sim.run_sweep(
+        weights, configs, num_runs=NUM_RUNS, workers=workers, seed=SEED,
+        num_games=NUM_GAMES, snapshot_at=SNAPSHOT_AT, roster_size=ROSTER_SIZE,
+        num_mafia=NUM_MAFIA, num_town=NUM_TOWN,
+        progress=season_sim.print_progress,
+    )
 
 
 def aggregate_runs(all_snaps, game):
     """Compute distributional stats for one game-snapshot across all runs."""
     metrics = {}
-    keys = ["mafia_winrate", "maf_w_d", "maf_l_d", "twn_w_d", "twn_l_d",
-            "maf_net", "twn_net", "spearman"]
-    for k in keys:
-        vals = np.array([s[game][k] for s in all_snaps])
+    for k in season_sim.METRICS:
+        vals = all_snaps[game][k]
         metrics[k] = {
             "mean": float(vals.mean()),
             "std": float(vals.std()),
@@ -244,7 +107,7 @@ def aggregate_runs(all_snaps, game):
 
 
 def fraction_in_band(all_snaps, game, key, low, high):
-    vals = np.array([s[game][key] for s in all_snaps])
+    vals = all_snaps[game][key]
     return float(((vals >= low) & (vals <= high)).mean())
 
 
@@ -299,6 +162,10 @@ def print_config_stats(label, all_snaps):
 
 
 def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    season_sim.add_sweep_args(ap)
+    args = ap.parse_args()
+
     weights = load_real_weights()
     print("=" * 86)
     print(f"Ghost-μ Configuration Comparison  ({NUM_RUNS} runs each)")
@@ -312,11 +179,7 @@ def main():
           f"MafNet=-12.54, TwnNet=+22.35 (rated under OLD params)")
 
     summary_rows = []
-    for cfg in CONFIGS:
-        all_snaps = []
-        for i in range(NUM_RUNS):
-            snaps = run_simulation(SEED + i, weights, cfg)
-            all_snaps.append(snaps)
+    for cfg, all_snaps in zip(CONFIGS, run_sweep(weights, CONFIGS, args.workers)):
         print_config_stats(cfg.label, all_snaps)
         m500 = aggregate_runs(all_snaps, 500)
         in_band = fraction_in_band(all_snaps, 500, "mafia_winrate", 0.45, 0.55)
@@ -7,7 +7,8 @@ Setup:
 - Per-game roster: 3 mafia + 10 town drawn without replacement, weighted by
   the empirical `Total Games` distribution from Elo Mafia Rankings.xlsx
 - Winner sampled from the configured TrueSkill ghost-padded win probability
-- 1000 independent 117-game seasons per config
+- 1000 independent 117-game seasons per config, simulated in lockstep by
+  season_sim and spread over --workers processes
 
 For each config we compute:
 - Sim distribution of mafia winrate (mean, std, percentiles)
@@ -17,15 +18,18 @@ For each config we compute:
 - One-sample binomial test (54 of 108) against the sim's mean probability
 """
 
-import itertools
-import math
-import random
-from dataclasses import dataclass
+import argparse
+import sys
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
 from scipy import stats
-from trueskill import Rating, TrueSkill
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+
+import rating_engine  # noqa: E402  (shared with the Cloud Function backend)
+import season_sim  # noqa: E402
 
 XLSX = "Elo Mafia Rankings.xlsx"
 
@@ -36,120 +40,41 @@ NUM_GAMES = 117        # exactly match real-data game count (current season)
 NUM_RUNS = 1000
 SEED = 42
 
-PRIOR_MU = 25.0
-PRIOR_SIGMA = 25.0 / 3.0
-TRUE_SKILL_MEAN = 25.0
-TRUE_SKILL_STD = 25.0 / 3.0
+TRUE_SKILL_MEAN = season_sim.TRUE_SKILL_MEAN
+TRUE_SKILL_STD = season_sim.TRUE_SKILL_STD
 
 REAL_MAFIA_WINS = 60
 REAL_MAFIA_WINRATE = REAL_MAFIA_WINS / NUM_GAMES  # 0.513
 
 
-@dataclass
-class Config:
-    label: str
-    env: TrueSkill
-    mafia_ghost_mu: float
-    mafia_ghost_sigma: float
-    town_ghost_mu: float
-    town_ghost_sigma: float
+Config = rating_engine.Config
 
 
 CONFIGS = [
     Config(
         label="OLD (gap 1.85, β=5.5)",
-        env=TrueSkill(tau=0.1, beta=5.5, draw_probability=0.0),
+        beta=5.5,
         mafia_ghost_mu=25.7, mafia_ghost_sigma=0.8,
         town_ghost_mu=23.85, town_ghost_sigma=0.8,
     ),
     Config(
         label="NEW (gap 1.00, β=5.0)",
-        env=TrueSkill(tau=0.1, beta=5.0, draw_probability=0.0),
+        beta=5.0,
         mafia_ghost_mu=25.275, mafia_ghost_sigma=0.8,
         town_ghost_mu=24.275, town_ghost_sigma=0.8,
     ),
 ]
 
 
-@dataclass
-class Player:
-    name: str
-    true_mu: float
-    weight: float
-    mu: float = PRIOR_MU
-    sigma: float = PRIOR_SIGMA
-
-
-def win_probability(team1, team2, env):
-    delta_mu = sum(r.mu for r in team1) - sum(r.mu for r in team2)
-    sum_sigma = sum(r.sigma ** 2 for r in itertools.chain(team1, team2))
-    size = len(team1) + len(team2)
-    denom = math.sqrt(size * (env.beta * env.beta) + sum_sigma)
-    return env.cdf(delta_mu / denom)
-
-
-def sample_mafia_win(mafia, town, cfg, rng):
-    eps = 1e-6
-    mafia_team = [Rating(p.true_mu, eps) for p in mafia]
-    town_team = [Rating(p.true_mu, eps) for p in town]
-    mu_geo = math.prod(p.true_mu for p in mafia) ** (1 / len(mafia))
-    for _ in range(len(town) - len(mafia)):
-        mafia_team.append(Rating(mu_geo, eps))
-    for _ in range(len(town)):
-        mafia_team.append(Rating(cfg.mafia_ghost_mu, cfg.mafia_ghost_sigma))
-        town_team.append(Rating(cfg.town_ghost_mu, cfg.town_ghost_sigma))
-    return rng.random() < win_probability(mafia_team, town_team, cfg.env)
-
-
-def weighted_sample(players, k, rng):
-    keys = [(rng.random() ** (1.0 / p.weight), p) for p in players]
-    keys.sort(key=lambda kv: kv[0], reverse=True)
-    return [p for _, p in keys[:k]]
-
-
-def rate_game(mafia, town, mafia_won, cfg):
-    mafia_dict = {p.name: Rating(p.mu, p.sigma) for p in mafia}
-    town_dict = {p.name: Rating(p.mu, p.sigma) for p in town}
-    for i in range(len(town)):
-        town_dict[f"town_ghost{i}"] = Rating(cfg.town_ghost_mu, cfg.town_ghost_sigma)
-    mu_geo = math.prod(p.mu for p in mafia) ** (1 / len(mafia))
-    sigma_geo = math.prod(p.sigma for p in mafia) ** (1 / len(mafia))
-    for i in range(len(town) - len(mafia)):
-        mafia_dict[f"mafia_avg{i}"] = Rating(mu_geo, sigma_geo)
-    for i in range(len(town)):
-        mafia_dict[f"mafia_ghost{i}"] = Rating(cfg.mafia_ghost_mu, cfg.mafia_ghost_sigma)
-    ranks = [0, 1] if mafia_won else [1, 0]
-    rated = cfg.env.rate([mafia_dict, town_dict], ranks=ranks)
-    for p in mafia:
-        new = rated[0][p.name]
-        p.mu, p.sigma = new.mu, new.sigma
-    for p in town:
-        new = rated[1][p.name]
-        p.mu, p.sigma = new.mu, new.sigma
-
-
-def run_one_season(seed, weights, cfg):
-    """Run one 108-game season under cfg. Returns mafia win count."""
-    rng = random.Random(seed)
-    np_rng = np.random.default_rng(seed)
-    n = len(weights)
-    true_skills = np_rng.normal(TRUE_SKILL_MEAN, TRUE_SKILL_STD, n).clip(min=1.0)
-    players = [
-        Player(name=f"P{i+1:03d}", true_mu=float(true_skills[i]),
-               weight=float(weights[i]))
-        for i in range(n)
-    ]
-    mafia_wins = 0
-    for _ in range(NUM_GAMES):
-        roster = weighted_sample(players, ROSTER_SIZE, rng)
-        rng.shuffle(roster)
-        mafia = roster[:NUM_MAFIA]
-        town = roster[NUM_MAFIA:NUM_MAFIA + NUM_TOWN]
-        mafia_won = sample_mafia_win(mafia, town, cfg, rng)
-        rate_game(mafia, town, mafia_won, cfg)
-        if mafia_won:
-            mafia_wins += 1
-    return mafia_wins
+def run_seasons(weights, configs, workers=None):
+    """Run NUM_RUNS seasons per config. Returns mafia win counts per config."""
+    results = season_sim.run_sweep(
+        weights, configs, num_runs=NUM_RUNS, workers=workers, seed=SEED,
+        num_games=NUM_GAMES, roster_size=ROSTER_SIZE, num_mafia=NUM_MAFIA,
+        num_town=NUM_TOWN, progress=season_sim.print_progress,
+    )
+    return [np.rint(snaps[NUM_GAMES]["mafia_winrate"] * NUM_GAMES)
+            for snaps in results]
 
 
 def analyze(label, sim_wins, cfg):
@@ -219,14 +144,17 @@ def real_anchor():
 
 
 def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    season_sim.add_sweep_args(ap)
+    args = ap.parse_args()
+
     live_wins, live_games = real_anchor()
     if (live_wins, live_games) != (REAL_MAFIA_WINS, NUM_GAMES):
         print(f"WARNING: hardcoded anchor ({REAL_MAFIA_WINS}/{NUM_GAMES}) "
               f"!= current MatchHistory ({live_wins}/{live_games}). "
               f"Update REAL_MAFIA_WINS / NUM_GAMES.")
 
-    ss = pd.read_excel(XLSX, sheet_name="Stats Summary")
-    weights = ss["Total Games"].dropna().to_numpy(dtype=float)
+    weights = season_sim.load_real_weights(XLSX)
     print(f"Pool: {len(weights)} players, true skill ~ N({TRUE_SKILL_MEAN}, "
           f"{TRUE_SKILL_STD:.3f})")
     print(f"Participation: real `Total Games` (max={weights.max():.0f}, "
@@ -235,10 +163,7 @@ def main():
           f"({REAL_MAFIA_WINRATE:.1%})")
 
     results = {}
-    for cfg in CONFIGS:
-        wins = np.array([
-            run_one_season(SEED + i, weights, cfg) for i in range(NUM_RUNS)
-        ])
+    for cfg, wins in zip(CONFIGS, run_seasons(weights, CONFIGS, args.workers)):
         results[cfg.label] = analyze(cfg.label, wins, cfg)
 
     print("\n" + "=" * 88)
@@ -7,6 +7,12 @@ const SCRIPT_URL = (typeof window !== 'undefined' && window.SCRIPT_URL !== undef
 let statsData = null;
 let currentSort = { key: 'rating', desc: true };
 
+// Player name -> Promise of their games. The top of the leaderboard is
+// fetched in one getPlayerHistories call right after the stats load, so
+// most detail views open without a round trip.
+const historyCache = new Map();
+const PREFETCH_HISTORIES = 15;
+
 const $ = (sel) => document.querySelector(sel);
 const $$ = (sel) => document.querySelectorAll(sel);
 
@@ -38,18 +44,50 @@ async function api(action, data = {}) {
 	return result;
 }
 
+// Reads go over GET so the browser keeps the response and revalidates it
+// with If-None-Match; the backend answers 304 with no body while nothing
+// has been recorded since.
+async function apiGet(action, params = {}) {
+	if (!SCRIPT_URL) {
+		throw new Error('Backend not configured for this site');
+	}
+	const qs = new URLSearchParams({ action, ...params });
+	const resp = await fetch(`${SCRIPT_URL}?${qs}`, { cache: 'no-cache' });
+	const result = await resp.json();
+	if (result.error) {
+		throw new Error(result.error);
+	}
+	return result;
+}
+
 // --- Stats loading ---
 
 async function loadStats() {
 	try {
-		statsData = await api('getStats');
+		statsData = await apiGet('getStats');
 		renderStatsSummary(statsData.game_summary);
 		renderLeaderboard(statsData.players);
+		const top = [...statsData.players]
+			.sort((a, b) => b.rating - a.rating)
+			.slice(0, PREFETCH_HISTORIES)
+			.map((p) => p.name);
+		if (top.length) fetchHistories(top);
 	} catch (e) {
 		showToast('Failed to load stats: ' + e.message);
 	}
 }
 
+function fetchHistories(names) {
+	const req = apiGet('getPlayerHistories', { player_names: names.join(',') })
+		.then((data) => data.histories);
+	for (const name of names) {
+		const games = req.then((histories) => histories[name] || []);
+		historyCache.set(name, games);
+		// A failed fetch is retried the next time the player is opened.
+		games.catch(() => historyCache.delete(name));
+	}
+}
+
 function renderStatsSummary(summary) {
 	$('#stat-total-games').textContent = summary.total_games;
 	$('#stat-mafia-pct').textContent = summary.mafia_win_pct + '%';
@@ -157,10 +195,11 @@ async function loadPlayerDetail(playerName) {
 	loading.classList.remove('hidden');
 
 	try {
-		const data = await api('getPlayerHistory', { player_name: playerName });
+		if (!historyCache.has(playerName)) fetchHistories([playerName]);
+		const games = await historyCache.get(playerName);
 		loading.classList.add('hidden');
 
-		for (const g of data.games) {
+		for (const g of games) {
 			const tr = document.createElement('tr');
 			const alignClass = g.alignment === 'Mafia' ? 'align-mafia' : 'align-town';
 			const isExcluded = g.result === 'Ghost' || g.result === 'Night Zero';